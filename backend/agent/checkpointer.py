@@ -0,0 +1,270 @@
+import os
+import random
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+from db.checkpoints import (
+    compact_checkpoints,
+    expire_threads,
+    get_checkpoint,
+    get_writes,
+    list_checkpoints,
+    save_checkpoint,
+    save_writes,
+)
+
+# Conversations without a new message for this long are deleted
+CHECKPOINT_TTL_SECONDS = int(os.environ.get("CHECKPOINT_TTL_SECONDS", str(7 * 24 * 3600)))
+# Threads whose latest checkpoint is kept in memory
+CHECKPOINT_CACHE_THREADS = int(os.environ.get("CHECKPOINT_CACHE_THREADS", "256"))
+# Checkpoints kept per thread; older ones are only needed for time travel, which the app does not use
+CHECKPOINT_KEEP = int(os.environ.get("CHECKPOINT_KEEP", "10"))
+# Seconds between expiry and compaction sweeps
+CHECKPOINT_SWEEP_INTERVAL = int(os.environ.get("CHECKPOINT_SWEEP_INTERVAL", "600"))
+
+class _LatestCheckpoint:
+    """Serialized latest checkpoint of a thread, with its pending writes keyed by (task_id, idx)."""
+
+    __slots__ = ("checkpoint_id", "parent_checkpoint_id", "checkpoint", "metadata", "writes")
+
+    def __init__(self, checkpoint_id, parent_checkpoint_id, checkpoint, metadata, writes):
+        self.checkpoint_id = checkpoint_id
+        self.parent_checkpoint_id = parent_checkpoint_id
+        self.checkpoint = checkpoint
+        self.metadata = metadata
+        self.writes = writes
+
+class SqliteCheckpointer(BaseCheckpointSaver):
+    """
+    langgraph checkpointer persisting conversations in agent.db, so they survive restarts.
+
+    The latest checkpoint of the most recently used threads is kept in memory (serialized,
+    so callers never share mutable state), which serves the lookup at the start of every run
+    without a query. Memory is bounded by max_cached_threads rather than by the number of
+    conversations. Every sweep_interval seconds, threads idle for longer than ttl_seconds are
+    deleted and active threads are compacted to their newest `keep` checkpoints.
+    """
+
+    def __init__(self, *,
+                 ttl_seconds=CHECKPOINT_TTL_SECONDS,
+                 max_cached_threads=CHECKPOINT_CACHE_THREADS,
+                 keep=CHECKPOINT_KEEP,
+                 sweep_interval=CHECKPOINT_SWEEP_INTERVAL,
+                 serde=None):
+        super().__init__(serde=serde)
+        self.ttl_seconds = ttl_seconds
+        self.max_cached_threads = max_cached_threads
+        self.keep = keep
+        self.sweep_interval = sweep_interval
+
+        self._latest = OrderedDict()  # (thread_id, checkpoint_ns) -> _LatestCheckpoint
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self._sweeping = False
+
+    # --- in-memory cache ---
+
+    def _cache_get(self, key) -> Optional[_LatestCheckpoint]:
+        with self._lock:
+            entry = self._latest.get(key)
+            if entry is not None:
+                self._latest.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key, entry: _LatestCheckpoint) -> None:
+        with self._lock:
+            self._latest[key] = entry
+            self._latest.move_to_end(key)
+            while len(self._latest) > self.max_cached_threads:
+                self._latest.popitem(last=False)
+
+    def _build_tuple(self, thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                     checkpoint, metadata, writes) -> CheckpointTuple:
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint=self.serde.loads_typed(checkpoint),
+            metadata=self.serde.loads_typed(metadata),
+            parent_config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": parent_checkpoint_id,
+            }} if parent_checkpoint_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, _, channel, value_type, value in writes
+            ],
+        )
+
+    # --- BaseCheckpointSaver ---
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        entry = self._cache_get((thread_id, checkpoint_ns))
+        if entry is not None and checkpoint_id in (None, entry.checkpoint_id):
+            with self._lock:
+                writes = [(task_id, idx, *write) for (task_id, idx), write in sorted(entry.writes.items())]
+            return self._build_tuple(
+                thread_id, checkpoint_ns, entry.checkpoint_id, entry.parent_checkpoint_id,
+                entry.checkpoint, entry.metadata, writes
+            )
+
+        row = get_checkpoint(thread_id, checkpoint_ns, checkpoint_id)
+        if row is None:
+            return None
+        found_id, parent_checkpoint_id, value_type, value, metadata_type, metadata = row
+        writes = get_writes(thread_id, checkpoint_ns, found_id)
+        if checkpoint_id is None:
+            self._cache_put((thread_id, checkpoint_ns), _LatestCheckpoint(
+                found_id, parent_checkpoint_id, (value_type, value), (metadata_type, metadata),
+                {(task_id, idx): (channel, write_type, write) for task_id, idx, channel, write_type, write in writes}
+            ))
+        return self._build_tuple(
+            thread_id, checkpoint_ns, found_id, parent_checkpoint_id,
+            (value_type, value), (metadata_type, metadata), writes
+        )
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        configurable = (config or {}).get("configurable", {})
+        rows = list_checkpoints(
+            thread_id=configurable.get("thread_id"),
+            checkpoint_ns=configurable.get("checkpoint_ns"),
+            before=get_checkpoint_id(before) if before else None,
+            # Metadata filters are applied after deserializing, so the limit cannot be pushed down
+            limit=None if filter else limit,
+        )
+        returned = 0
+        for thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, value_type, value, metadata_type, metadata in rows:
+            if limit is not None and returned >= limit:
+                break
+            checkpoint_tuple = self._build_tuple(
+                thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                (value_type, value), (metadata_type, metadata),
+                get_writes(thread_id, checkpoint_ns, checkpoint_id)
+            )
+            if filter and any(checkpoint_tuple.metadata.get(key) != expected for key, expected in filter.items()):
+                continue
+            returned += 1
+            yield checkpoint_tuple
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = self.serde.dumps_typed(metadata)
+
+        save_checkpoint(thread_id, checkpoint_ns, checkpoint["id"], parent_checkpoint_id,
+                        serialized_checkpoint, serialized_metadata)
+        self._cache_put((thread_id, checkpoint_ns), _LatestCheckpoint(
+            checkpoint["id"], parent_checkpoint_id, serialized_checkpoint, serialized_metadata, {}
+        ))
+        self._maybe_sweep()
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special channels (errors, interrupts) have fixed indexes and overwrite earlier writes
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        rows = [
+            (task_id, WRITES_IDX_MAP.get(channel, idx), channel, *self.serde.dumps_typed(value))
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        save_writes(thread_id, checkpoint_ns, checkpoint_id, rows, replace)
+
+        entry = self._cache_get((thread_id, checkpoint_ns))
+        if entry is not None and entry.checkpoint_id == checkpoint_id:
+            with self._lock:
+                for write_task_id, idx, channel, value_type, value in rows:
+                    if replace:
+                        entry.writes[(write_task_id, idx)] = (channel, value_type, value)
+                    else:
+                        entry.writes.setdefault((write_task_id, idx), (channel, value_type, value))
+
+    def get_next_version(self, current: Optional[str], channel: Any) -> str:
+        # Same scheme as langgraph's own savers: a zero-padded counter plus a random tiebreaker
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- async variants (the sync methods only block on local SQLite) ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.put_writes, config, writes, task_id)
+
+    # --- expiry and compaction ---
+
+    def _maybe_sweep(self) -> None:
+        with self._lock:
+            if self._sweeping or time.time() - self._last_sweep < self.sweep_interval:
+                return
+            self._sweeping = True
+            since = self._last_sweep
+        try:
+            self.sweep(since)
+        finally:
+            with self._lock:
+                self._sweeping = False
+                self._last_sweep = time.time()
+
+    def sweep(self, since: float = 0) -> None:
+        """
+        Deletes threads idle for longer than ttl_seconds and compacts the threads active since
+        the given timestamp to their newest `keep` checkpoints.
+        """
+        expired = expire_threads(self.ttl_seconds)
+        if expired:
+            expired = set(expired)
+            with self._lock:
+                for key in [key for key in self._latest if key[0] in expired]:
+                    del self._latest[key]
+        compact_checkpoints(self.keep, since)
@@ -0,0 +1,146 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+from typing import List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+import constants
+
+# Most recent messages sent to the LLM verbatim
+CONTEXT_WINDOW_MESSAGES = int(os.environ.get("CONTEXT_WINDOW_MESSAGES", "12"))
+# Older messages are folded into the summary this many at a time, so it is only rebuilt every few messages
+CONTEXT_SUMMARY_STEP = int(os.environ.get("CONTEXT_SUMMARY_STEP", "8"))
+# Tool outputs of earlier turns are cut to this many characters
+TOOL_OUTPUT_MAX_CHARS = int(os.environ.get("TOOL_OUTPUT_MAX_CHARS", "1500"))
+# Rolling summaries kept in memory, across all conversations
+CONTEXT_SUMMARY_CACHE_SIZE = int(os.environ.get("CONTEXT_SUMMARY_CACHE_SIZE", "1024"))
+
+def truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}\n…[truncated {len(text) - max_chars} characters]"
+
+class ContextPolicy:
+    """
+    state_modifier for create_react_agent that bounds the prompt of every LLM call.
+
+    The system prompt is followed by a rolling summary of the older messages and the last
+    `window` to `window + summary_step - 1` messages verbatim. Tool outputs from earlier turns
+    are truncated; those of the current turn are kept whole. Summaries are cached by the last
+    folded message, so each one is built once, from the previous summary and `summary_step`
+    new messages, instead of replaying the whole history.
+    """
+
+    def __init__(self, system_prompt: str,
+                 window: int = CONTEXT_WINDOW_MESSAGES,
+                 summary_step: int = CONTEXT_SUMMARY_STEP,
+                 tool_output_max_chars: int = TOOL_OUTPUT_MAX_CHARS,
+                 cache_size: int = CONTEXT_SUMMARY_CACHE_SIZE,
+                 llm=None):
+        self.system_prompt = system_prompt
+        self.window = window
+        self.summary_step = max(summary_step, 1)
+        self.tool_output_max_chars = tool_output_max_chars
+        self.cache_size = cache_size
+        self.llm = llm
+        self._summaries = OrderedDict()  # (cut, id of the last folded message) -> summary
+        self._lock = threading.Lock()
+
+    def __call__(self, state) -> List[BaseMessage]:
+        messages = state["messages"]
+        prompt = [SystemMessage(content=self.system_prompt)]
+
+        base_cut = self._base_cut(len(messages))
+        cut = self._cut(messages, base_cut)
+        if cut > 0:
+            summary = self._summary(messages, base_cut, cut)
+            if summary:
+                prompt.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+
+        current_turn = max((i for i, message in enumerate(messages) if isinstance(message, HumanMessage)), default=0)
+        for i in range(cut, len(messages)):
+            message = messages[i]
+            if (isinstance(message, ToolMessage) and i < current_turn
+                    and isinstance(message.content, str) and len(message.content) > self.tool_output_max_chars):
+                message = message.model_copy(update={"content": truncate(message.content, self.tool_output_max_chars)})
+            prompt.append(message)
+        return prompt
+
+    # --- window ---
+
+    def _base_cut(self, length: int) -> int:
+        if length <= self.window:
+            return 0
+        return (length - self.window) // self.summary_step * self.summary_step
+
+    def _cut(self, messages: Sequence[BaseMessage], base_cut: int) -> int:
+        # Tool results must follow the AI message that called them, so never start the window on one
+        cut = base_cut
+        while 0 < cut < len(messages) and isinstance(messages[cut], ToolMessage):
+            cut += 1
+        return cut
+
+    # --- rolling summary ---
+
+    def _key(self, messages: Sequence[BaseMessage], cut: int):
+        last = messages[cut - 1]
+        return cut, last.id or hash(str(last.content))
+
+    def _summary(self, messages: Sequence[BaseMessage], base_cut: int, cut: int) -> str:
+        key = self._key(messages, cut)
+        with self._lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                return self._summaries[key]
+
+            # Continue from the latest summary already built for this conversation, if any
+            summary, start = "", 0
+            for previous_base_cut in range(base_cut - self.summary_step, 0, -self.summary_step):
+                previous = self._cut(messages, previous_base_cut)
+                cached = self._summaries.get(self._key(messages, previous))
+                if cached is not None:
+                    summary, start = cached, previous
+                    break
+
+        try:
+            summary = self._fold(summary, messages[start:cut])
+        except Exception as e:
+            # Without a new summary the older messages are still dropped; the window keeps the recent context
+            logging.error(f"Failed to summarize {cut - start} conversation messages: {e}")
+            return summary
+
+        with self._lock:
+            self._summaries[key] = summary
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def _fold(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        if self.llm is None:
+            from langchain_openai import ChatOpenAI
+            self.llm = ChatOpenAI(model=constants.CONTEXT_SUMMARY_MODEL)
+        response = self.llm.invoke([
+            SystemMessage(content=constants.CONTEXT_SUMMARY_PROMPT),
+            HumanMessage(content=(
+                f"Current summary:\n{summary or '(none)'}\n\n"
+                f"New messages:\n{self.render(messages)}"
+            )),
+        ], config={"callbacks": []})  # Detached from the agent run so summary tokens are not streamed to the user
+        return response.content.strip()
+
+    def render(self, messages: Sequence[BaseMessage]) -> str:
+        """Formats messages as plain text for the summarizer, with tool outputs truncated."""
+        lines = []
+        for message in messages:
+            if isinstance(message, HumanMessage):
+                lines.append(f"User: {message.content}")
+            elif isinstance(message, AIMessage):
+                if message.content:
+                    lines.append(f"Agent: {message.content}")
+                for tool_call in message.tool_calls:
+                    lines.append(f"Agent called {tool_call['name']}({tool_call['args']})")
+            elif isinstance(message, ToolMessage):
+                lines.append(f"Tool {message.name or ''}: {truncate(str(message.content), self.tool_output_max_chars)}")
+        return "\n".join(lines)
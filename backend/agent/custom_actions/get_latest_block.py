@@ -1,69 +1,273 @@
-from web3 import Web3
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Set, Dict, List, Any
-from decimal import Decimal
+from typing import Any, Dict, Optional
+
+# Node the block tools read Base Sepolia from
+BASE_SEPOLIA_RPC_URL = os.environ.get("BASE_SEPOLIA_RPC_URL", "https://sepolia.base.org")
+# Blocks kept in memory, reachable by number and by hash
+BLOCK_CACHE_SIZE = int(os.environ.get("BLOCK_CACHE_SIZE", "64"))
+# Follow the head in a background thread, so get_latest_block answers from memory
+BLOCK_TRACK_HEAD = os.environ.get("BLOCK_TRACK_HEAD", "false").lower() == "true"
+# Seconds between two looks at the head while tracking it; Base produces a block every 2 seconds
+BLOCK_POLL_INTERVAL = float(os.environ.get("BLOCK_POLL_INTERVAL", "2"))
+
+# Transaction type of the deposits (L1 info, bridged ETH) the OP stack puts at the start of each block
+DEPOSIT_TX_TYPE = "0x7e"
+
+class BlockSourceError(Exception):
+    """Raised when the node fails a request or misses a block it should have"""
+
+class BlockSourceUnavailable(BlockSourceError):
+    """Raised when the node cannot be reached or does not answer in time"""
+
+class Web3BlockSource:
+    """
+    Reads blocks as raw JSON-RPC results through one HTTP provider, whose session keeps the
+    connection to the node alive between calls. The results skip web3's formatters: quantities
+    stay hex strings and addresses lowercase.
+    """
+
+    def __init__(self, rpc_url: str):
+        import requests
+        from web3 import Web3  # Deferred: web3 is slow to import and only needed when the tool runs
+
+        self.rpc_url = rpc_url
+        self.provider = Web3.HTTPProvider(rpc_url, session=requests.Session())
+
+    def _request(self, method: str, params: list):
+        import requests
+
+        try:
+            response = self.provider.make_request(method, params)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            raise BlockSourceUnavailable(f"Failed to connect to {self.rpc_url}") from e
+        except requests.exceptions.RequestException as e:
+            raise BlockSourceError(f"{method} failed: {e}") from e
+        if response.get("error"):
+            raise BlockSourceError(f"{method} failed: {response['error']}")
+        return response["result"]
+
+    def head(self) -> int:
+        return int(self._request("eth_blockNumber", []), 16)
+
+    def block(self, number: int) -> dict:
+        block = self._request("eth_getBlockByNumber", [hex(number), True])
+        if block is None:
+            raise BlockSourceError(f"Block {number} not found")
+        return block
+
+    def header(self, number: int) -> dict:
+        """Returns block number with the hashes of its transactions only."""
+        block = self._request("eth_getBlockByNumber", [hex(number), False])
+        if block is None:
+            raise BlockSourceError(f"Block {number} not found")
+        return block
+
+    def block_by_hash(self, block_hash: str) -> dict:
+        block = self._request("eth_getBlockByHash", [block_hash, True])
+        if block is None:
+            raise BlockSourceError(f"Block {block_hash} not found")
+        return block
+
+class BlockColumns:
+    """
+    A block reduced to arrays of the transaction fields the summaries use, built in one pass
+    over the raw JSON-RPC block. Contract creations have no receiver, so receivers can be
+    shorter than senders. Gas prices leave out the deposit transactions of the OP stack, which
+    pay no gas price.
+    """
+
+    __slots__ = ("number", "hash", "parent_hash", "timestamp", "senders", "receivers", "values", "gas_prices", "_summary")
+
+    def __init__(self, block: dict):
+        import numpy as np  # Deferred like pandas, which provides it
+
+        transactions = block["transactions"]
+        self.number = int(block["number"], 16)
+        self.hash = block["hash"]
+        self.parent_hash = block["parentHash"]
+        self.timestamp = int(block["timestamp"], 16)
+        self.senders = np.array([tx["from"] for tx in transactions], dtype=object)
+        self.receivers = np.array([tx["to"] for tx in transactions if tx["to"]], dtype=object)
+        # In ether; wei amounts overflow int64, and the summary reports a float anyway
+        self.values = np.array([int(tx["value"], 16) for tx in transactions], dtype=np.float64) / 10 ** 18
+        # In gwei
+        self.gas_prices = np.array(
+            [int(tx["gasPrice"], 16) for tx in transactions if tx.get("gasPrice") and tx.get("type") != DEPOSIT_TX_TYPE],
+            dtype=np.float64
+        ) / 10 ** 9
+        self._summary = None
+
+    def summary(self) -> Dict[str, Any]:
+        """Returns the block data of get_latest_block, computed once per block."""
+        if self._summary is None:
+            import numpy as np
+            import pandas as pd  # Deferred: pandas is slow to import and only needed when the tool runs
+            from eth_utils import to_checksum_address  # Deferred like web3, which provides it
+
+            # Hash-based, unlike np.unique which sorts the strings
+            senders = pd.unique(self.senders)
+            receivers = pd.unique(self.receivers)
+            self._summary = {
+                "block_number": self.number,
+                "timestamp": datetime.fromtimestamp(self.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+                "hash": self.hash,
+                "transactions_count": len(self.senders),
+                "total_value_transferred": float(self.values.sum()),
+                "address_summary": {
+                    # Checksummed like the addresses web3 returns
+                    "unique_senders": [to_checksum_address(address) for address in senders],
+                    "unique_receivers": [to_checksum_address(address) for address in receivers],
+                    "total_unique_addresses": len(pd.unique(np.concatenate([senders, receivers]))),
+                },
+            }
+        return self._summary
+
+class BlockCache:
+    """Least recently used blocks by number, also found by hash"""
+
+    def __init__(self, max_blocks: int = BLOCK_CACHE_SIZE):
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()  # number -> BlockColumns
+        self._numbers = {}  # hash -> number
+        self._lock = threading.Lock()
+
+    def get(self, number: int) -> Optional[BlockColumns]:
+        with self._lock:
+            block = self._blocks.get(number)
+            if block is not None:
+                self._blocks.move_to_end(number)
+            return block
+
+    def get_by_hash(self, block_hash: str) -> Optional[BlockColumns]:
+        with self._lock:
+            number = self._numbers.get(block_hash)
+            if number is None:
+                return None
+            self._blocks.move_to_end(number)
+            return self._blocks[number]
+
+    def put(self, block: BlockColumns) -> None:
+        with self._lock:
+            self._remove(block.number)
+            # A block with another parent than the cached one means a reorg replaced the parent
+            parent = self._blocks.get(block.number - 1)
+            if parent is not None and parent.hash != block.parent_hash:
+                self._remove(block.number - 1)
+            self._blocks[block.number] = block
+            self._numbers[block.hash] = block.number
+            while len(self._blocks) > self.max_blocks:
+                self._numbers.pop(self._blocks.popitem(last=False)[1].hash, None)
+
+    def _remove(self, number: int) -> None:
+        block = self._blocks.pop(number, None)
+        if block is not None:
+            self._numbers.pop(block.hash, None)
+
+    def __len__(self):
+        return len(self._blocks)
+
+class BlockReader:
+    """
+    Serves blocks from a BlockCache, fetching only those it does not hold.
+
+    Without head tracking, latest() costs one eth_blockNumber call, plus the block itself the
+    first time a new head is seen. With it, a daemon thread polls the head every poll_interval
+    and fetches the blocks produced since the last poll, and latest() returns the newest one
+    without any request while the polls succeed.
+    """
+
+    def __init__(self, source, cache_size: int = BLOCK_CACHE_SIZE, poll_interval: float = BLOCK_POLL_INTERVAL):
+        self.source = source
+        self.cache = BlockCache(cache_size)
+        self.poll_interval = poll_interval
+        self._head = None  # tracked head block
+        self._head_checked_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def block(self, number: int) -> BlockColumns:
+        block = self.cache.get(number)
+        if block is None:
+            block = BlockColumns(self.source.block(number))
+            self.cache.put(block)
+        return block
+
+    def block_by_hash(self, block_hash: str) -> BlockColumns:
+        block = self.cache.get_by_hash(block_hash)
+        if block is None:
+            block = BlockColumns(self.source.block_by_hash(block_hash))
+            self.cache.put(block)
+        return block
+
+    def latest(self) -> BlockColumns:
+        head = self._head
+        # A tracked head older than a few missed polls may be stale; ask the node instead
+        if head is not None and time.monotonic() - self._head_checked_at < 3 * self.poll_interval:
+            return head
+        return self.block(self.source.head())
+
+    def poll(self) -> int:
+        """
+        Fetches the blocks produced since the last poll, at most a cache worth.
+        Returns the number of blocks fetched.
+        """
+        head = self.source.head()
+        last = self._head.number if self._head is not None else head - 1
+        fetched = 0
+        for number in range(max(last + 1, head - self.cache.max_blocks + 1), head + 1):
+            self._head = self.block(number)
+            fetched += 1
+        # After a reorg to a shorter chain, the head number goes back
+        if self._head.number != head:
+            self._head = self.block(head)
+        self._head_checked_at = time.monotonic()
+        return fetched
+
+    def track_head(self) -> None:
+        """Polls the head until stop() is called."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logging.warning(f"Failed to poll the head of {getattr(self.source, 'rpc_url', 'the chain')}: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def start_tracking(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.track_head, name="block-head-tracker", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._head = None
+
+_reader = None
+_reader_lock = threading.Lock()
+
+def get_block_reader() -> BlockReader:
+    """Returns the process-wide BlockReader of BASE_SEPOLIA_RPC_URL, tracking the head if BLOCK_TRACK_HEAD is set."""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            _reader = BlockReader(Web3BlockSource(BASE_SEPOLIA_RPC_URL))
+            if BLOCK_TRACK_HEAD:
+                _reader.start_tracking()
+        return _reader
 
 def get_latest_block() -> Dict[str, Any]:
     """
     Get real time block data from the Base Sepolia network, including all addresses involved in transactions
     and total value transferred.
-    
+
     This function MUST be called every time in order to receive the latest block information.
     """
-    # Connect to Base Sepolia network
-    base_sepolia_rpc = "https://sepolia.base.org"
-    w3 = Web3(Web3.HTTPProvider(base_sepolia_rpc))
-    
-    # Check connection
-    if not w3.is_connected():
-        raise Exception("Failed to connect to Base Sepolia network")
-
-    # Get latest block
-    latest_block = w3.eth.get_block('latest', full_transactions=True)
-    
-    # Initialize sets to store unique addresses and total value
-    sender_addresses: Set[str] = set()
-    receiver_addresses: Set[str] = set()
-    total_value_eth: Decimal = Decimal('0')
-    
-    # Process all transactions in the block
-    transactions_data: List[Dict[str, Any]] = []
-    
-    for tx in latest_block.transactions:
-        # Add sender address
-        sender_addresses.add(tx["from"])
-        
-        # Add receiver address if it exists
-        if tx["to"]:
-            receiver_addresses.add(tx["to"])
-
-        # Convert value to ETH and add to total
-        tx_value_eth = Decimal(str(w3.from_wei(tx["value"], 'ether')))
-        total_value_eth += tx_value_eth
-        
-        # Store transaction data
-        tx_data = {
-            "hash": tx.hash.hex(),
-            "from": tx["from"],
-            "to": tx["to"] if tx["to"] else "Contract Creation",
-            "value": tx_value_eth,
-            "gas_price": w3.from_wei(tx["gasPrice"], 'gwei') if "gasPrice" in tx else None,
-            "gas": tx["gas"]
-        }
-        transactions_data.append(tx_data)
-    
-    # Compile block data
-    block_data = {
-        "block_number": latest_block.number,
-        "timestamp": datetime.fromtimestamp(latest_block.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
-        "hash": latest_block.hash.hex(),
-        "transactions_count": len(latest_block.transactions),
-        "total_value_transferred": float(total_value_eth),
-        "address_summary": {
-            "unique_senders": list(sender_addresses),
-            "unique_receivers": list(receiver_addresses),
-            "total_unique_addresses": len(sender_addresses.union(receiver_addresses))
-        }
-    }
-    
-    return block_data
\ No newline at end of file
+    try:
+        return get_block_reader().latest().summary()
+    except BlockSourceUnavailable as e:
+        raise Exception("Failed to connect to Base Sepolia network") from e
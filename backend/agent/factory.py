@@ -0,0 +1,46 @@
+import threading
+import time
+import logging
+
+_agent = None
+_agentkit = None
+_agent_lock = threading.RLock()
+
+def get_agentkit():
+    """
+    Returns the shared CDP Agentkit wrapper, loading the wallet on first use.
+    """
+    global _agentkit
+    if _agentkit is None:
+        with _agent_lock:
+            if _agentkit is None:
+                from agent.initialize_agent import create_agentkit
+                _agentkit = create_agentkit()
+    return _agentkit
+
+def get_wallet():
+    """
+    Returns the CDP wallet of the agent, for work that signs transactions outside an agent run.
+    """
+    return get_agentkit().wallet
+
+def get_agent():
+    """
+    Returns the shared (agent_executor, config) pair, building it on first use.
+    The agent, its CDP wallet and the langchain / CDP imports are only loaded when a
+    route or the issue monitor first needs them, and exactly once per process.
+    """
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                # Deferred: importing langchain and the CDP SDK dominates cold start time
+                from agent.initialize_agent import initialize_agent
+                started = time.perf_counter()
+                _agent = initialize_agent(get_agentkit())
+                logging.info(f"Initialized agent in {time.perf_counter() - started:.2f}s")
+    return _agent
+
+def is_agent_initialized():
+    """Returns True if get_agent has already built the agent in this process."""
+    return _agent is not None
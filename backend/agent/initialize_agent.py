@@ -1,23 +1,22 @@
 import os
 import json
 import re
+import uuid
 import requests
 
-import constants
-
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
+from typing import TYPE_CHECKING
 
-from cdp_langchain.agent_toolkits import CdpToolkit
-from cdp_langchain.utils import CdpAgentkitWrapper
-from cdp_langchain.tools import CdpTool
+import constants
 
-from cdp import Wallet
 from pydantic import BaseModel, Field
 
+if TYPE_CHECKING:
+    from cdp import Wallet
+
 from db.wallet import add_wallet_info, get_wallet_info
-from db.rewards import add_reward
+from db.rewards import add_pending_reward_lock, drop_pending_reward_lock, get_pending_reward_locks, record_reward_lock
+from db.transactions import get_latest_transaction
+from tx_submitter import get_transaction_submitter
 
 # ----------------------------------------------------------------------
 # Various Utility Functions (Optional)
@@ -96,7 +95,7 @@ def load_abi(file_path: str):
     with open(file_path, 'r') as file:
         return json.load(file)
 
-def approve_token(wallet: Wallet, spender: str, value: str, token_address: str) -> str:
+def approve_token(wallet: "Wallet", spender: str, value: str, token_address: str) -> str:
     """
     Approves tokens for spending.
     """
@@ -139,7 +138,7 @@ def get_issue_data(repositoryName: str, issueId: int) -> dict:
         print(f"Failed to retrieve issue data: {str(e)}")
         return None
 
-def lock_reward(wallet: Wallet, repositoryName: str, issueId: int, reward: int, userAddress: str, signature: str) -> str:
+def lock_reward(wallet: "Wallet", repositoryName: str, issueId: int, reward: int, userAddress: str, signature: str) -> str:
     """
     Executes the smart contract call to lock a reward.
     """
@@ -166,50 +165,122 @@ def lock_reward(wallet: Wallet, repositoryName: str, issueId: int, reward: int,
     }
     print("lock_reward_args", lock_reward_args)
 
+    # The reward is kept under the label of the transaction until it is confirmed, so it is
+    # recorded even if the confirmation only comes after a restart (see resume_reward_locks)
+    label = f"lock_reward:{uuid.uuid4().hex}"
+    if not add_pending_reward_lock(label, repositoryName, issueId, reward):
+        return "Failed to lock reward: the reward could not be saved"
+    submitter = get_transaction_submitter()
     try:
-        lock_reward_invocation = wallet.invoke_contract(
-            contract_address=CONTRACT_ADDRESS,
-            abi=abi,
-            method=method,
-            args=lock_reward_args
-        ).wait()
-        print(lock_reward_invocation)
-
-        if lock_reward_invocation:
-            issue_data = get_issue_data(repositoryName, issueId)
-            success = add_reward(repositoryName, issueId, reward, issue_data["title"], issue_data["body"])
-            if success:
-                print(f"Successfully added reward for {repositoryName} issue {issueId}")
-
-                try:
-                    repo_owner, repo_name = extract_repo_info(repositoryName)
-                    tx_url = extract_transaction_hash(str(lock_reward_invocation))
-                    comment_body = format_reward_comment(reward, tx_url)
-                    post_data = {"body": comment_body}
-                    request_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues/{issueId}/comments"
-                    post_github_comment(request_url, post_data)
-                    print(f"Posted comment to issue #{issueId} in {repositoryName}")
-                except Exception as ex:
-                    print(f"Failed to post comment: {str(ex)}")
-            else:
-                print(f"Failed to add reward for {repositoryName} issue {issueId}")
-
-        return f"Reward locked successfully: {lock_reward_invocation}"
+        lock_reward_handle = submitter.submit(
+            CONTRACT_ADDRESS,
+            abi,
+            method,
+            lock_reward_args,
+            label=label
+        )
     except Exception as e:
+        drop_pending_reward_lock(label)
         return f"Failed to lock reward: {str(e)}"
 
+    if not submitter.resumable:
+        # A CDP transaction cannot be tracked again after a restart: wait for it here
+        try:
+            lock_reward_invocation = lock_reward_handle.result()
+        except Exception as e:
+            row = get_latest_transaction(label)
+            if row is not None and row["status"] == "failed":
+                drop_pending_reward_lock(label)
+            # After a timeout the reward stays pending, for an operator to check the transaction
+            return f"Failed to lock reward: {str(e)}"
+        record_locked_reward(label, repositoryName, issueId, reward, lock_reward_invocation)
+        return f"Reward locked: {lock_reward_invocation}"
+
+    # Sent without waiting for the block: the reward is recorded once the transaction is confirmed
+    watch_reward_lock(submitter, lock_reward_handle, label, repositoryName, issueId, reward)
+    return f"Reward lock submitted, the reward is registered once the transaction is confirmed: {lock_reward_handle}"
+
+def record_locked_reward(label: str, repositoryName: str, issueId: int, reward: int, receipt) -> bool:
+    """
+    Moves the pending reward of a confirmed lockReward transaction to the rewards table and
+    comments on the issue. Returns False if the reward stays pending (it is retried on restart).
+    """
+    print(receipt)
+    issue_data = get_issue_data(repositoryName, issueId)
+    if issue_data is None or not record_reward_lock(label, issue_data["title"], issue_data["body"]):
+        print(f"Failed to add reward for {repositoryName} issue {issueId}")
+        return False
+    print(f"Successfully added reward for {repositoryName} issue {issueId}")
+
+    try:
+        repo_owner, repo_name = extract_repo_info(repositoryName)
+        tx_url = extract_transaction_hash(str(receipt))
+        comment_body = format_reward_comment(reward, tx_url)
+        post_data = {"body": comment_body}
+        request_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues/{issueId}/comments"
+        post_github_comment(request_url, post_data)
+        print(f"Posted comment to issue #{issueId} in {repositoryName}")
+    except Exception as ex:
+        print(f"Failed to post comment: {str(ex)}")
+    return True
+
+def watch_reward_lock(submitter, handle, label: str, repositoryName: str, issueId: int, reward: int) -> None:
+    """Records the reward when the lockReward transaction of handle is confirmed."""
+    def on_reward_locked(future):
+        try:
+            receipt = future.result()
+        except Exception as e:
+            # A transaction that timed out may still be mined: keep polling it
+            retry = submitter.find(label)
+            if retry is not None:
+                print(f"Still waiting for the reward lock of {repositoryName} issue {issueId}: {str(e)}")
+                retry.add_done_callback(on_reward_locked)
+            else:
+                print(f"Failed to lock reward: {str(e)}")
+                drop_pending_reward_lock(label)
+            return
+        record_locked_reward(label, repositoryName, issueId, reward, receipt)
+
+    handle.add_done_callback(on_reward_locked)
+
+def resume_reward_locks() -> int:
+    """
+    Records or keeps waiting for the reward locks that were not confirmed before a restart.
+    Returns the number of locks still waiting for their transaction.
+    """
+    submitter = get_transaction_submitter()
+    waiting = 0
+    for lock in get_pending_reward_locks():
+        label = lock["label"]
+        args = (label, lock["repository_name"], lock["issue_id"], lock["reward_amount"])
+        row = get_latest_transaction(label)
+        if row is None or row["status"] == "failed":
+            # Never sent, or reverted
+            drop_pending_reward_lock(label)
+            continue
+        handle = submitter.find(label)
+        if handle is None:
+            print(f"The reward lock of {lock['repository_name']} issue {lock['issue_id']} cannot be tracked again "
+                  f"(transaction {row['tx_hash'] or row['id']}, {row['status']})")
+            continue
+        if handle.done() and handle.exception() is None:
+            record_locked_reward(*args, handle.result())
+        else:
+            watch_reward_lock(submitter, handle, *args)
+            waiting += 1
+    return waiting
+
 # ----------------------------------------------------------------------
 # Agent Initialization (Including the evaluate_contribution Tool)
 # ----------------------------------------------------------------------
 
-def initialize_agent():
+def create_agentkit():
     """
-    Initializes the agent using CDP Agentkit.
-    This includes tools for locking rewards (lock_reward) and evaluating contributions (evaluate_contribution).
-    Returns a tuple containing the agent executor and configuration.
+    Creates the CDP Agentkit wrapper with the wallet stored in the database or the environment,
+    and saves the exported wallet back to the database.
+    Use agent.factory.get_agentkit instead of calling this directly so the wallet is loaded once.
     """
-    # Initialize the LLM
-    llm = ChatOpenAI(model=constants.AGENT_MODEL)
+    from cdp_langchain.utils import CdpAgentkitWrapper
 
     # Retrieve wallet information from environment variables or the database
     wallet_id = os.getenv(constants.WALLET_ID_ENV_VAR)
@@ -232,6 +303,28 @@ def initialize_agent():
     wallet_data = agentkit.export_wallet()
     add_wallet_info(json.dumps(wallet_data))
     print("Exported wallet info", wallet_data, flush=True)
+    return agentkit
+
+def initialize_agent(agentkit=None):
+    """
+    Initializes the agent using CDP Agentkit.
+    This includes tools for locking rewards (lock_reward) and evaluating contributions (evaluate_contribution).
+    Returns a tuple containing the agent executor and configuration.
+    Use agent.factory.get_agent instead of calling this directly so the agent is built once.
+    """
+    # Imported here so that importing this module (e.g. for lock_reward) stays cheap
+    from langchain_openai import ChatOpenAI
+    from agent.checkpointer import SqliteCheckpointer
+    from agent.context_policy import ContextPolicy
+    from langgraph.prebuilt import create_react_agent
+    from cdp_langchain.agent_toolkits import CdpToolkit
+    from cdp_langchain.tools import CdpTool
+
+    # Initialize the LLM
+    llm = ChatOpenAI(model=constants.AGENT_MODEL)
+
+    if agentkit is None:
+        agentkit = create_agentkit()
 
     # Retrieve tools from the CDP Toolkit
     cdp_toolkit = CdpToolkit.from_cdp_agentkit_wrapper(agentkit)
@@ -268,8 +361,8 @@ def initialize_agent():
     # Add the custom tools to the existing tools
     all_tools = tools + [lockRewardTool, evaluateContributionTool]
 
-    # Initialize memory to store conversation history
-    memory = MemorySaver()
+    # Persist conversation history in agent.db; idle conversations expire instead of accumulating in memory
+    memory = SqliteCheckpointer()
     config = {"configurable": {"thread_id": "CDP Agentkit Chatbot Example!"}}
 
     # Create the ReAct agent
@@ -277,7 +370,8 @@ def initialize_agent():
         llm,
         tools=all_tools,
         checkpointer=memory,
-        state_modifier=constants.AGENT_PROMPT,
+        # Bounds every prompt to the system prompt, a rolling summary and the most recent messages
+        state_modifier=ContextPolicy(constants.AGENT_PROMPT),
     )
     
     return agent_executor, config
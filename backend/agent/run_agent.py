@@ -1,10 +1,18 @@
+import os
+import queue
+import threading
 from typing import Iterator
-from langchain_core.messages import HumanMessage
 import constants
 from utils import format_sse
 
+# Seconds without output after which a heartbeat event is sent, so proxies keep the stream open
+HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_INTERVAL", "10"))
+# Characters of a tool output forwarded in its tool_end event
+TOOL_OUTPUT_PREVIEW_CHARS = int(os.environ.get("SSE_TOOL_OUTPUT_PREVIEW_CHARS", "500"))
+
 def run_agent(input, agent_executor, config) -> Iterator[str]:
     """Run the agent and yield formatted SSE messages"""
+    from langchain_core.messages import HumanMessage
     try:
         for chunk in agent_executor.stream(
             {"messages": [HumanMessage(content=input)]}, config
@@ -14,4 +22,74 @@ def run_agent(input, agent_executor, config) -> Iterator[str]:
                 if content:
                     yield format_sse(content, constants.EVENT_TYPE_AGENT)
     except Exception as e:
-        yield format_sse(f"Error: {str(e)}", constants.EVENT_TYPE_ERROR)
\ No newline at end of file
+        yield format_sse(f"Error: {str(e)}", constants.EVENT_TYPE_ERROR)
+
+def message_events(message, metadata) -> Iterator[str]:
+    """Translate one item of a stream_mode="messages" agent stream into SSE messages"""
+    from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+    if metadata.get("langgraph_node") == "tools" and isinstance(message, ToolMessage):
+        output = str(message.content)
+        if len(output) > TOOL_OUTPUT_PREVIEW_CHARS:
+            output = output[:TOOL_OUTPUT_PREVIEW_CHARS] + "…"
+        yield format_sse(output, constants.EVENT_TYPE_TOOL_END, [message.name])
+    elif isinstance(message, AIMessageChunk):
+        if isinstance(message.content, str) and message.content:
+            yield format_sse(message.content, constants.EVENT_TYPE_AGENT_DELTA)
+        # The tool name only appears in the first chunk of each tool call
+        for tool_call_chunk in message.tool_call_chunks:
+            if tool_call_chunk.get("name"):
+                yield format_sse(tool_call_chunk["name"], constants.EVENT_TYPE_TOOL_START, [tool_call_chunk["name"]])
+    elif isinstance(message, AIMessage):
+        # Models that do not stream deliver the whole message at once
+        if message.content:
+            yield format_sse(message.content, constants.EVENT_TYPE_AGENT)
+        for tool_call in message.tool_calls:
+            yield format_sse(tool_call["name"], constants.EVENT_TYPE_TOOL_START, [tool_call["name"]])
+
+def stream_agent_tokens(input, agent_executor, config, heartbeat_interval=HEARTBEAT_INTERVAL, on_finish=None) -> Iterator[str]:
+    """
+    Start the agent and return an iterator of formatted SSE messages, produced as soon as the
+    model generates them: agent_delta for each text token, tool_start / tool_end around tool
+    calls, a heartbeat after heartbeat_interval seconds of silence and completed at the end.
+    on_finish is called once the agent run is over, even if the client has gone away.
+    """
+    from langchain_core.messages import HumanMessage
+    events = queue.Queue()
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            for message, metadata in agent_executor.stream(
+                {"messages": [HumanMessage(content=input)]}, config, stream_mode="messages"
+            ):
+                if cancelled.is_set():
+                    # Finish the run so tool calls and the checkpoint complete, but drop the output
+                    continue
+                for event in message_events(message, metadata):
+                    events.put(event)
+        except Exception as e:
+            events.put(format_sse(f"Error: {str(e)}", constants.EVENT_TYPE_ERROR))
+        finally:
+            events.put(None)
+            if on_finish is not None:
+                on_finish()
+
+    # The agent runs in its own thread so heartbeats keep flowing while the model is thinking
+    threading.Thread(target=produce, daemon=True, name="agent-stream").start()
+    return _drain(events, cancelled, heartbeat_interval)
+
+def _drain(events, cancelled, heartbeat_interval) -> Iterator[str]:
+    try:
+        while True:
+            try:
+                event = events.get(timeout=heartbeat_interval)
+            except queue.Empty:
+                yield format_sse("", constants.EVENT_TYPE_HEARTBEAT)
+                continue
+            if event is None:
+                break
+            yield event
+        yield format_sse("", constants.EVENT_TYPE_COMPLETED)
+    finally:
+        # Also reached when the client disconnects
+        cancelled.set()
@@ -3,23 +3,39 @@ import time
 import os
 from flask import Flask, request, Response, stream_with_context, jsonify
 from flask_socketio import SocketIO
-from langchain_core.messages import HumanMessage
 import json
 
 # Initialize the AI agent using the chatbot module
 # from chatbot import initialize_agent
 # Use start_monitors to monitor target issues from each entry in the rewards JSON
-from websocket_module import start_monitors
-from agent.initialize_agent import initialize_agent
-from agent.run_agent import run_agent
+from websocket_module import IssuePollScheduler, POLL_INTERVAL as ISSUE_POLL_INTERVAL
+from agent.factory import get_agent, get_wallet
+from agent.run_agent import run_agent, stream_agent_tokens
+from session_scheduler import SessionScheduler, AdmissionRejected
+from settlement import SettlementWorker
+from tx_submitter import configure_transaction_submitter
+from event_indexer import start_event_indexer, get_reward_claim_status, get_github_id_claims
+from block_analytics import DEFAULT_PERCENTILES, get_block_analytics
+from agent.custom_actions.get_latest_block import BlockSourceError, BlockSourceUnavailable
 from db.setup import setup
-from db.rewards import get_rewards  # Import the get_rewards function
+from db.rewards import get_rewards, query_rewards, get_rewards_version  # Import the get_rewards function
+from db.search import search_rewards
+from response_cache import VersionedResponseCache
+from constants import InputValidationError
+from db.webhooks import forget_delivery, record_delivery
+from webhooks import verify_signature, extract_closed_issue, extract_referenced_issues
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 
 load_dotenv()
 app = Flask(__name__)
 
+# Proxies in front of the app that append to X-Forwarded-For; the hops before them are set by the client
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "1"))
+if TRUSTED_PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
 # Allow CORS for http://localhost:3000, http://localhost:3001, and http://localhost:3002 with all methods
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
 CORS(app, resources={r"/*": {"origins": "http://localhost:3001"}})
@@ -32,19 +48,46 @@ setup()
 # Initialize Flask-SocketIO
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Initialize the AI agent globally
-agent_executor, config = initialize_agent()
+# The AI agent is built on first use by get_agent and shared by every route and the issue monitor
 
 # Root endpoint: When accessing http://localhost:5001 in a browser, "websocket server" is displayed
 @app.route("/")
 def index():
     return "websocket server"
 
+# Bounds concurrent agent runs; closed-issue processing uses its priority lane
+agent_sessions = SessionScheduler()
+
+def client_id():
+    # ProxyFix sets remote_addr to the address the trusted proxies saw, which the client cannot forge
+    return request.remote_addr
+
+def rejected_response(e):
+    response = jsonify({'error': e.reason})
+    response.status_code = e.status
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+def agent_stream(session, stream, input, agent_executor, config):
+    """Streams an agent run, holding the session until the run is over."""
+    if stream is stream_agent_tokens:
+        # The run outlives a disconnected client; the session is released when it finishes
+        return stream_agent_tokens(input, agent_executor, config, on_finish=session.release)
+    return session.hold(stream(input, agent_executor, config))
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Content-Type': 'text/event-stream',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no'
+}
+
 @app.route("/api/chat", methods=["POST"])
 def api_chat():
     """
     Endpoint that receives a message from the user and returns the AI agent's response.
     Send {"message": "user input"} in the request body.
+    With "stream": true, the response is streamed token by token as SSE messages instead.
     """
     data = request.get_json()
     if not data or "message" not in data:
@@ -55,8 +98,28 @@ def api_chat():
         )
 
     user_input = data["message"]
+    try:
+        session = agent_sessions.acquire(client_id())
+    except AdmissionRejected as e:
+        return rejected_response(e)
+
+    if data.get("stream"):
+        try:
+            agent_executor, config = get_agent()
+            stream = agent_stream(session, stream_agent_tokens, user_input, agent_executor, config)
+        except Exception:
+            session.release()
+            raise
+        return Response(
+            stream_with_context(stream),
+            mimetype='text/event-stream',
+            headers=SSE_HEADERS
+        )
+
     response_chunks = []
     try:
+        from langchain_core.messages import HumanMessage
+        agent_executor, config = get_agent()
         for chunk in agent_executor.stream({"messages": [HumanMessage(content=user_input)]}, config):
             if "agent" in chunk:
                 response_chunks.append(chunk["agent"]["messages"][0].content)
@@ -69,6 +132,8 @@ def api_chat():
             status=500,
             mimetype='application/json; charset=utf-8'
         )
+    finally:
+        session.release()
 
     final_response = "\n".join(response_chunks)
     return Response(
@@ -76,65 +141,277 @@ def api_chat():
         mimetype='application/json; charset=utf-8'
     )
 
-# Initialize the agent (again) and attach it to the app
-agent_executor, config = initialize_agent()
-app.agent_executor = agent_executor
-
 # Interact with the agent
 @app.route("/api/agent", methods=['POST'])
 def chat():
+    """
+    Streams the agent's reply as SSE messages, one per agent step.
+    With "stream": true in the body, text is streamed token by token (agent_delta events) with
+    tool_start / tool_end events, heartbeats and a final completed event.
+    """
     try:
         data = request.get_json()
         # Parse the user input from the request
         input = data['input']
         # Use the conversation_id passed in the request for conversation memory
         config = {"configurable": {"thread_id": data['conversation_id']}}
+        session = agent_sessions.acquire(client_id())
+        try:
+            agent_executor, _ = get_agent()
+            stream = stream_agent_tokens if data.get('stream') else run_agent
+            stream = agent_stream(session, stream, input, agent_executor, config)
+        except Exception:
+            session.release()
+            raise
         return Response(
-            stream_with_context(run_agent(input, app.agent_executor, config)),
+            stream_with_context(stream),
             mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Content-Type': 'text/event-stream',
-                'Connection': 'keep-alive',
-                'X-Accel-Buffering': 'no'
-            }
+            headers=SSE_HEADERS
         )
+    except AdmissionRejected as e:
+        return rejected_response(e)
     except Exception as e:
         app.logger.error(f"Unexpected error in chat endpoint: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
+# Seconds clients may reuse /rewards without revalidating (0: always revalidate with the ETag)
+REWARDS_MAX_AGE = int(os.environ.get('REWARDS_MAX_AGE', '0'))
+rewards_response_cache = VersionedResponseCache()
+
+REWARD_QUERY_PARAMS = {'status', 'repository', 'min_amount', 'max_amount', 'fields', 'include_body', 'cursor', 'limit'}
+
+def parse_optional_int(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InputValidationError(f"'{name}' must be an integer")
+
+def cached_rewards_response(key, build_payload):
+    """
+    Serves a JSON payload derived from the rewards table from rewards_response_cache.
+    The payload is rebuilt only after a reward write by any process sharing the database
+    (db.rewards.get_rewards_version); If-None-Match requests get a 304.
+    A database error while building answers 500 and caches nothing, rather than an empty payload.
+    """
+    try:
+        body, etag = rewards_response_cache.get_or_build(
+            key,
+            get_rewards_version(),
+            lambda: app.json.dumps(build_payload()).encode()
+        )
+    except (InputValidationError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Unexpected error in {request.path} endpoint: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred'}), 500
+
+    response = Response(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"max-age={REWARDS_MAX_AGE}, must-revalidate" if REWARDS_MAX_AGE else "no-cache"
+    return response.make_conditional(request)
+
 @app.route("/rewards", methods=['GET'])
 def rewards():
+    """
+    Without query parameters, returns every reward as a list of rows (the format the frontend reads).
+    With any of status, repository, min_amount, max_amount, fields, include_body, cursor or limit,
+    returns one page of reward objects and the cursor of the next page.
+
+    Serialized responses are cached until the next reward write and served with a strong ETag,
+    so revalidations answer 304 after a single lookup of the table version.
+    """
+    return cached_rewards_response(('rewards', request.query_string), build_rewards_payload)
+
+def build_rewards_payload():
+    if not REWARD_QUERY_PARAMS.intersection(request.args):
+        return {'rewards': get_rewards()}
+
+    fields = request.args.get('fields')
+    page, next_cursor = query_rewards(
+        status=request.args.get('status'),
+        repository_name=request.args.get('repository'),
+        min_amount=parse_optional_int('min_amount'),
+        max_amount=parse_optional_int('max_amount'),
+        columns=fields.split(',') if fields else None,
+        include_body=request.args.get('include_body', 'false').lower() == 'true',
+        after_id=parse_optional_int('cursor'),
+        limit=parse_optional_int('limit') or 100
+    )
+    return {'rewards': page, 'next_cursor': next_cursor}
+
+@app.route("/rewards/search", methods=['GET'])
+def search():
+    """
+    Full-text search over reward issue titles and bodies, ranked by relevance.
+    Query parameters: q (required), status, repository, min_amount, max_amount, limit, and cursor
+    (the next_cursor of the previous page).
+    """
+    if not request.args.get('q'):
+        return jsonify({'error': "Missing 'q' query parameter"}), 400
+    return cached_rewards_response(('search', request.query_string), build_search_payload)
+
+def build_search_payload():
+    results, next_cursor = search_rewards(
+        request.args['q'],
+        status=request.args.get('status'),
+        repository_name=request.args.get('repository'),
+        min_amount=parse_optional_int('min_amount'),
+        max_amount=parse_optional_int('max_amount'),
+        limit=parse_optional_int('limit') or 20,
+        cursor=request.args.get('cursor')
+    )
+    return {'results': results, 'next_cursor': next_cursor}
+
+@app.route("/rewards/<int:reward_id>/claim-status", methods=['GET'])
+def reward_claim_status(reward_id):
+    """
+    On-chain state of a reward from the indexed contract events: the locked amount, whether the
+    issue is completed and which contributors claimed their share, up to indexed_block.
+    """
+    try:
+        status = get_reward_claim_status(reward_id)
+    except Exception as e:
+        app.logger.error(f"Unexpected error in {request.path} endpoint: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred'}), 500
+    if status is None:
+        return jsonify({'error': 'Reward not found'}), 404
+    return jsonify(status)
+
+@app.route("/contributors/<github_id>/claims", methods=['GET'])
+def contributor_claims(github_id):
+    """
+    Completed issues a GitHub user contributed to, with whether each reward share was claimed.
+    """
+    try:
+        claims = get_github_id_claims(github_id)
+    except Exception as e:
+        app.logger.error(f"Unexpected error in {request.path} endpoint: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred'}), 500
+    return jsonify({'github_id': github_id, 'claims': claims})
+
+@app.route("/blocks/analytics", methods=['GET'])
+def block_analytics():
+    """
+    Activity of a range of Base Sepolia blocks, given by start_block and end_block or by
+    start_time and end_time (unix seconds), both inclusive: transactions, value transferred,
+    distinct senders and receivers, and gas price percentiles (percentiles, e.g. 50,90,99).
+    """
     try:
-        rewards = get_rewards()
-        return jsonify({'rewards': rewards}), 200
+        start_block, end_block = parse_optional_int('start_block'), parse_optional_int('end_block')
+        start_time, end_time = parse_optional_int('start_time'), parse_optional_int('end_time')
+        percentiles = request.args.get('percentiles')
+        try:
+            percentiles = [float(p) for p in percentiles.split(',')] if percentiles else DEFAULT_PERCENTILES
+        except ValueError:
+            raise InputValidationError("'percentiles' must be a comma-separated list of numbers")
+        if start_block is not None and end_block is not None:
+            summary = get_block_analytics().summarize_range(start_block, end_block, percentiles)
+        elif start_time is not None and end_time is not None:
+            summary = get_block_analytics().summarize_time_window(start_time, end_time, percentiles)
+        else:
+            raise InputValidationError("Either start_block and end_block or start_time and end_time are required")
+    except (InputValidationError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except BlockSourceError as e:
+        # The node failed, not the request: 503 when it cannot be reached, 502 when it answered badly
+        app.logger.warning(f"Node error in {request.path} endpoint: {str(e)}")
+        status = 503 if isinstance(e, BlockSourceUnavailable) else 502
+        return jsonify({'error': 'The Base Sepolia node is unavailable' if status == 503 else 'The Base Sepolia node failed the request'}), status
     except Exception as e:
-        app.logger.error(f"Unexpected error in rewards endpoint: {str(e)}")
+        app.logger.error(f"Unexpected error in {request.path} endpoint: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred'}), 500
+    return jsonify(summary)
 
 POLL_INTERVAL = int(os.environ.get('POLL_INTERVAL', '30'))
-def periodically_start_monitors(socketio, agent_executor, config, check_interval=300):
+GITHUB_WEBHOOK_SECRET = os.environ.get('GITHUB_WEBHOOK_SECRET')
+# With webhooks configured, polling only reconciles missed deliveries
+RECONCILE_POLL_INTERVAL = int(os.environ.get('RECONCILE_POLL_INTERVAL', '1800'))
+
+monitor_scheduler = IssuePollScheduler(
+    socketio, get_agent,
+    sessions=agent_sessions,
+    refresh_interval=POLL_INTERVAL,
+    poll_interval=RECONCILE_POLL_INTERVAL if GITHUB_WEBHOOK_SECRET else ISSUE_POLL_INTERVAL
+)
+
+# Contract transactions go through the agent's CDP wallet unless TX_PRIVATE_KEY is set
+configure_transaction_submitter(get_wallet)
+# Runs the stages of the settlement jobs queued by the evaluate_contribution tool
+settlement_worker = SettlementWorker()
+
+@app.route("/webhooks/github", methods=['POST'])
+def github_webhook():
+    """
+    Receives GitHub `issues` and `pull_request` webhook deliveries.
+    Closed rewarded issues are processed immediately instead of waiting for the next poll.
+    """
+    body = request.get_data()
+    if not verify_signature(GITHUB_WEBHOOK_SECRET, body, request.headers.get('X-Hub-Signature-256')):
+        return jsonify({'error': 'Invalid signature'}), 401
+
+    event = request.headers.get('X-GitHub-Event', '')
+    delivery_id = request.headers.get('X-GitHub-Delivery')
+    if not delivery_id:
+        return jsonify({'error': 'Missing delivery id'}), 400
+    # Recorded before processing, so a concurrent redelivery is not processed twice
+    recorded = record_delivery(delivery_id, event)
+    if recorded is None:
+        # GitHub redelivers deliveries that failed
+        return jsonify({'error': 'The delivery could not be recorded'}), 503
+    if not recorded:
+        return jsonify({'status': 'duplicate'}), 200
+
+    try:
+        payload = json.loads(body)
+        if event == 'issues':
+            closed_issue = extract_closed_issue(payload)
+            if closed_issue and monitor_scheduler.submit_closed_issue(*closed_issue):
+                return jsonify({'status': 'queued'}), 202
+        elif event == 'pull_request':
+            # The linked issue is closed by GitHub as well; poll it now in case that delivery is lost
+            targets = extract_referenced_issues(payload)
+            if targets and monitor_scheduler.poll_now(targets):
+                return jsonify({'status': 'queued'}), 202
+        return jsonify({'status': 'ignored'}), 200
+    except Exception as e:
+        app.logger.error(f"Unexpected error in webhook endpoint: {str(e)}")
+        forget_delivery(delivery_id)
+        return jsonify({'error': 'An unexpected error occurred'}), 500
+
+def periodically_start_monitors(socketio, check_interval=POLL_INTERVAL):
     """
-    Periodically retrieves rewards and starts monitoring threads if new rewards are found.
-    check_interval is the time in seconds between each check.
+    Runs the issue poll scheduler, which reloads the rewards every check_interval seconds
+    and polls each open issue on its own deadline.
     """
-    while True:
-        start_monitors(socketio, agent_executor, config)
-        time.sleep(POLL_INTERVAL)
+    monitor_scheduler.refresh_interval = check_interval
+    monitor_scheduler.run_forever()
 
 if __name__ == "__main__":
     print("Starting Flask server...")
 
     # In Flask's debug mode (reloader), this block is executed twice.
     # Therefore, call start_monitors only in the process where the environment variable "WERKZEUG_RUN_MAIN" is "true".
+    # Several replicas sharing agent.db can each run the monitor: they split the rewards through leases (db.reward_leases).
     if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
         import threading
         monitor_thread = threading.Thread(
             target=periodically_start_monitors,
-            args=(socketio, agent_executor, config),
+            args=(socketio,),
             daemon=True  # daemon=True ensures the thread exits when the main program does
         )
         monitor_thread.start()
-    # periodically_start_monitors(socketio, agent_executor, config)
+        # Settle closed issues (GitHub history, verdict, contract call, comments) in the background
+        settlement_worker.start()
+        # Record the rewards whose lock was confirmed while the server was down, and wait for the others
+        from agent.initialize_agent import resume_reward_locks
+        threading.Thread(target=resume_reward_locks, daemon=True).start()
+        # Index the contract events (reward locks, completions, claims) when INDEXER_RPC_URL is set
+        start_event_indexer()
+        # Build the agent in the background so the server starts accepting requests right away
+        threading.Thread(target=get_agent, daemon=True).start()
+    # periodically_start_monitors(socketio)
 
     socketio.run(app, host="0.0.0.0", port=os.environ.get('PORT', '5001'), debug=True)
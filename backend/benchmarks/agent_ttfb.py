@@ -0,0 +1,101 @@
+"""
+Measures time to first byte and to the first text of an agent reply for the three ways a
+reply reaches the client: /api/chat buffering the whole run, /api/agent streaming one event
+per agent step (run_agent) and token streaming (stream_agent_tokens). The agent is a fake
+that replays model latency: a tool call, the tool, then a streamed answer.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.agent_ttfb [--first-token 0.8] [--token-interval 0.02] [--tokens 150] [--tool 1.0]
+"""
+import argparse
+import json
+import time
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+from agent.run_agent import run_agent, stream_agent_tokens
+
+class FakeAgent:
+    """Mimics create_react_agent's stream() in the "updates" and "messages" stream modes."""
+
+    def __init__(self, first_token: float, token_interval: float, tokens: int, tool: float):
+        self.first_token = first_token
+        self.token_interval = token_interval
+        self.tokens = tokens
+        self.tool = tool
+
+    def _model_tokens(self, count):
+        time.sleep(self.first_token)
+        for i in range(count):
+            if i:
+                time.sleep(self.token_interval)
+            yield f"token{i} "
+
+    def stream(self, input, config, stream_mode="updates"):
+        agent = {"langgraph_node": "agent"}
+        tools = {"langgraph_node": "tools"}
+        tool_call = {"name": "get_wallet_details", "args": {}, "id": "call_1"}
+
+        # Step 1: the model decides to call a tool
+        for _ in self._model_tokens(5):
+            pass
+        if stream_mode == "messages":
+            yield AIMessageChunk(content="", tool_call_chunks=[{**tool_call, "args": "{}", "index": 0}]), agent
+        else:
+            yield {"agent": {"messages": [AIMessage(content="", tool_calls=[tool_call])]}}
+
+        # Step 2: the tool runs
+        time.sleep(self.tool)
+        tool_message = ToolMessage(content='{"network": "base-sepolia"}', tool_call_id="call_1", name=tool_call["name"])
+        if stream_mode == "messages":
+            yield tool_message, tools
+        else:
+            yield {"tools": {"messages": [tool_message]}}
+
+        # Step 3: the answer, token by token
+        chunks = []
+        for token in self._model_tokens(self.tokens):
+            chunks.append(token)
+            if stream_mode == "messages":
+                yield AIMessageChunk(content=token), agent
+        if stream_mode != "messages":
+            yield {"agent": {"messages": [AIMessage(content="".join(chunks))]}}
+
+def buffered(input, agent_executor, config):
+    """What /api/chat does without streaming: one response once the run is over."""
+    lines = list(run_agent(input, agent_executor, config))
+    yield json.dumps({"response": "".join(json.loads(line)["data"] for line in lines)})
+
+def measure(stream) -> tuple[float, float, float]:
+    start = time.perf_counter()
+    first_byte = first_text = None
+    for line in stream:
+        now = time.perf_counter() - start
+        if first_byte is None:
+            first_byte = now
+        event = json.loads(line).get("event")
+        if first_text is None and event in (None, "agent", "agent_delta"):
+            first_text = now
+    return first_byte, first_text, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--first-token", type=float, default=0.8)
+    parser.add_argument("--token-interval", type=float, default=0.02)
+    parser.add_argument("--tokens", type=int, default=150)
+    parser.add_argument("--tool", type=float, default=1.0)
+    args = parser.parse_args()
+
+    agent = FakeAgent(args.first_token, args.token_interval, args.tokens, args.tool)
+    config = {"configurable": {"thread_id": "benchmark"}}
+    print(f"{'mode':<34} {'first byte':>11} {'first text':>11} {'total':>8}")
+    for name, stream in (
+        ("/api/chat (buffered)", buffered),
+        ("/api/agent (per step)", run_agent),
+        ("token streaming", stream_agent_tokens),
+    ):
+        first_byte, first_text, total = measure(stream("hello", agent, config))
+        print(f"{name:<34} {first_byte:>10.2f}s {first_text:>10.2f}s {total:>7.2f}s")
+
+if __name__ == "__main__":
+    main()
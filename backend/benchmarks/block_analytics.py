@@ -0,0 +1,110 @@
+"""
+Summarizes a range of --blocks blocks of the fake node of benchmarks.latest_block (the
+fixtures in benchmarks/fixtures/blocks in turn, --latency seconds per request) in two ways:
+- one block at a time, building a dict per transaction and sets of addresses as
+  get_latest_block used to, with the percentiles of a sorted list,
+- with block_analytics.BlockAnalytics and --workers concurrent fetches,
+then queries BlockAnalytics again for a range overlapping the first by half, the same range,
+and a time window, reporting the time and the blocks fetched by each query.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.block_analytics [--blocks 500] [--workers 8] [--latency 0.02]
+"""
+import argparse
+import time
+from decimal import Decimal
+
+from agent.custom_actions.get_latest_block import BlockReader, DEPOSIT_TX_TYPE
+from benchmarks.latest_block import GENESIS_TIMESTAMP, FixtureBlockSource, FixtureChain, fixture_provider, load_fixtures
+from block_analytics import DEFAULT_PERCENTILES, BlockAnalytics
+
+def percentile(ordered, p):
+    """Linear interpolation between the closest ranks, as numpy.percentile does by default."""
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize_one_by_one(source, start_block, end_block):
+    senders, receivers, gas_prices = set(), set(), []
+    total_value = Decimal(0)
+    transactions_count = 0
+    for number in range(start_block, end_block + 1):
+        block = source.block(number)
+        for tx in block["transactions"]:
+            value = Decimal(int(tx["value"], 16)) / 10 ** 18
+            tx_data = {
+                "hash": tx["hash"],
+                "from": tx["from"],
+                "to": tx["to"] or "Contract Creation",
+                "value": value,
+                "gas_price": Decimal(int(tx["gasPrice"], 16)) / 10 ** 9 if tx.get("gasPrice") and tx.get("type") != DEPOSIT_TX_TYPE else None,
+            }
+            senders.add(tx_data["from"])
+            if tx["to"]:
+                receivers.add(tx_data["to"])
+            total_value += value
+            if tx_data["gas_price"] is not None:
+                gas_prices.append(float(tx_data["gas_price"]))
+            transactions_count += 1
+    gas_prices.sort()
+    return {
+        "transactions_count": transactions_count,
+        "total_value_transferred": float(total_value),
+        "unique_senders": len(senders),
+        "unique_receivers": len(receivers),
+        "total_unique_addresses": len(senders | receivers),
+        "gas_price_gwei": {f"p{p:g}": percentile(gas_prices, p) for p in DEFAULT_PERCENTILES},
+    }
+
+def matches(summary, expected):
+    return (all(summary[key] == expected[key] for key in ("transactions_count", "unique_senders", "unique_receivers", "total_unique_addresses"))
+            and abs(summary["total_value_transferred"] - expected["total_value_transferred"]) < 1e-6 * max(1, expected["total_value_transferred"])
+            and all(abs(summary["gas_price_gwei"][key] - value) < 1e-9 for key, value in expected["gas_price_gwei"].items()))
+
+def timed(chain, func):
+    requests = chain.requests
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, chain.requests - requests, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request of the fake node")
+    parser.add_argument("--bandwidth", type=float, default=50, help="MB/s downloaded from the fake node")
+    parser.add_argument("--scale", type=int, default=1, help="copies of the transactions of each fixture block")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.scale)
+    head = 10 ** 6
+    chain = FixtureChain([block for _, block in fixtures], head=head, latency=args.latency, bandwidth=args.bandwidth)
+    source = FixtureBlockSource(fixture_provider(chain))
+    analytics = BlockAnalytics(BlockReader(source), workers=args.workers)
+    start_block = head - 2 * args.blocks
+    end_block = start_block + args.blocks - 1
+    print(f"{args.blocks} blocks, {args.latency * 1000:.0f}ms per request, {args.workers} workers\n")
+
+    print(f"{'query':<28} {'time':>8} {'requests':>9} {'fetched':>8} {'transactions':>13} {'senders':>8} {'p50 gwei':>10}")
+    elapsed, requests, expected = timed(chain, lambda: summarize_one_by_one(source, start_block, end_block))
+    print(f"{'one by one, dicts and sets':<28} {elapsed:>7.2f}s {requests:>9} {args.blocks:>8} "
+          f"{expected['transactions_count']:>13,} {expected['unique_senders']:>8,} {expected['gas_price_gwei']['p50']:>10.6f}")
+
+    half = args.blocks // 2
+    middle = start_block + (end_block - start_block) // 2
+    queries = [
+        ("range, cold cache", lambda: analytics.summarize_range(start_block, end_block)),
+        ("range overlapping by half", lambda: analytics.summarize_range(start_block + half, end_block + half)),
+        ("same range again", lambda: analytics.summarize_range(start_block, end_block)),
+        ("time window, half range", lambda: analytics.summarize_time_window(
+            GENESIS_TIMESTAMP + 2 * (middle - half // 2), GENESIS_TIMESTAMP + 2 * (middle + half // 2))),
+    ]
+    for name, query in queries:
+        elapsed, requests, summary = timed(chain, query)
+        check = "" if name != "range, cold cache" or matches(summary, expected) else "  MISMATCH"
+        print(f"{name:<28} {elapsed:>7.2f}s {requests:>9} {summary['fetched_blocks']:>8} "
+              f"{summary['transactions_count']:>13,} {summary['unique_senders']:>8,} {summary['gas_price_gwei']['p50']:>10.6f}{check}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Simulates long-running /api/agent traffic (many conversations, a few turns each) and
+reports the Python heap held by the checkpointer: langgraph's MemorySaver, which keeps
+every conversation forever, against agent.checkpointer.SqliteCheckpointer.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.checkpointer [--conversations 5000] [--turns 4] [--message-size 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+import db.setup
+from agent.checkpointer import SqliteCheckpointer
+
+def simulate(saver, conversations: int, turns: int, message_size: int, report_every: int) -> None:
+    message = "x" * message_size
+    tracemalloc.start()
+    start = time.perf_counter()
+    for conversation in range(conversations):
+        config = {"configurable": {"thread_id": f"conversation-{conversation}", "checkpoint_ns": ""}}
+        messages = []
+        for turn in range(turns):
+            # Each turn reloads the thread, as the agent does at the start of a run
+            saver.get_tuple(config)
+            messages = messages + [f"{turn}:{message}"]
+            checkpoint = empty_checkpoint()
+            checkpoint["channel_values"] = {"messages": messages}
+            config = saver.put(config, checkpoint, {"source": "loop", "step": turn, "writes": {}}, {})
+        if (conversation + 1) % report_every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            elapsed = time.perf_counter() - start
+            print(f"  {conversation + 1:>7,} conversations  heap {current / 2**20:>8.1f} MiB  "
+                  f"{(conversation + 1) * turns / elapsed:>8,.0f} checkpoints/s")
+    tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--message-size", type=int, default=2000)
+    args = parser.parse_args()
+    report_every = max(args.conversations // 5, 1)
+
+    print("MemorySaver")
+    simulate(MemorySaver(), args.conversations, args.turns, args.message_size, report_every)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        db.setup.setup()
+        print("SqliteCheckpointer")
+        simulate(SqliteCheckpointer(), args.conversations, args.turns, args.message_size, report_every)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Replays a long donation chat (each turn: user message, tool call, tool output, answer) and
+reports the prompt tokens of the agent's LLM call per turn, sending the whole history as
+before against agent.context_policy.ContextPolicy. The summarizer is a fake LLM returning a
+fixed-size summary, so no API key is needed; its own input tokens are reported separately.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.context_policy [--turns 100] [--tool-output-size 4000]
+"""
+import argparse
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+import constants
+from agent.context_policy import ContextPolicy
+from custom_actions.contribution_prompt import count_tokens
+
+class FakeSummarizer:
+    """Stands in for the chat model: answers with the last words of the prompt, like a summary of bounded size."""
+
+    def __init__(self, words: int = 180):
+        self.words = words
+        self.calls = 0
+        self.input_tokens = 0
+
+    def invoke(self, messages, config=None):
+        self.calls += 1
+        text = "\n".join(message.content for message in messages)
+        self.input_tokens += count_tokens(text)
+        return AIMessage(content=" ".join(text.split()[-self.words:]))
+
+def prompt_tokens(messages) -> int:
+    tokens = 0
+    for message in messages:
+        tokens += count_tokens(str(message.content))
+        if isinstance(message, AIMessage) and message.tool_calls:
+            tokens += count_tokens(str(message.tool_calls))
+    return tokens
+
+def turn_messages(turn: int, tool_output_size: int):
+    call_id = f"call_{turn}"
+    tool_output = f'{{"turn": {turn}, "wallet": "0x{turn:040x}", "balances": "{"0" * tool_output_size}"}}'
+    return [
+        HumanMessage(content=(
+            f"I want to lock a reward of {turn * 10} USD for issue {turn} in naizo01/agentic. "
+            f"My address is 0x{turn:040x}. Please prepare the data I need to sign."
+        ), id=f"human-{turn}"),
+        AIMessage(content="", tool_calls=[{"name": "get_wallet_details", "args": {}, "id": call_id}], id=f"call-{turn}"),
+        ToolMessage(content=tool_output, tool_call_id=call_id, name="get_wallet_details", id=f"tool-{turn}"),
+        AIMessage(content=(
+            f"Here is the data to sign: {{'repositoryName': 'naizo01/agentic', 'issueId': {turn}, "
+            f"'reward': {turn * 10}, 'userAddress': '0x{turn:040x}'}}. The signature is requested separately."
+        ), id=f"answer-{turn}"),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--tool-output-size", type=int, default=4000)
+    args = parser.parse_args()
+
+    summarizer = FakeSummarizer()
+    policy = ContextPolicy(constants.AGENT_PROMPT, llm=summarizer)
+    report = {1, 5, 10, 25, 50, 75, args.turns}
+
+    messages = []
+    full_total = policy_total = 0
+    policy_seconds = 0.0
+    print(f"{'turn':>5} {'full history':>13} {'context policy':>15}")
+    for turn in range(1, args.turns + 1):
+        new_messages = turn_messages(turn, args.tool_output_size)
+        # The agent calls the LLM once after the user message and once after the tool output
+        for visible in (1, 3):
+            state = {"messages": messages + new_messages[:visible]}
+            full = prompt_tokens([SystemMessage(content=constants.AGENT_PROMPT)] + state["messages"])
+            start = time.perf_counter()
+            bounded = prompt_tokens(policy(state))
+            policy_seconds += time.perf_counter() - start
+            full_total += full
+            policy_total += bounded
+            if visible == 1 and turn in report:
+                print(f"{turn:>5} {full:>13,} {bounded:>15,}")
+        messages += new_messages
+
+    print(f"\nprompt tokens over {args.turns} turns: full history {full_total:,}, context policy {policy_total:,}")
+    print(f"summarizer: {summarizer.calls} calls, {summarizer.input_tokens:,} input tokens")
+    print(f"context policy overhead: {policy_seconds * 1000 / (2 * args.turns):.2f} ms per LLM call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measures get_rewards / add_reward throughput with concurrent readers,
+comparing a new connection per call (rollback journal) with the shared
+thread-local WAL connections of db.connection.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.db_concurrency [--readers 8] [--seconds 5] [--rows 1000]
+"""
+import argparse
+import contextlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import db.connection
+import db.rewards
+import db.setup
+from db.rewards import add_reward, get_rewards
+
+@contextlib.contextmanager
+def connect_per_call(path=db.connection.DB_PATH):
+    # The previous behaviour: a fresh connection with the default journal for every call
+    con = sqlite3.connect(path)
+    try:
+        with con:
+            yield con
+    finally:
+        con.close()
+
+def run(readers: int, seconds: float) -> tuple[float, float]:
+    stop = threading.Event()
+    counts = {"read": 0, "write": 0}
+    lock = threading.Lock()
+
+    def reader():
+        done = 0
+        while not stop.is_set():
+            get_rewards()
+            done += 1
+        with lock:
+            counts["read"] += done
+
+    def writer():
+        done = 0
+        while not stop.is_set():
+            add_reward("bench/writes", done % 100, 1, "title", "body")
+            done += 1
+        with lock:
+            counts["write"] += done
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counts["read"] / seconds, counts["write"] / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    for mode in ("per-call", "pooled"):
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            db.setup.setup()
+            for issue_id in range(args.rows):
+                add_reward("bench/seed", issue_id, 10, f"Issue {issue_id}", "body " * 50)
+            db.connection.close_connections()
+
+            if mode == "per-call":
+                # Keep the rollback journal the old code ran with
+                with sqlite3.connect(db.connection.DB_PATH) as con:
+                    con.execute("PRAGMA journal_mode=DELETE")
+                db.rewards.get_connection = connect_per_call
+            else:
+                db.rewards.get_connection = db.connection.get_connection
+
+            reads, writes = run(args.readers, args.seconds)
+            print(f"{mode:<9} readers={args.readers} get_rewards={reads:,.0f} ops/s add_reward={writes:,.0f} ops/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Catches event_indexer.EventIndexer up on a fake chain of --blocks blocks holding the
+RewardLocked, IssueCompleted and RewardClaimed events of --issues issues (some of them in one
+dense burst), with a node that rejects eth_getLogs ranges over --node-max-range blocks or
+--node-max-results logs. Reports:
+- catch-up time, eth_getLogs requests and peak Python memory,
+- that an indexer stopped halfway and restarted ends with every event exactly once,
+- that a reorg of the last --reorg blocks is undone and the new blocks indexed,
+- the latency of claim status lookups by reward id and by GitHub id.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.event_indexer [--blocks 1000000] [--issues 5000] [--latency 0.01]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+
+CONTRACT = "0x00000000000000000000000000000000000000aa"
+
+class FakeLogChain:
+    """Serves the events of a generated history through the EventIndexer log source interface."""
+
+    def __init__(self, args):
+        from eth_abi import encode
+        from eth_utils import keccak
+
+        self.args = args
+        self.encode = encode
+        self.keccak = keccak
+        self.head_block = args.blocks
+        self.fork = {}  # block number -> fork id, for blocks replaced by a reorg
+        self.requests = 0
+        self.lock = threading.Lock()
+        rng = random.Random(1)
+        self.events = []  # (block, kind, repository, issue id, github id)
+        burst = range(args.blocks // 2, args.blocks // 2 + 200)
+        for issue_id in range(1, args.issues + 1):
+            repository = f"bench/repo-{issue_id % 20}"
+            # A tenth of the issues are locked in a burst of 200 blocks, the last ones in the blocks the reorg replaces
+            if issue_id > args.issues - 5:
+                locked = args.blocks - rng.randrange(0, min(args.reorg, 5))
+            elif issue_id % 10 == 0:
+                locked = rng.choice(burst)
+            else:
+                locked = rng.randrange(1, args.blocks - 20)
+            completed = min(args.blocks, locked + rng.randrange(1, 20))
+            self.events.append((locked, "RewardLocked", repository, issue_id, None))
+            self.events.append((completed, "IssueCompleted", repository, issue_id, None))
+            if issue_id % 2 == 0:
+                self.events.append((min(args.blocks, completed + 1), "RewardClaimed", repository, issue_id, "alice"))
+        self.events.sort()
+        self.blocks = [event[0] for event in self.events]
+
+    def topic(self, signature):
+        return self.keccak(text=signature)
+
+    def head(self):
+        return self.head_block
+
+    def block_hash(self, block_number):
+        if block_number > self.head_block:
+            raise ValueError(f"Block {block_number} not found")
+        return "0x" + self.keccak(text=f"{block_number}:{self.fork.get(block_number, 0)}").hex()
+
+    def get_logs(self, contract_address, from_block, to_block, topics):
+        import bisect
+
+        time.sleep(self.args.latency)
+        with self.lock:
+            self.requests += 1
+        if to_block - from_block + 1 > self.args.node_max_range:
+            raise ValueError(f"block range is too wide (max {self.args.node_max_range})")
+        start, end = bisect.bisect_left(self.blocks, from_block), bisect.bisect_right(self.blocks, to_block)
+        if end - start > self.args.node_max_results:
+            raise ValueError(f"query returned more than {self.args.node_max_results} results")
+        return [self.log(index, self.events[index]) for index in range(start, end)]
+
+    def log(self, index, event):
+        block, kind, repository, issue_id, github_id = event
+        topics = [self.topic({
+            "RewardLocked": "RewardLocked(string,uint256,uint256,address,address)",
+            "IssueCompleted": "IssueCompleted(string,uint256,string[])",
+            "RewardClaimed": "RewardClaimed(string,uint256,string,address)",
+        }[kind]), self.keccak(text=repository), issue_id.to_bytes(32, "big")]
+        if kind == "RewardLocked":
+            data = self.encode(["uint256", "address", "address"], [10 ** 20, CONTRACT, CONTRACT])
+        elif kind == "IssueCompleted":
+            data = self.encode(["string[]"], [["alice", "bob"]])
+        else:
+            topics.append(self.keccak(text=github_id))
+            data = self.encode(["address"], [CONTRACT])
+        return {
+            "address": CONTRACT,
+            "topics": topics,
+            "data": data,
+            "blockNumber": block,
+            "logIndex": index,
+            "transactionHash": self.keccak(text=f"{index}:{self.fork.get(block, 0)}"),
+        }
+
+    def reorg(self, depth, new_blocks):
+        """Replaces the last depth blocks, dropping their events, and mines new_blocks more."""
+        with self.lock:
+            fork_from = self.head_block - depth + 1
+            for block in range(fork_from, self.head_block + new_blocks + 1):
+                self.fork[block] = 1
+            kept = [event for event in self.events if event[0] < fork_from]
+            dropped = len(self.events) - len(kept)
+            self.events = kept
+            self.blocks = [event[0] for event in kept]
+            self.head_block += new_blocks
+            return dropped
+
+def count_events():
+    from db.connection import get_connection
+    with get_connection() as con:
+        cur = con.cursor()
+        return sum(
+            cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("reward_locked_events", "issue_completed_events", "reward_claimed_events")
+        )
+
+def catch_up(indexer):
+    while indexer.index_once():
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=1_000_000)
+    parser.add_argument("--issues", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds per eth_getLogs request")
+    parser.add_argument("--node-max-range", type=int, default=50_000)
+    parser.add_argument("--node-max-results", type=int, default=2000)
+    parser.add_argument("--reorg", type=int, default=10, help="depth of the simulated reorg")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    import db.setup
+    from db.rewards import add_reward
+    from event_indexer import EventIndexer, get_reward_claim_status, get_github_id_claims
+    db.setup.setup()
+    for issue_id in range(1, args.issues + 1):
+        add_reward(f"bench/repo-{issue_id % 20}", issue_id, 100, f"Issue {issue_id}", "")
+
+    chain = FakeLogChain(args)
+    expected = len(chain.events)
+    print(f"{args.blocks:,} blocks, {expected:,} events, node limits: {args.node_max_range:,} blocks / {args.node_max_results:,} logs\n")
+
+    # Half of the catch-up, then a new indexer resumes from the stored cursor
+    first = EventIndexer(chain, CONTRACT, start_block=1, poll_interval=0)
+    tracemalloc.start()
+    started = time.perf_counter()
+    while first.cursor() < args.blocks // 2 and first.index_once():
+        pass
+    stopped_at = first.cursor()
+    second = EventIndexer(chain, CONTRACT, start_block=1, poll_interval=0)
+    catch_up(second)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    indexed = count_events()
+    print(f"catch-up          {elapsed:>7.2f}s  {chain.requests} eth_getLogs requests, {args.blocks / elapsed:,.0f} blocks/s, peak {peak / 2 ** 20:.1f} MiB")
+    print(f"resume            stopped at block {stopped_at:,}, restarted: {indexed:,} of {expected:,} events stored")
+
+    dropped = chain.reorg(args.reorg, new_blocks=5)
+    catch_up(second)
+    after_reorg = count_events()
+    print(f"reorg of {args.reorg} blocks  {dropped} events dropped by the chain, {indexed - after_reorg} removed from the index "
+          f"({'ok' if after_reorg == len(chain.events) else 'MISMATCH'})")
+
+    lookups = 1000
+    started = time.perf_counter()
+    for reward_id in range(1, lookups + 1):
+        get_reward_claim_status(reward_id)
+    by_reward = (time.perf_counter() - started) / lookups
+    started = time.perf_counter()
+    claims = get_github_id_claims("alice")
+    by_github_id = time.perf_counter() - started
+    claimed = sum(1 for claim in claims if claim["claimed"])
+    print(f"lookup by reward  {by_reward * 1000:>7.2f}ms")
+    print(f"lookup by GitHub  {by_github_id * 1000:>7.2f}ms  ({len(claims):,} issues, {claimed:,} claimed)")
+
+if __name__ == "__main__":
+    main()
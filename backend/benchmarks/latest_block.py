@@ -0,0 +1,218 @@
+"""
+Compares the previous get_latest_block, which built a Web3 client per call, checked the
+connection and summed the transactions in a Decimal loop, with the BlockReader of
+agent.custom_actions.get_latest_block, on the blocks in benchmarks/fixtures/blocks served by a
+fake node with --latency seconds per request and --bandwidth MB/s. Reports:
+- the time to summarize each fixture block once downloaded (web3 formatting and loop vs columns),
+- over --calls tool calls with a new head every --calls-per-block calls: the latency of a call,
+  the requests and the megabytes downloaded, without and with head tracking.
+
+The fixtures follow the eth_getBlockByNumber results of Base Sepolia (an L1 info deposit, then
+transfers, token calls and contract creations); --record replaces them with blocks of a node.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.latest_block [--calls 30] [--calls-per-block 3] [--scale 1]
+    poetry run python -m benchmarks.latest_block --record 3 --rpc-url https://sepolia.base.org
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+
+from agent.custom_actions.get_latest_block import BlockColumns, BlockReader, Web3BlockSource
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "blocks")
+GENESIS_TIMESTAMP = 1_695_768_288
+
+class FixtureChain:
+    """
+    A node whose blocks are the fixtures in turn, one every 2 seconds, each response decoded
+    from its JSON text.
+    """
+
+    def __init__(self, fixtures, head, latency, bandwidth):
+        self.fixtures = [json.dumps(block) for block in fixtures]
+        self.headers = [json.dumps({**block, "transactions": [tx["hash"] for tx in block["transactions"]]}) for block in fixtures]
+        self.head = head
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def block_hash(self, number):
+        # The parent of block 0 has the zero hash
+        return "0x" + (number + 1).to_bytes(32, "big").hex()
+
+    def request(self, method, params):
+        if method == "eth_blockNumber":
+            text = json.dumps(hex(self.head))
+        elif method == "eth_getBlockByNumber":
+            number = self.head if params[0] == "latest" else int(params[0], 16)
+            text = (self.fixtures if params[1] else self.headers)[number % len(self.fixtures)]
+        elif method == "web3_clientVersion":
+            text = '"fixture"'
+        else:
+            raise ValueError(f"Unsupported method {method}")
+        with self.lock:
+            self.requests += 1
+            self.bytes += len(text)
+        time.sleep(self.latency + len(text) / (self.bandwidth * 10 ** 6))
+        result = json.loads(text)
+        if method == "eth_getBlockByNumber":
+            result.update(number=hex(number), hash=self.block_hash(number), parentHash=self.block_hash(number - 1),
+                          timestamp=hex(GENESIS_TIMESTAMP + 2 * number))
+        return {"jsonrpc": "2.0", "id": self.requests, "result": result}
+
+def fixture_provider(chain):
+    from web3.providers.base import JSONBaseProvider
+
+    class FixtureProvider(JSONBaseProvider):
+        def make_request(self, method, params):
+            return chain.request(method, params)
+
+        def is_connected(self, show_traceback=False):
+            return self.make_request("web3_clientVersion", [])["result"] is not None
+
+    return FixtureProvider()
+
+class FixtureBlockSource(Web3BlockSource):
+    def __init__(self, provider):
+        self.rpc_url = "fixtures"
+        self.provider = provider
+
+def previous_get_latest_block(provider):
+    """The previous get_latest_block, with provider in place of a new HTTPProvider."""
+    from web3 import Web3
+
+    w3 = Web3(provider)
+    if not w3.is_connected():
+        raise Exception("Failed to connect to Base Sepolia network")
+    latest_block = w3.eth.get_block('latest', full_transactions=True)
+    sender_addresses = set()
+    receiver_addresses = set()
+    total_value_eth = Decimal('0')
+    transactions_data = []
+    for tx in latest_block.transactions:
+        sender_addresses.add(tx["from"])
+        if tx["to"]:
+            receiver_addresses.add(tx["to"])
+        tx_value_eth = Decimal(str(w3.from_wei(tx["value"], 'ether')))
+        total_value_eth += tx_value_eth
+        transactions_data.append({
+            "hash": tx.hash.hex(),
+            "from": tx["from"],
+            "to": tx["to"] if tx["to"] else "Contract Creation",
+            "value": tx_value_eth,
+            "gas_price": w3.from_wei(tx["gasPrice"], 'gwei') if "gasPrice" in tx else None,
+            "gas": tx["gas"]
+        })
+    return {
+        "block_number": latest_block.number,
+        "hash": latest_block.hash.hex(),
+        "transactions_count": len(latest_block.transactions),
+        "total_value_transferred": float(total_value_eth),
+        "address_summary": {
+            "unique_senders": list(sender_addresses),
+            "unique_receivers": list(receiver_addresses),
+            "total_unique_addresses": len(sender_addresses.union(receiver_addresses))
+        }
+    }
+
+def load_fixtures(scale):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.json"))):
+        with open(path) as file:
+            block = json.load(file)
+        # Bigger blocks repeat the transactions after the deposit, with other senders
+        user_transactions = block["transactions"][1:]
+        for copy in range(1, scale):
+            block["transactions"].extend({**tx, "from": tx["from"][:-4] + f"{copy:04x}"} for tx in user_transactions)
+        fixtures.append((os.path.splitext(os.path.basename(path))[0], block))
+    return sorted(fixtures, key=lambda fixture: len(fixture[1]["transactions"]))
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def compare_summaries(fixtures, repeat):
+    print(f"{'block':<10} {'txs':>6} {'previous':>10} {'columns':>10} {'speedup':>8}")
+    for name, block in fixtures:
+        chain = FixtureChain([block], head=1, latency=0, bandwidth=10 ** 6)
+        provider = fixture_provider(chain)
+        source = FixtureBlockSource(provider)
+        previous, expected = best_of(repeat, lambda: previous_get_latest_block(provider))
+        columns, summary = best_of(repeat, lambda: BlockColumns(source.block(source.head())).summary())
+        same = (summary["address_summary"]["total_unique_addresses"] == expected["address_summary"]["total_unique_addresses"]
+                and set(summary["address_summary"]["unique_senders"]) == set(expected["address_summary"]["unique_senders"])
+                and abs(summary["total_value_transferred"] - expected["total_value_transferred"]) < 1e-9)
+        print(f"{name:<10} {len(block['transactions']):>6} {previous * 1000:>8.2f}ms {columns * 1000:>8.2f}ms "
+              f"{previous / columns:>7.1f}x{'' if same else '  MISMATCH'}")
+
+def simulate_calls(name, fixtures, args, call, on_new_head=None):
+    chain = FixtureChain([block for _, block in fixtures], head=1000, latency=args.latency, bandwidth=args.bandwidth)
+    provider = fixture_provider(chain)
+    source = FixtureBlockSource(provider)
+    reader = BlockReader(source, poll_interval=3600)
+    background = 0.0
+    timings = []
+    for i in range(args.calls):
+        if i % args.calls_per_block == 0:
+            chain.head += 1
+            if on_new_head:
+                start = time.perf_counter()
+                on_new_head(reader)
+                background += time.perf_counter() - start
+        start = time.perf_counter()
+        summary = call(provider, reader)
+        timings.append(time.perf_counter() - start)
+        assert summary["block_number"] == chain.head
+    timings.sort()
+    print(f"{name:<24} {sum(timings) / len(timings) * 1000:>8.1f}ms {timings[len(timings) // 2] * 1000:>8.1f}ms "
+          f"{chain.requests:>9} {chain.bytes / 10 ** 6:>7.2f}MB {background:>9.2f}s")
+
+def record(args):
+    source = Web3BlockSource(args.rpc_url)
+    head = source.head()
+    for number in range(head - args.record + 1, head + 1):
+        block = source.block(number)
+        path = os.path.join(FIXTURES_DIR, f"block_{number}.json")
+        with open(path, "w") as file:
+            json.dump(block, file, indent=1)
+        print(f"Recorded block {number} ({len(block['transactions'])} transactions) in {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=30)
+    parser.add_argument("--calls-per-block", type=int, default=3, help="tool calls between two new heads")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request of the fake node")
+    parser.add_argument("--bandwidth", type=float, default=20, help="MB/s downloaded from the fake node")
+    parser.add_argument("--scale", type=int, default=1, help="copies of the transactions of each fixture block")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--record", type=int, help="record this many of the latest blocks of --rpc-url as fixtures")
+    parser.add_argument("--rpc-url")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args)
+        return
+    fixtures = load_fixtures(args.scale)
+    compare_summaries(fixtures, args.repeat)
+
+    print(f"\n{args.calls} calls, a new head every {args.calls_per_block} calls, "
+          f"{args.latency * 1000:.0f}ms per request, {args.bandwidth:g} MB/s")
+    print(f"{'mode':<24} {'mean':>10} {'median':>10} {'requests':>9} {'download':>9} {'background':>10}")
+    simulate_calls("previous", fixtures, args, lambda provider, reader: previous_get_latest_block(provider))
+    simulate_calls("shared provider, cache", fixtures, args, lambda provider, reader: reader.latest().summary())
+    simulate_calls("head tracking", fixtures, args, lambda provider, reader: reader.latest().summary(),
+                   on_new_head=lambda reader: reader.poll())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Runs several issue monitor processes (websocket_module.IssuePollScheduler) against one
+SQLite database, with GitHub replaced by a fake of fixed latency, and reports:
+- poll throughput for 1, 2, 4... processes (each process has the same poll pool size),
+- how evenly the reward leases are split and whether a closed issue is processed twice,
+- how long the survivors take to pick up the rewards of a killed process.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.monitor_partition [--processes 1 2 4] [--rewards 2000] [--seconds 8] [--latency 0.05]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+def monitor_process(index, database_dir, args, reports, processed):
+    os.chdir(database_dir)
+    import websocket_module
+    from db.rewards import mark_reward_as_merged
+
+    polls = 0
+    polls_lock = threading.Lock()
+
+    def fetch_issues(targets):
+        nonlocal polls
+        time.sleep(args.latency)
+        with polls_lock:
+            polls += len(targets)
+        # Every closed_every-th issue is closed
+        return {
+            target: {"title": "", "body": "", "closed_at": "2024-01-01T00:00:00Z" if target[2] % args.closed_every == 0 else None}
+            for target in targets
+        }
+
+    def handle_closed_issue(socketio, agent_executor, config, issue_info):
+        processed.put((index, issue_info["number"]))
+        mark_reward_as_merged(f"{issue_info['owner']}/{issue_info['repository']}", issue_info["number"])
+
+    websocket_module.fetch_issues = fetch_issues
+    websocket_module.handle_closed_issue = handle_closed_issue
+    websocket_module.GITHUB_TOKEN = None  # one issue per request, as without a token
+
+    scheduler = websocket_module.IssuePollScheduler(
+        None, lambda: (None, None),
+        max_workers=args.poll_workers,
+        poll_interval=args.poll_interval,
+        refresh_interval=args.lease / 3,
+        lease_seconds=args.lease,
+        process_workers=2,
+    )
+    threading.Thread(target=scheduler.run_forever, daemon=True).start()
+    while True:
+        time.sleep(0.25)
+        with scheduler._cond:
+            owned = len(scheduler._targets) + len(scheduler._processing)
+        with polls_lock:
+            reports.put((index, time.monotonic(), polls, owned))
+
+def start_processes(count, database_dir, args, reports, processed):
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=monitor_process, args=(i, database_dir, args, reports, processed), daemon=True)
+        for i in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
+
+def collect(reports, seconds):
+    """Returns the latest (time, polls, owned) report of every process after `seconds`."""
+    latest = {}
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        try:
+            index, at, polls, owned = reports.get(timeout=0.1)
+        except Exception:
+            continue
+        latest[index] = (at, polls, owned)
+    return latest
+
+def create_database(args):
+    database_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(database_dir)
+    import db.setup
+    from db.connection import close_connections
+    from db.rewards import add_reward
+    try:
+        db.setup.setup()
+        for issue_id in range(1, args.rewards + 1):
+            add_reward("bench/monitor", issue_id, 1, f"Issue {issue_id}", "")
+    finally:
+        # The connection is bound to agent.db of this directory
+        close_connections()
+        os.chdir(cwd)
+    return database_dir
+
+def run(count, args):
+    database_dir = create_database(args)
+    context = multiprocessing.get_context("spawn")
+    reports, processed = context.Queue(), context.Queue()
+    processes = start_processes(count, database_dir, args, reports, processed)
+
+    # Leases settle within a few heartbeats
+    warm = collect(reports, args.lease + 2)
+    measured = collect(reports, args.seconds)
+    throughput = sum(
+        (measured[i][1] - warm[i][1]) / (measured[i][0] - warm[i][0])
+        for i in measured if i in warm and measured[i][0] > warm[i][0]
+    )
+    owned = [measured[i][2] for i in sorted(measured)]
+
+    failover = None
+    if count > 1:
+        processes[0].kill()
+        # Closed issues are merged meanwhile and leave the lease set
+        expected = sum(owned) - args.rewards // args.closed_every
+        killed_at = time.monotonic()
+        latest = {}
+        while time.monotonic() - killed_at < 3 * args.lease:
+            latest.update(collect(reports, 0.25))
+            survivors = [latest[i][2] for i in latest if i != 0]
+            if len(survivors) == count - 1 and sum(survivors) >= expected:
+                failover = time.monotonic() - killed_at
+                break
+
+    for process in processes:
+        process.kill()
+    handled = Counter()
+    while not processed.empty():
+        handled[processed.get()[1]] += 1
+    duplicates = sum(1 for times in handled.values() if times > 1)
+    return throughput, owned, len(handled), duplicates, failover
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rewards", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake GitHub request")
+    parser.add_argument("--poll-workers", type=int, default=4, help="concurrent GitHub requests per process")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--lease", type=float, default=3.0, help="lease seconds (heartbeat every third)")
+    parser.add_argument("--closed-every", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{args.rewards} rewards, {args.poll_workers} poll workers per process, {args.latency * 1000:.0f}ms per request\n")
+    print(f"{'processes':>9} {'polls/s':>9} {'leases per process':>24} {'closed':>7} {'twice':>6} {'failover':>9}")
+    for count in args.processes:
+        throughput, owned, closed, duplicates, failover = run(count, args)
+        failover_text = "-" if count == 1 else ("n/a" if failover is None else f"{failover:.1f}s")
+        print(f"{count:>9} {throughput:>9.0f} {str(owned):>24} {closed:>7} {duplicates:>6} {failover_text:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Reports the size of the commit/review evidence in the contribution-evaluation prompt
+before (Python repr of the raw history) and after build_evidence, which fits both in --budget.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.prompt_budget [--budget 12000]
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from custom_actions.contribution_prompt import (
+    PROMPT_TOKEN_BUDGET,
+    build_evidence,
+    count_tokens,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "pull_requests")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=int, default=PROMPT_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<32} {'before':>9} {'after':>9} {'budget':>9} {'ratio':>7} {'build ms':>9}")
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.json"))):
+        with open(path) as file:
+            fixture = json.load(file)
+        commit_history = fixture["commit_history"]
+        review_comment_list = fixture["review_comment_list"]
+
+        before = count_tokens(f"{commit_history}") + count_tokens(f"{review_comment_list}")
+        start = time.perf_counter()
+        commit_evidence, review_evidence = build_evidence(commit_history, review_comment_list, args.budget)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        after = count_tokens(commit_evidence) + count_tokens(review_evidence)
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        print(f"{name:<32} {before:>9} {after:>9} {args.budget:>9} {after / before:>7.2f} {elapsed_ms:>9.1f}")
+
+if __name__ == "__main__":
+    main()
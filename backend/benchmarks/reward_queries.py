@@ -0,0 +1,68 @@
+"""
+Compares the full-table get_rewards() with the paginated, projected query_rewards()
+on a synthetic rewards table.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.reward_queries [--rows 500000] [--open-ratio 0.05]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import db.setup
+from db.connection import get_connection
+from db.rewards import get_rewards, query_rewards, iter_rewards
+
+def populate(rows: int, open_ratio: float, body_size: int) -> None:
+    random.seed(0)
+    body = "x" * body_size
+    with get_connection() as con:
+        con.executemany(
+            """
+            INSERT INTO rewards(repository_name, issue_id, reward_amount, is_merged, issue_title, issue_body)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (f"org{i % 500}/repo{i % 37}", i, random.randint(1, 10_000), 0 if random.random() < open_ratio else 1, f"Issue {i}", body)
+                for i in range(rows)
+            )
+        )
+        con.execute("ANALYZE")
+
+def timed(label: str, func, repeat: int = 3) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<52} {best * 1000:>10.1f} ms  ({result} rows)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--open-ratio", type=float, default=0.05)
+    parser.add_argument("--body-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        db.setup.setup()
+        start = time.perf_counter()
+        populate(args.rows, args.open_ratio, args.body_size)
+        print(f"populated {args.rows:,} rows in {time.perf_counter() - start:.1f} s\n")
+
+        timed("get_rewards() (full table with bodies)", lambda: len(get_rewards()))
+        timed("monitor sweep: open rewards, 3 columns", lambda: sum(1 for _ in iter_rewards(
+            status="open", columns=("repository_name", "issue_id", "reward_amount"))))
+        timed("first page (100, default columns)", lambda: len(query_rewards()[0]))
+        _, cursor = query_rewards(limit=1000)
+        for _ in range(200):
+            _, cursor = query_rewards(after_id=cursor, limit=1000)
+        timed("page 200 via keyset cursor", lambda: len(query_rewards(after_id=cursor)[0]))
+        timed("repository filter, first page", lambda: len(query_rewards(repository_name="org7/repo7")[0]))
+        timed("open + amount range, first page", lambda: len(query_rewards(status="open", min_amount=9_000, max_amount=9_500)[0]))
+
+if __name__ == "__main__":
+    main()
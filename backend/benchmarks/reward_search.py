@@ -0,0 +1,79 @@
+"""
+Measures full-text search latency over a synthetic rewards table, for the first page and for
+a later page reached through the keyset cursor.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.reward_search [--rows 100000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import db.setup
+from db.connection import get_connection
+from db.search import search_rewards
+
+# Issue-tracker words first, padded with generated identifiers so term frequencies follow a Zipf curve
+COMMON_WORDS = (
+    "add fix refactor support crash error timeout parser cache wallet token reward contract "
+    "docs test flaky ci build release migration database index query api endpoint websocket "
+    "frontend button modal layout dark mode translation i18n performance memory leak race "
+    "condition deadlock upgrade dependency security vulnerability signature verification "
+    "pagination search filter sort export import csv json yaml config environment docker"
+).split()
+VOCABULARY = COMMON_WORDS + [f"term{i}" for i in range(20_000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+def sentence(words: int) -> str:
+    return " ".join(random.choices(VOCABULARY, weights=WEIGHTS, k=words))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    random.seed(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        db.setup.setup()
+        start = time.perf_counter()
+        with get_connection() as con:
+            con.executemany(
+                """
+                INSERT INTO rewards(repository_name, issue_id, reward_amount, is_merged, issue_title, issue_body)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    (f"org{i % 300}/repo{i % 23}", i, random.randint(1, 10_000), int(random.random() < 0.8), sentence(8), sentence(120))
+                    for i in range(args.rows)
+                )
+            )
+        print(f"inserted and indexed {args.rows:,} rows in {time.perf_counter() - start:.1f} s\n")
+
+        queries = [
+            ("single term", dict(text="deadlock")),
+            ("two terms", dict(text="memory leak")),
+            ("prefix while typing", dict(text="wallet sig")),
+            ("open rewards only", dict(text="race condition", status="open")),
+            ("repository + amount filter", dict(text="cache", repository_name="org7/repo7", min_amount=1000)),
+            ("broad terms", dict(text="parser error")),
+        ]
+        # The cursor of page 4 of the broad query, so page 5 is timed alone
+        cursor = None
+        for _ in range(4):
+            _, cursor = search_rewards("parser error", cursor=cursor)
+        queries.append(("broad terms, page 5", dict(text="parser error", cursor=cursor)))
+        for label, kwargs in queries:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results, _ = search_rewards(**kwargs)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            print(f"{label:<28} p50={timings[len(timings) // 2] * 1000:7.2f} ms  max={timings[-1] * 1000:7.2f} ms  ({len(results)} results)")
+
+if __name__ == "__main__":
+    main()
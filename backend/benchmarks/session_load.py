@@ -0,0 +1,118 @@
+"""
+Load test for agent admission control. Requests arrive faster than a fake LLM backend can
+serve them; the backend shares its capacity between all calls in flight, as a rate-limited
+API does. Compares running every request immediately (the previous behaviour) with
+session_scheduler.SessionScheduler: latency of served requests, rejections (429/503, and how
+fast they are answered) and latency of closed-issue processing in the priority lane.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.session_load [--seconds 20] [--overload 2.0] [--capacity 8] [--work 1.0]
+"""
+import argparse
+import random
+import threading
+import time
+
+from session_scheduler import SessionScheduler, AdmissionRejected
+
+class FakeLLM:
+    """Serves calls of `work` seconds; with more than `capacity` calls in flight, all of them slow down."""
+
+    TICK = 0.01
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def call(self, work: float) -> None:
+        with self.lock:
+            self.active += 1
+        try:
+            remaining = work
+            while remaining > 0:
+                time.sleep(self.TICK)
+                with self.lock:
+                    share = min(1.0, self.capacity / self.active)
+                remaining -= self.TICK * share
+        finally:
+            with self.lock:
+                self.active -= 1
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def run(scheduler, llm, seconds, rate, work, clients, monitor_every):
+    results = {"served": [], "rejected": {}, "rejected_latency": [], "monitor": []}
+    lock = threading.Lock()
+
+    def request(client, priority):
+        start = time.monotonic()
+        try:
+            session = scheduler.acquire(client, priority=priority) if scheduler else None
+        except AdmissionRejected as e:
+            with lock:
+                results["rejected"][e.status] = results["rejected"].get(e.status, 0) + 1
+                results["rejected_latency"].append(time.monotonic() - start)
+            return
+        try:
+            llm.call(work * random.uniform(0.5, 1.5))
+        finally:
+            if session:
+                session.release()
+        with lock:
+            results["monitor" if priority else "served"].append(time.monotonic() - start)
+
+    threads = []
+    end = time.monotonic() + seconds
+    next_monitor = time.monotonic()
+    while time.monotonic() < end:
+        time.sleep(random.expovariate(rate))
+        # One in five requests comes from the same heavy client
+        client = "heavy" if random.random() < 0.2 else f"client-{random.randrange(clients)}"
+        arrivals = [(client, False)]
+        if time.monotonic() >= next_monitor:
+            next_monitor += monitor_every
+            arrivals.append(("issue-monitor", True))
+        for args in arrivals:
+            thread = threading.Thread(target=request, args=args)
+            thread.start()
+            threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return results
+
+def report(name, results):
+    served = results["served"]
+    rejected = results["rejected"]
+    print(f"{name}")
+    print(f"  served {len(served):>5}   p50 {percentile(served, 0.5):6.2f}s   p99 {percentile(served, 0.99):6.2f}s")
+    if rejected:
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(rejected.items()))
+        print(f"  rejected ({statuses})   p99 answered in {percentile(results['rejected_latency'], 0.99):.2f}s")
+    monitor = results["monitor"]
+    print(f"  issue processing {len(monitor):>3}   p50 {percentile(monitor, 0.5):6.2f}s   p99 {percentile(monitor, 0.99):6.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--overload", type=float, default=2.0, help="arrival rate as a multiple of the backend capacity")
+    parser.add_argument("--capacity", type=int, default=8, help="concurrent calls the fake LLM serves at full speed")
+    parser.add_argument("--work", type=float, default=1.0, help="mean seconds per agent run at full speed")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--monitor-every", type=float, default=2.0)
+    args = parser.parse_args()
+
+    rate = args.overload * args.capacity / args.work
+    print(f"{rate:.1f} requests/s against a capacity of {args.capacity / args.work:.1f}/s for {args.seconds:.0f}s\n")
+    random.seed(1)
+    report("unbounded", run(None, FakeLLM(args.capacity), args.seconds, rate, args.work, args.clients, args.monitor_every))
+    random.seed(1)
+    scheduler = SessionScheduler(max_sessions=args.capacity, queue_timeout=3 * args.work)
+    report("admission control", run(scheduler, FakeLLM(args.capacity), args.seconds, rate, args.work, args.clients, args.monitor_every))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compares settling a burst of N closed issues with one registerAndCompleteIssue transaction
+each (sent back to back by tx_submitter.TransactionSubmitter) with
+settlement_batcher.SettlementBatcher, which sends them as registerAndCompleteIssues batches.
+
+By default the chain is the fake of benchmarks.tx_pipeline and only the wall-clock time and
+transaction count are compared. With --rpc-url the transactions are real and the gas used per
+issue is reported too, e.g. on a local anvil node with the contract deployed as described in
+benchmarks/tx_pipeline.py.
+
+Run from the backend directory:
+    poetry run python -m benchmarks.settlement_batch [--issues 32] [--batch-size 16] [--window 1]
+    poetry run python -m benchmarks.settlement_batch --rpc-url http://127.0.0.1:8545 --private-key <anvil key> --contract <address>
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import db.setup
+from benchmarks.tx_pipeline import FakeChainSender, settlement_args
+from settlement_batcher import SettlementBatcher
+from tx_submitter import TransactionSubmitter, Web3Sender
+
+def run_single(submitter, contract, abi, count):
+    run_id = uuid.uuid4().hex[:8]
+    start = time.perf_counter()
+    handles = [
+        submitter.submit(contract, abi, "registerAndCompleteIssue", settlement_args(run_id, i))
+        for i in range(count)
+    ]
+    receipts = [handle.result() for handle in handles]
+    return time.perf_counter() - start, receipts
+
+def run_batched(submitter, contract, abi, count, batch_size, window):
+    run_id = uuid.uuid4().hex[:8]
+    batcher = SettlementBatcher(submitter, contract, abi, window=window, max_size=batch_size)
+
+    def settle(i):
+        # Each settlement waits in its own thread, as the register stages of the chain lane do
+        args = settlement_args(run_id, i)
+        return batcher.add(args["repositoryName"], args["issueId"], args["githubIds"], args["percentages"]).result()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        receipts = list(pool.map(settle, range(count)))
+    elapsed = time.perf_counter() - start
+    batcher.stop()
+    return elapsed, receipts
+
+def summarize(name, count, elapsed, receipts, with_gas):
+    transactions = {receipt.tx_hash: receipt for receipt in receipts}
+    # The fake chain reports a fixed 21000 gas per transaction, which says nothing of the calls
+    gas_text = f"{sum(receipt.gas_used for receipt in transactions.values()) / count:>12,.0f}" if with_gas else f"{'-':>12}"
+    blocks = len({receipt.block_number for receipt in receipts})
+    print(f"{name:<24} {elapsed:>7.2f}s {len(transactions):>5} {blocks:>7} {gas_text}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--issues", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--window", type=float, default=1.0, help="seconds a batch waits for more settlements")
+    parser.add_argument("--block-time", type=float, default=2.0, help="seconds per block of the fake chain")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per RPC call of the fake chain")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--rpc-url")
+    parser.add_argument("--private-key")
+    parser.add_argument("--contract")
+    args = parser.parse_args()
+
+    with open("./abi/contract_abi.json") as file:
+        contract_abi = json.load(file)
+    # Transactions are recorded in a scratch database
+    os.chdir(tempfile.mkdtemp())
+    db.setup.setup()
+    if args.rpc_url:
+        sender = Web3Sender(args.rpc_url, args.private_key)
+        contract, abi = args.contract, contract_abi
+        print(f"{args.issues} settlements on {args.rpc_url}\n")
+    else:
+        sender = FakeChainSender(args.block_time, args.latency)
+        contract, abi = "0xbenchmark", []
+        print(f"{args.issues} settlements on a fake chain ({args.block_time}s blocks, {args.latency * 1000:.0f}ms RPC)\n")
+    submitter = TransactionSubmitter(sender, poll_interval=args.poll_interval)
+
+    print(f"{'mode':<24} {'total':>8} {'txs':>5} {'blocks':>7} {'gas/issue':>12}")
+    with_gas = bool(args.rpc_url)
+    summarize("one tx per issue", args.issues, *run_single(submitter, contract, abi, args.issues), with_gas)
+    summarize(f"batches of {args.batch_size}", args.issues,
+              *run_batched(submitter, contract, abi, args.issues, args.batch_size, args.window), with_gas)
+    submitter.stop()
+
+if __name__ == "__main__":
+    main()
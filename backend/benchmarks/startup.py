@@ -0,0 +1,83 @@
+"""
+Measures backend cold start: the wall time of `import app` in a fresh interpreter and,
+from `python -X importtime`, the modules that contribute most to it.
+With --build-agent, also times the first get_agent() call (needs the OpenAI and CDP
+credentials from .env, and creates or loads the CDP wallet).
+
+Run from the backend directory:
+    poetry run python -m benchmarks.startup [--repeat 5] [--top 15] [--build-agent]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = "import app"
+BUILD_AGENT = (
+    "import time, app\n"
+    "from agent.factory import get_agent\n"
+    "start = time.perf_counter()\n"
+    "get_agent()\n"
+    "print(f'get_agent {time.perf_counter() - start:.6f}')\n"
+)
+
+def run_python(code: str, cwd: str, *flags: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+
+def parse_importtime(stderr: str) -> list[tuple[int, int, str]]:
+    """Returns (self us, cumulative us, module) for every line of -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+        entries.append((int(self_us), int(cumulative_us), module.rstrip()))
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--build-agent", action="store_true")
+    args = parser.parse_args()
+
+    # Run in a scratch directory so setup() does not touch the real agent.db
+    with tempfile.TemporaryDirectory() as directory:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run_python(IMPORT_APP, directory)
+            timings.append(time.perf_counter() - start)
+        print(f"import app: median {statistics.median(timings) * 1000:.0f} ms, "
+              f"min {min(timings) * 1000:.0f} ms over {args.repeat} runs\n")
+
+        entries = parse_importtime(run_python(IMPORT_APP, directory, "-X", "importtime").stderr)
+        top_level = {}
+        for self_us, cumulative_us, module in entries:
+            # Nested imports are indented; attribute everything to the top-level package
+            package = module.strip().split(".")[0]
+            top_level[package] = top_level.get(package, 0) + self_us
+        print(f"{'package':<32} {'self ms':>9}")
+        for package, self_us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"{package:<32} {self_us / 1000:>9.1f}")
+
+        print(f"\n{'module (cumulative)':<48} {'ms':>9}")
+        for _, cumulative_us, module in sorted(entries, key=lambda entry: -entry[1])[:args.top]:
+            print(f"{module.strip():<48} {cumulative_us / 1000:>9.1f}")
+
+        if args.build_agent:
+            output = run_python(BUILD_AGENT, directory).stdout
+            seconds = next(float(line.split()[1]) for line in output.splitlines() if line.startswith("get_agent "))
+            print(f"\nfirst get_agent(): {seconds * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compares settling N issues one transaction at a time (send, then wait for the block, as
+wallet.invoke_contract(...).wait() does) with tx_submitter.TransactionSubmitter, which sends
+them back to back and confirms them all with one receipt poller.
+
+By default the chain is a fake that mines every --block-time seconds. With --rpc-url the
+transactions are real registerAndCompleteIssue calls, e.g. on a local anvil node:
+    anvil --block-time 2
+    cd ../contracts && forge create src/GitHubIssueReward.sol:GitHubIssueReward \\
+        --rpc-url http://127.0.0.1:8545 --private-key <anvil key> --broadcast \\
+        --constructor-args <address of the key> <address of the key>
+
+Run from the backend directory:
+    poetry run python -m benchmarks.tx_pipeline [--transactions 20] [--block-time 2]
+    poetry run python -m benchmarks.tx_pipeline --rpc-url http://127.0.0.1:8545 --private-key <anvil key> --contract <address>
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import db.setup
+from tx_submitter import TransactionSubmitter, TransactionReceipt, SentTransaction, Web3Sender
+
+class FakeChainSender:
+    """Accepts a transaction after send_latency seconds and mines every pending one each block_time."""
+
+    def __init__(self, block_time: float, send_latency: float):
+        self.block_time = block_time
+        self.send_latency = send_latency
+        self.nonce = 0
+        self.block = 0
+        self.mined = {}
+        self.mempool = []
+        self.lock = threading.Lock()
+        threading.Thread(target=self._mine, daemon=True).start()
+
+    def _mine(self):
+        while True:
+            time.sleep(self.block_time)
+            with self.lock:
+                self.block += 1
+                for tx_hash in self.mempool:
+                    self.mined[tx_hash] = self.block
+                self.mempool = []
+
+    def send(self, contract_address, abi, method, args):
+        time.sleep(self.send_latency)
+        with self.lock:
+            tx_hash = f"0x{uuid.uuid4().hex}"
+            self.mempool.append(tx_hash)
+            self.nonce += 1
+            return SentTransaction(tx_hash, self.nonce - 1, "0xbenchmark")
+
+    def resume(self, row):
+        return None
+
+    def poll(self, sent):
+        time.sleep(self.send_latency)
+        with self.lock:
+            block = self.mined.get(sent.tx_hash)
+        return None if block is None else TransactionReceipt(sent.tx_hash, block, 21000)
+
+def settlement_args(run_id, issue_id):
+    return {
+        "repositoryName": f"benchmark/{run_id}",
+        "issueId": str(issue_id),
+        "githubIds": ["alice", "bob"],
+        "percentages": ["60", "40"],
+    }
+
+def run(submitter, contract, abi, count, pipelined):
+    run_id = uuid.uuid4().hex[:8]
+    start = time.perf_counter()
+    if pipelined:
+        handles = [
+            submitter.submit(contract, abi, "registerAndCompleteIssue", settlement_args(run_id, i))
+            for i in range(count)
+        ]
+        blocks = {handle.result().block_number for handle in handles}
+    else:
+        blocks = set()
+        for i in range(count):
+            handle = submitter.submit(contract, abi, "registerAndCompleteIssue", settlement_args(run_id, i))
+            blocks.add(handle.result().block_number)
+    return time.perf_counter() - start, len(blocks)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=20)
+    parser.add_argument("--block-time", type=float, default=2.0, help="seconds per block of the fake chain")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per RPC call of the fake chain")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--rpc-url")
+    parser.add_argument("--private-key")
+    parser.add_argument("--contract")
+    args = parser.parse_args()
+
+    with open("./abi/contract_abi.json") as file:
+        contract_abi = json.load(file)
+    # Transactions are recorded in a scratch database
+    os.chdir(tempfile.mkdtemp())
+    db.setup.setup()
+    if args.rpc_url:
+        sender = Web3Sender(args.rpc_url, args.private_key)
+        contract, abi = args.contract, contract_abi
+        print(f"{args.transactions} registerAndCompleteIssue transactions on {args.rpc_url}\n")
+    else:
+        sender = FakeChainSender(args.block_time, args.latency)
+        contract, abi = "0xbenchmark", []
+        print(f"{args.transactions} transactions on a fake chain ({args.block_time}s blocks, {args.latency * 1000:.0f}ms RPC)\n")
+    submitter = TransactionSubmitter(sender, poll_interval=args.poll_interval)
+
+    print(f"{'mode':<26} {'total':>8} {'per tx':>8} {'blocks':>7}")
+    for name, pipelined in (("send and wait (.wait())", False), ("pipelined submitter", True)):
+        total, blocks = run(submitter, contract, abi, args.transactions, pipelined)
+        print(f"{name:<26} {total:>7.2f}s {total / args.transactions:>7.2f}s {blocks:>7}")
+    submitter.stop()
+
+if __name__ == "__main__":
+    main()
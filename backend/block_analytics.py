@@ -0,0 +1,196 @@
+# backend/block_analytics.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+import settings.logging  # noqa: F401
+import settings.env  # noqa: F401
+
+from agent.custom_actions.get_latest_block import BlockCache, BlockColumns, BlockReader, get_block_reader
+from utils import bounded_map
+
+# Blocks fetched at once by a range query; the session of the provider keeps 10 connections per host
+BLOCK_ANALYTICS_WORKERS = int(os.environ.get("BLOCK_ANALYTICS_WORKERS", "8"))
+# Most blocks one query may cover; Base produces 1800 blocks an hour
+BLOCK_ANALYTICS_MAX_BLOCKS = int(os.environ.get("BLOCK_ANALYTICS_MAX_BLOCKS", "10000"))
+# Per-block partials kept in memory, so overlapping ranges only fetch the blocks they do not share
+BLOCK_PARTIALS_CACHE_SIZE = int(os.environ.get("BLOCK_PARTIALS_CACHE_SIZE", "20000"))
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+class BlockPartial:
+    """
+    What a range summary needs of one block: its transaction count and value, its distinct
+    senders and receivers, and its gas prices. Any range containing the block is summarized
+    from these, without the block's transactions.
+    """
+
+    __slots__ = ("number", "hash", "parent_hash", "timestamp", "transactions", "value", "senders", "receivers", "gas_prices")
+
+    def __init__(self, columns: BlockColumns):
+        import pandas as pd  # Deferred: pandas is slow to import and only needed for range queries
+
+        self.number = columns.number
+        self.hash = columns.hash
+        self.parent_hash = columns.parent_hash
+        self.timestamp = columns.timestamp
+        self.transactions = len(columns.senders)
+        self.value = float(columns.values.sum())
+        self.senders = pd.unique(columns.senders)
+        self.receivers = pd.unique(columns.receivers)
+        self.gas_prices = columns.gas_prices
+
+class BlockAnalytics:
+    """
+    Summarizes ranges of blocks, given by number or by time window, for the fee and activity
+    dashboards.
+
+    The partial of each block is kept in a BlockCache. The blocks of a range missing from it are
+    fetched `workers` at a time with bounded_map, in order, and every partial is appended to
+    per-column lists that are concatenated once, so the totals, distinct addresses and gas
+    price percentiles are computed over whole arrays.
+    """
+
+    def __init__(self,
+                 reader: BlockReader,
+                 workers: int = BLOCK_ANALYTICS_WORKERS,
+                 max_blocks: int = BLOCK_ANALYTICS_MAX_BLOCKS,
+                 cache_size: int = BLOCK_PARTIALS_CACHE_SIZE):
+        self.reader = reader
+        self.workers = workers
+        self.max_blocks = max_blocks
+        self.partials = BlockCache(cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="block-analytics")
+
+    def partial(self, number: int) -> BlockPartial:
+        # The reader holds the latest blocks when it tracks the head
+        columns = self.reader.cache.get(number)
+        if columns is None:
+            columns = BlockColumns(self.reader.source.block(number))
+        return BlockPartial(columns)
+
+    def summarize_range(self, start_block: int, end_block: int, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> dict:
+        """
+        Returns the activity of blocks start_block to end_block (inclusive).
+        Raises ValueError if the range is empty, too long or after the head, and BlockSourceError
+        if the node fails.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if start_block < 0 or end_block < start_block:
+            raise ValueError(f"Invalid block range {start_block}-{end_block}")
+        if end_block - start_block + 1 > self.max_blocks:
+            raise ValueError(f"A range covers at most {self.max_blocks} blocks")
+        if any(not 0 <= percentile <= 100 for percentile in percentiles):
+            raise ValueError("Percentiles must be between 0 and 100")
+        head = self.reader.source.head()
+        if end_block > head:
+            raise ValueError(f"Block {end_block} is after the head ({head})")
+
+        cached = {}
+        missing = []
+        for number in range(start_block, end_block + 1):
+            partial = self.partials.get(number)
+            if partial is None:
+                missing.append(number)
+            else:
+                cached[number] = partial
+        fetched = bounded_map(self.partial, missing, self._executor, self.workers)
+
+        columns = {"number": [], "timestamp": [], "transactions": [], "value": []}
+        senders, receivers, gas_prices = [], [], []
+        for number in range(start_block, end_block + 1):
+            partial = cached.get(number)
+            if partial is None:
+                partial = next(fetched)
+                # In block order, so the cache notices a fetched block that replaced the parent it holds
+                self.partials.put(partial)
+            columns["number"].append(partial.number)
+            columns["timestamp"].append(partial.timestamp)
+            columns["transactions"].append(partial.transactions)
+            columns["value"].append(partial.value)
+            senders.append(partial.senders)
+            receivers.append(partial.receivers)
+            gas_prices.append(partial.gas_prices)
+
+        blocks = pd.DataFrame(columns)
+        senders = pd.unique(np.concatenate(senders))
+        receivers = pd.unique(np.concatenate(receivers))
+        gas_prices = np.concatenate(gas_prices)
+        if len(gas_prices):
+            gas_price_gwei = dict(zip((f"p{percentile:g}" for percentile in percentiles), np.percentile(gas_prices, percentiles).tolist()))
+            gas_price_gwei.update(min=float(gas_prices.min()), mean=float(gas_prices.mean()), max=float(gas_prices.max()))
+        else:
+            gas_price_gwei = None
+        return {
+            "start_block": start_block,
+            "end_block": end_block,
+            "start_timestamp": int(blocks["timestamp"].iloc[0]),
+            "end_timestamp": int(blocks["timestamp"].iloc[-1]),
+            "blocks": len(blocks),
+            "transactions_count": int(blocks["transactions"].sum()),
+            "max_transactions_per_block": int(blocks["transactions"].max()),
+            "total_value_transferred": float(blocks["value"].sum()),
+            "unique_senders": len(senders),
+            "unique_receivers": len(receivers),
+            "total_unique_addresses": len(pd.unique(np.concatenate([senders, receivers]))),
+            "gas_price_gwei": gas_price_gwei,
+            "fetched_blocks": len(missing),
+        }
+
+    def summarize_time_window(self, start_time: int, end_time: int, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> dict:
+        """
+        Returns the activity of the blocks with a timestamp from start_time to end_time (unix
+        seconds, inclusive). Raises ValueError if no block is in the window, and BlockSourceError
+        if the node fails.
+        """
+        if end_time < start_time:
+            raise ValueError(f"Invalid time window {start_time}-{end_time}")
+        head = self.reader.source.head()
+        start_block = self.block_at_time(start_time, head)
+        end_block = self.block_at_time(end_time + 1, head) - 1
+        if end_block < start_block:
+            raise ValueError(f"No block between {start_time} and {end_time}")
+        return self.summarize_range(start_block, end_block, percentiles)
+
+    def block_at_time(self, timestamp: int, head: int) -> int:
+        """Returns the first block with a timestamp at or after timestamp, head + 1 if there is none."""
+        low, high = 0, head
+        low_time, high_time = self.timestamp(low), self.timestamp(high)
+        if timestamp <= low_time:
+            return low
+        if timestamp > high_time:
+            return head + 1
+        # low_time < timestamp <= high_time. Blocks come at a steady pace, so interpolating finds the
+        # block in a few steps; every other step bisects in case the pace changed
+        step = 0
+        while high - low > 1:
+            if step % 2 == 0:
+                guess = low + (timestamp - low_time) * (high - low) // (high_time - low_time)
+            else:
+                guess = (low + high) // 2
+            guess = min(max(guess, low + 1), high - 1)
+            guess_time = self.timestamp(guess)
+            if guess_time >= timestamp:
+                high, high_time = guess, guess_time
+            else:
+                low, low_time = guess, guess_time
+            step += 1
+        return high
+
+    def timestamp(self, number: int) -> int:
+        partial = self.partials.get(number)
+        if partial is not None:
+            return partial.timestamp
+        return int(self.reader.source.header(number)["timestamp"], 16)
+
+_analytics: Optional[BlockAnalytics] = None
+_analytics_lock = threading.Lock()
+
+def get_block_analytics() -> BlockAnalytics:
+    """Returns the process-wide BlockAnalytics, sharing the provider and blocks of get_block_reader()."""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = BlockAnalytics(get_block_reader())
+        return _analytics
@@ -1,16 +1,6 @@
 # backend/chatbot.py
 import os
 import logging
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
-
-# Import CDP Agentkit Langchain Extension.
-from cdp_langchain.agent_toolkits import CdpToolkit
-from cdp_langchain.utils import CdpAgentkitWrapper
-from cdp_langchain.tools import CdpTool
-from custom_actions.evaluate_contribution import evaluate_contribution, EvaluateContribution
 import settings.logging
 import settings.env # noqa: F401
 
@@ -21,6 +11,18 @@ wallet_data_file = "wallet_data.json"
 
 def initialize_agent():
     """Initialize the agent with CDP Agentkit."""
+    # Heavy imports are deferred so that importing process_issue_event stays cheap
+    from langchain_openai import ChatOpenAI
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.prebuilt import create_react_agent
+
+    # Import CDP Agentkit Langchain Extension.
+    from cdp_langchain.agent_toolkits import CdpToolkit
+    from cdp_langchain.utils import CdpAgentkitWrapper
+    from cdp_langchain.tools import CdpTool
+    from custom_actions.evaluate_contribution import evaluate_contribution, EvaluateContribution
+    from agent.context_policy import ContextPolicy
+
     llm = ChatOpenAI(model="gpt-4o-mini")
 
     # Configure CDP Agentkit Langchain Extension.
@@ -62,7 +64,7 @@ def initialize_agent():
         llm,
         tools=tools,
         checkpointer=memory,
-        state_modifier=(
+        state_modifier=ContextPolicy(
             "You are a helpful agent that can interact onchain using the Coinbase Developer Platform AgentKit. "
             "You are empowered to interact onchain using your tools. If you ever need funds, you can request "
             "them from the faucet if you are on network ID 'base-sepolia'. If not, you can provide your wallet "
@@ -82,6 +84,8 @@ def process_issue_event(pr_info, agent_executor, config) -> str:
     Processes a new Closed Issue event by passing its details to the agent.
     Returns the aggregated agent response.
     """
+    from langchain_core.messages import HumanMessage
+
     prompt = (
         "New Closed Issue event detected with the following details:\n"
         f"Owner: {pr_info.get('owner')}\n"
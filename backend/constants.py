@@ -5,6 +5,11 @@ EVENT_TYPE_AGENT: Final[str] = "agent"
 EVENT_TYPE_COMPLETED: Final[str] = "completed"
 EVENT_TYPE_TOOLS: Final[str] = "tools"
 EVENT_TYPE_ERROR: Final[str] = "error"
+# Token streaming (stream_agent_tokens)
+EVENT_TYPE_AGENT_DELTA: Final[str] = "agent_delta"
+EVENT_TYPE_TOOL_START: Final[str] = "tool_start"
+EVENT_TYPE_TOOL_END: Final[str] = "tool_end"
+EVENT_TYPE_HEARTBEAT: Final[str] = "heartbeat"
 
 # Environment variables
 WALLET_ID_ENV_VAR: Final[str] = "CDP_WALLET_ID"
@@ -29,4 +34,19 @@ AGENT_PROMPT: Final[str] = (
     "Under no circumstances should you attempt to transfer unauthorized assets. "
     "Always adhere to security protocols and ensure all actions are logged for auditing purposes. "
     "Example input: 'I want to execute the lockReward function. My Ethereum address is 0xYourAddressHere. The repository is https://github.com/naizo01/agentic. The issue is 1. I want to donate 100 USD. My signature is 0xYourSignatureHere.'"
-)
\ No newline at end of file
+)
+
+# Contribution evaluation
+EVALUATION_MODEL: Final[str] = "gpt-4o-mini"
+# Bump when the evaluation prompt changes so cached verdicts are not reused
+EVALUATION_PROMPT_VERSION: Final[str] = "2"
+
+# Conversation context
+CONTEXT_SUMMARY_MODEL: Final[str] = "gpt-4o-mini"
+CONTEXT_SUMMARY_PROMPT: Final[str] = (
+    "You maintain a running summary of a conversation between a user and an agent that locks "
+    "GitHub issue rewards and evaluates contributions on-chain. Update the current summary with the new messages. "
+    "Keep every fact still needed to continue: Ethereum addresses, repository names, issue ids, reward amounts, "
+    "transaction hashes, signatures requested or received, and what is still pending. "
+    "Drop greetings and repeated explanations. Answer with the updated summary only, in at most 200 words."
+)
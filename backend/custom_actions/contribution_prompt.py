@@ -0,0 +1,295 @@
+import os
+import re
+import hashlib
+import logging
+from fnmatch import fnmatch
+from typing import List
+
+try:
+    # tiktoken is installed with langchain-openai
+    import tiktoken
+except ImportError:  # pragma: no cover
+    tiktoken = None
+
+# Maximum number of tokens spent on the commit history and review comments in the evaluation prompt
+PROMPT_TOKEN_BUDGET = int(os.environ.get("CONTRIBUTION_PROMPT_TOKEN_BUDGET", "12000"))
+# Share of the budget the review comments may take; the commit history gets the rest
+REVIEW_BUDGET_SHARE = 0.25
+# Hunks are never trimmed below this many tokens; below that only the file stats are kept
+MIN_HUNK_TOKENS = 40
+# Review comments are never trimmed below this many tokens; below that only their count is kept
+MIN_COMMENT_TOKENS = 20
+
+# Files whose diff says nothing about the contributor's work; only line counts are reported
+LOCKFILE_PATTERNS = [
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock",
+    "Cargo.lock", "Gemfile.lock", "composer.lock", "go.sum", "uv.lock", "*.lock",
+]
+GENERATED_PATTERNS = [
+    "*.min.js", "*.min.css", "*.map", "*.pb.go", "*_pb2.py", "*_pb2_grpc.py", "*.generated.*",
+    "*.snap", "dist/*", "build/*", "*/dist/*", "*/build/*", "*/__generated__/*",
+]
+VENDORED_PATTERNS = [
+    "vendor/*", "*/vendor/*", "node_modules/*", "*/node_modules/*", "third_party/*", "*/third_party/*",
+]
+
+HUNK_HEADER = re.compile(r"^@@ .* @@.*$", re.MULTILINE)
+
+_encoding = None
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of a text with the OpenAI tokenizer, or estimate them when tiktoken is missing."""
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    return len(_get_encoding().encode(text, disallowed_special=()))
+
+def classify_file(filename: str) -> str | None:
+    """Return "lockfile", "generated" or "vendored" for files summarized as stats, None otherwise."""
+    basename = filename.rsplit("/", 1)[-1]
+    for kind, patterns in (
+        ("lockfile", LOCKFILE_PATTERNS),
+        ("generated", GENERATED_PATTERNS),
+        ("vendored", VENDORED_PATTERNS),
+    ):
+        if any(fnmatch(basename, pattern) or fnmatch(filename, pattern) for pattern in patterns):
+            return kind
+    return None
+
+def split_hunks(patch: str) -> List[str]:
+    """Split a unified diff patch into its hunks, each starting with its @@ header."""
+    starts = [match.start() for match in HUNK_HEADER.finditer(patch)]
+    if not starts:
+        return [patch] if patch else []
+    return [patch[start:end].rstrip("\n") for start, end in zip(starts, starts[1:] + [len(patch)])]
+
+def count_changed_lines(patch: str) -> tuple[int, int]:
+    """Return the number of added and deleted lines of a patch."""
+    additions = deletions = 0
+    for line in patch.splitlines():
+        if line.startswith("+"):
+            additions += 1
+        elif line.startswith("-"):
+            deletions += 1
+    return additions, deletions
+
+def _hunk_key(hunk: str) -> str:
+    # The @@ header carries line numbers, which differ for the same change on another base
+    body = hunk.split("\n", 1)[1] if "\n" in hunk else ""
+    return hashlib.sha1(body.encode()).hexdigest()
+
+def _truncate(text: str, cap: int) -> str:
+    # Keeps the first cap tokens of a single line
+    if tiktoken is None:
+        return text[:max(0, cap - 1) * 4]
+    encoding = _get_encoding()
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:cap])
+
+def _trim_hunk(hunk: str, tokens: int, cap: int) -> str:
+    if tokens <= cap:
+        return hunk
+    lines = hunk.split("\n")
+    kept = []
+    # The "more lines" marker is part of the cap
+    used = count_tokens(f"... ({len(lines)} more lines)") + 1
+    for line in lines:
+        line_tokens = count_tokens(line) + 1
+        if used + line_tokens > cap:
+            break
+        kept.append(line)
+        used += line_tokens
+    return "\n".join(kept + [f"... ({len(lines) - len(kept)} more lines)"])
+
+def _find_cap(sizes: List[int], budget: int) -> int:
+    # Largest per-hunk cap such that sum(min(size, cap)) fits the budget (water-filling)
+    if sum(sizes) <= budget:
+        return max(sizes, default=0)
+    low, high = 0, max(sizes)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if sum(min(size, mid) for size in sizes) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+def _fit_lines(lines: List[str], token_budget: int, omitted: str) -> List[str]:
+    # Keeps the first lines that fit token_budget, then a line counting the rest
+    kept = []
+    used = 0
+    for index, line in enumerate(lines):
+        tokens = count_tokens(line) + 1
+        if used + tokens > token_budget - count_tokens(omitted.format(len(lines))) - 1:
+            return kept + [omitted.format(len(lines) - index)]
+        kept.append(line)
+        used += tokens
+    return kept
+
+def _collapse_commits(entries: List[dict], token_budget: int) -> List[str]:
+    """
+    One line per commit with its changed files and lines, or, if that does not fit either, one
+    line per author of each pull request.
+    """
+    def summarize(key):
+        groups = {}
+        for entry in entries:
+            group = groups.setdefault(key(entry), {"commits": set(), "files": 0, "additions": 0, "deletions": 0})
+            group["commits"].add(entry["label"])
+            group["files"] += 1
+            group["additions"] += entry["additions"]
+            group["deletions"] += entry["deletions"]
+        return groups
+
+    commits = summarize(lambda entry: (entry["label"], entry["name"]))
+    lines = [f"[{label} by {name}] {group['files']} files (+{group['additions']} -{group['deletions']})"
+             for (label, name), group in commits.items()]
+    if sum(count_tokens(line) + 1 for line in lines) <= token_budget:
+        return lines
+    authors = summarize(lambda entry: (entry["label"].split(" commit ", 1)[0], entry["name"]))
+    lines = [f"[{pull_request} by {name}] {len(group['commits'])} commits, {group['files']} files "
+             f"(+{group['additions']} -{group['deletions']})"
+             for (pull_request, name), group in authors.items()]
+    return _fit_lines(lines, token_budget, "... ({} more authors omitted to fit the token budget)")
+
+def build_commit_evidence(commit_history: List[List[dict]], token_budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Render the commit history of the linked pull requests for the evaluation prompt
+
+    - Lockfiles, generated and vendored files are collapsed into +/- line counts.
+    - Hunks repeated across commits (cherry-picks, rebased duplicates) are shown once
+      and referenced afterwards.
+    - The file headers and references are counted first; the hunks get what is left of
+      token_budget. If they exceed it, the largest ones are trimmed first (a common per-hunk
+      cap) so that every author keeps some evidence; hunks that would fall under
+      MIN_HUNK_TOKENS are dropped but their file stats remain.
+    - If the file headers alone exceed token_budget, each commit is collapsed into one line
+      of stats, then each author of a pull request.
+
+    Args:
+        commit_history (List[List[dict]]): The extracted commit information per pull request
+        token_budget (int): The number of tokens the rendered history may use
+
+    Returns:
+        str: The commit history as plain text, one block per commit and file
+    """
+    seen_hunks = {}  # hunk key -> index in hunks
+    entries = []  # {label, name, filename, additions, deletions, kind, header, hunks: [index in hunks or ("ref", index)]}
+    hunks = []  # {text, tokens, location}
+
+    for pull_request_index, commits in enumerate(commit_history, start=1):
+        for commit in commits:
+            sha = commit["commit_url"].rsplit("/", 1)[-1][:7]
+            label = f"PR {pull_request_index} commit {sha}"
+            for file in commit["change_files"]:
+                patch = file.get("patch") or ""
+                additions, deletions = count_changed_lines(patch)
+                additions = file.get("additions", additions)
+                deletions = file.get("deletions", deletions)
+                kind = classify_file(file["filename"])
+                header = f"[{label} by {commit['name']}] {file['filename']} (+{additions} -{deletions}"
+                header += f", {kind} file)" if kind else ")"
+                entry = {
+                    "label": label,
+                    "name": commit["name"],
+                    "additions": additions,
+                    "deletions": deletions,
+                    "header": header,
+                    "hunks": [],
+                }
+                entries.append(entry)
+                if kind is not None:
+                    continue
+                for hunk in split_hunks(patch):
+                    key = _hunk_key(hunk)
+                    if key in seen_hunks:
+                        entry["hunks"].append(("ref", seen_hunks[key]))
+                        continue
+                    seen_hunks[key] = len(hunks)
+                    entry["hunks"].append(len(hunks))
+                    hunks.append({"text": hunk, "tokens": count_tokens(hunk), "location": f"{label} {file['filename']}"})
+
+    def reference(index, omitted=False):
+        suffix = ", omitted to fit the token budget" if omitted else ""
+        return f"(same change as {hunks[index]['location']}{suffix})"
+
+    # Headers, references and the separators between blocks and lines
+    fixed_tokens = sum(count_tokens(entry["header"]) + 2 for entry in entries)
+    fixed_tokens += sum(count_tokens(reference(item[1], omitted=True)) + 1
+                        for entry in entries for item in entry["hunks"] if isinstance(item, tuple))
+    fixed_tokens += len(hunks) + count_tokens(f"({len(hunks)} hunks omitted to fit the token budget)") + 2
+    if fixed_tokens > token_budget:
+        logging.info(f"Collapsed {len(entries)} files into commit stats to fit the token budget of {token_budget}")
+        return "\n".join(_collapse_commits(entries, token_budget))
+
+    cap = _find_cap([hunk["tokens"] for hunk in hunks], token_budget - fixed_tokens)
+    dropped = set()
+    for index, hunk in enumerate(hunks):
+        if cap < MIN_HUNK_TOKENS and hunk["tokens"] > cap:
+            dropped.add(index)
+        else:
+            hunk["text"] = _trim_hunk(hunk["text"], hunk["tokens"], cap)
+    if dropped:
+        logging.info(f"Dropped {len(dropped)} hunks to fit the token budget of {token_budget}")
+
+    blocks = []
+    for entry in entries:
+        lines = [entry["header"]]
+        for item in entry["hunks"]:
+            if isinstance(item, tuple):
+                lines.append(reference(item[1], omitted=item[1] in dropped))
+            elif item not in dropped:
+                lines.append(hunks[item]["text"])
+        blocks.append("\n".join(lines))
+    if dropped:
+        blocks.append(f"({len(dropped)} hunks omitted to fit the token budget)")
+    return "\n\n".join(blocks)
+
+def build_review_evidence(review_comment_list: List[List[dict]], token_budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Render the review comments of the linked pull requests for the evaluation prompt, one line per comment.
+
+    If the comments exceed token_budget, the longest ones are trimmed first (a common
+    per-comment cap); if that would leave fewer than MIN_COMMENT_TOKENS per comment, each
+    reviewer of a pull request is reduced to a count of comments.
+    """
+    prefixes = []
+    comments = []
+    for pull_request_index, reviews in enumerate(review_comment_list, start=1):
+        for review in reviews:
+            prefixes.append(f"[PR {pull_request_index}] {review['name']}: ")
+            comments.append(" ".join((review["comment"] or "").split()))
+
+    sizes = [count_tokens(comment) for comment in comments]
+    # Prefixes, the trim marker and the separator of each line
+    fixed_tokens = sum(count_tokens(prefix) + 2 for prefix in prefixes)
+    cap = _find_cap(sizes, token_budget - fixed_tokens)
+    if cap >= MIN_COMMENT_TOKENS or cap >= max(sizes, default=0):
+        return "\n".join(
+            prefix + (comment if size <= cap else _truncate(comment, cap - 1) + "…")
+            for prefix, comment, size in zip(prefixes, comments, sizes)
+        )
+
+    logging.info(f"Collapsed {len(comments)} review comments into counts to fit the token budget of {token_budget}")
+    counts = {}
+    for prefix in prefixes:
+        counts[prefix] = counts.get(prefix, 0) + 1
+    lines = [f"{prefix}{count} review comments (omitted to fit the token budget)" for prefix, count in counts.items()]
+    return "\n".join(_fit_lines(lines, token_budget, "... ({} more reviewers omitted to fit the token budget)"))
+
+def build_evidence(commit_history: List[List[dict]],
+                   review_comment_list: List[List[dict]],
+                   token_budget: int = PROMPT_TOKEN_BUDGET) -> tuple[str, str]:
+    """Render the commit history and review comments within token_budget
+
+    The review comments take at most REVIEW_BUDGET_SHARE of the budget, and the commit
+    history whatever they leave.
+
+    Returns:
+        tuple[str, str]: The commit evidence and the review evidence
+    """
+    review_evidence = build_review_evidence(review_comment_list, int(token_budget * REVIEW_BUDGET_SHARE))
+    commit_evidence = build_commit_evidence(commit_history, token_budget - count_tokens(review_evidence))
+    return commit_evidence, review_evidence
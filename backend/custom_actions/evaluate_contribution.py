@@ -1,22 +1,34 @@
 import json
 import sys
+import hashlib
 import requests
 import os
-from typing import List
-from db.rewards import mark_reward_as_merged, get_reward_id
+from concurrent.futures import ThreadPoolExecutor, Executor
+from typing import TYPE_CHECKING, Iterable, List
+from db.settlement_jobs import enqueue_settlement, get_settlement_job
+from db.commit_cache import get_cached_commit, save_cached_commit
+from db.verdicts import get_verdict, save_verdict
+from github_api import get_github_json, iter_github_items
+from tx_submitter import get_transaction_submitter
+from utils import bounded_map
+from custom_actions.contribution_prompt import PROMPT_TOKEN_BUDGET, build_evidence
 from pydantic import BaseModel, Field
 
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from cdp import Wallet
+import constants
 import settings.logging  # noqa: F401
 import settings.env  # noqa: F401
 import logging
 
+if TYPE_CHECKING:
+    from cdp import Wallet
+    from tx_submitter import TransactionSubmitter, TransactionHandle
+
 CONTRACT_ADDRESS = os.environ.get("CONTRACT_ADDRESS")
 GITHUB_API_URL = os.environ.get("GITHUB_API_URL")
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
 CONTRACT_ABI_PATH = './abi/contract_abi.json'
+# Number of concurrent GitHub requests made while collecting the contribution history
+GITHUB_FETCH_WORKERS = int(os.environ.get("GITHUB_FETCH_WORKERS", "16"))
 
 HEADERS = {
     "Authorization": f"token {GITHUB_TOKEN}",
@@ -47,18 +59,29 @@ def load_abi(file_path: str) -> dict | None:
         logging.error(f"Unexpected error: {e}")
         return None
 
-def register_and_complete_issue(wallet: Wallet, repositoryName: str, issueId: str, githubIds: List[str], percentages: List[str]) -> str:
-    """Register and complete issue in the smart contract.
+def send_register_and_complete_issue(
+        submitter: "TransactionSubmitter",
+        repositoryName: str,
+        issueId: str,
+        githubIds: List[str],
+        percentages: List[str],
+        label: str | None = None
+    ) -> "TransactionHandle":
+    """Send registerAndCompleteIssue to the smart contract without waiting for it to be mined.
 
     Args:
-        wallet (Wallet): The wallet to use for the transaction.
+        submitter (TransactionSubmitter): The submitter sending the transaction.
         repositoryName (str): The name of the GitHub repository.
         issueId (int): The ID of the issue.
         githubIds (List[str]): The GitHub IDs of the contributors.
         percentages (List[int]): The contribution percentages of the contributors.
+        label (str | None): A label to find the transaction again, e.g. after a restart.
 
     Returns:
-        str: The result of the contract invocation.
+        TransactionHandle: A future resolved with the receipt once the transaction is confirmed.
+
+    Raises:
+        Exception: If the transaction cannot be sent, e.g. because the call would revert.
     """
     abi = load_abi(CONTRACT_ABI_PATH)
     register_and_complete_issue_args = {
@@ -69,16 +92,48 @@ def register_and_complete_issue(wallet: Wallet, repositoryName: str, issueId: st
     }
     logging.info(f"Register and complete issue args: {register_and_complete_issue_args}")
 
-    try:
-        # Invoke the registerAndCompleteIssue method on the contract
-        register_and_complete_issue_invocation = wallet.invoke_contract(
-            contract_address=CONTRACT_ADDRESS,
-            abi=abi,
-            method="registerAndCompleteIssue",
-            args=register_and_complete_issue_args
-        ).wait()
-        logging.info(f"Register and complete issue result: {register_and_complete_issue_invocation}")
+    return submitter.submit(CONTRACT_ADDRESS, abi, "registerAndCompleteIssue", register_and_complete_issue_args, label=label)
+
+def submit_register_and_complete_issue(wallet: "Wallet", repositoryName: str, issueId: str, githubIds: List[str], percentages: List[str]) -> str:
+    """Invoke registerAndCompleteIssue on the smart contract and wait for the transaction.
+
+    Args:
+        wallet (Wallet): The wallet of the agent tool call; the transaction is sent by the process-wide
+            submitter, with the wallet given to tx_submitter.configure_transaction_submitter.
+        repositoryName (str): The name of the GitHub repository.
+        issueId (int): The ID of the issue.
+        githubIds (List[str]): The GitHub IDs of the contributors.
+        percentages (List[int]): The contribution percentages of the contributors.
+
+    Returns:
+        str: The result of the contract invocation.
+
+    Raises:
+        Exception: If the invocation fails or reverts.
+    """
+    register_and_complete_issue_invocation = send_register_and_complete_issue(
+        get_transaction_submitter(), repositoryName, issueId, githubIds, percentages
+    ).result()
+    logging.info(f"Register and complete issue result: {register_and_complete_issue_invocation}")
+    return str(register_and_complete_issue_invocation)
 
+def register_and_complete_issue(wallet: "Wallet", repositoryName: str, issueId: str, githubIds: List[str], percentages: List[str]) -> str:
+    """Register and complete issue in the smart contract.
+
+    Args:
+        wallet (Wallet): The wallet to use for the transaction.
+        repositoryName (str): The name of the GitHub repository.
+        issueId (int): The ID of the issue.
+        githubIds (List[str]): The GitHub IDs of the contributors.
+        percentages (List[int]): The contribution percentages of the contributors.
+
+    Returns:
+        str: The result of the contract invocation.
+    """
+    try:
+        register_and_complete_issue_invocation = submit_register_and_complete_issue(
+            wallet, repositoryName, issueId, githubIds, percentages
+        )
         return f"Register and complete issue successfully: {register_and_complete_issue_invocation}"
     except Exception as e:
         logging.error(f"Failed to register and complete issue: {sys.exc_info()}")
@@ -124,13 +179,8 @@ def request_get_github_api(url: str) -> dict | None:
     Returns:
         dict | None: The response from the GitHub API
     """
-    try:
-        res = requests.get(f"{url}", headers=HEADERS)
-        res.raise_for_status()
-        return res.json()
-    except Exception as e:
-        logging.error(f"An exception occurred during the GitHub API request: {str(e)}")
-        return None
+    # Conditional request served from the shared GitHub response cache
+    return get_github_json(url)
 
 def request_post_github_api(url: str, data: dict) -> dict | None:
     """Execute the GitHub API using the POST method
@@ -150,17 +200,74 @@ def request_post_github_api(url: str, data: dict) -> dict | None:
         logging.error(f"An exception occurred during the GitHub API request: {str(e)}")
         return None
 
-def extract_commit_info(commits: dict) -> List[dict]:
+def find_issue_comment(repo_owner: str, repo_name: str, issue_number: int, marker: str) -> dict | None:
+    """Find a comment of an issue containing the given marker
+
+    Used before posting a comment that must appear only once, e.g. when a post is retried.
+
+    Args:
+        repo_owner (str): The owner of the GitHub repository.
+        repo_name (str): The name of the GitHub repository.
+        issue_number (int): The number of the GitHub issue.
+        marker (str): The text to look for in the comment bodies.
+
+    Returns:
+        dict | None: The first matching comment, or None if there is none
+
+    Raises:
+        requests.HTTPError: If GitHub answers with an error status
+    """
+    for comment in iter_github_items(f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/issues/{issue_number}/comments"):
+        if marker in (comment.get("body") or ""):
+            return comment
+    return None
+
+def get_commit_detail(commit: dict) -> dict | None:
+    """Retrieve the details of a commit, reading the SHA-keyed commit cache before the network
+
+    Only the fields used for the evaluation are cached.
+
+    Args:
+        commit (dict): The commit raw data from a pull request commit list
+
+    Returns:
+        dict | None: The commit details or None if the request failed
+    """
+    sha = commit.get("sha") or commit["url"].rsplit("/", 1)[-1]
+    cached = get_cached_commit(sha)
+    if cached is not None:
+        return json.loads(cached)
+
+    commit_detail = request_get_github_api(commit["url"])
+    if commit_detail is None:
+        return None
+    commit_detail = {
+        "sha": sha,
+        "files": [
+            {
+                "filename": file["filename"],
+                "patch": file.get("patch", ""),
+                "additions": file.get("additions", 0),
+                "deletions": file.get("deletions", 0)
+            }
+            for file in commit_detail.get("files", [])
+        ]
+    }
+    save_cached_commit(sha, json.dumps(commit_detail))
+    return commit_detail
+
+def extract_commit_info(commits: Iterable[dict], executor: Executor | None = None) -> List[dict]:
     """Extract necessary information from the commit history
 
     Args:
-        commits (dict): The commit history raw data
+        commits (Iterable[dict]): The commit history raw data, consumed lazily
+        executor (Executor | None): The pool used to fetch the commit details concurrently.
+            They are fetched one by one when omitted.
 
     Returns:
-        List[str]: The list of extracted commit information
+        List[dict]: The list of extracted commit information
     """
-    commit_history = []
-    for commit in commits:
+    def fetch_commit_info(commit: dict) -> dict:
         commit_info = {
             "name": commit["committer"]["login"],
             "commit_url": commit["url"],
@@ -168,25 +275,34 @@ def extract_commit_info(commits: dict) -> List[dict]:
         }
 
         # Retrieve commit details
-        commit_detail = request_get_github_api(commit["url"])
+        commit_detail = get_commit_detail(commit)
+        if commit_detail is None:
+            logging.error(f"Failed to retrieve commit detail: {commit['url']}")
+            return commit_info
+
         # Retrieve changed file names and modification details
-        for file in commit_detail["files"]:
+        for file in commit_detail.get("files", []):
             commit_info["change_files"].append(
                 {
                     "filename": file["filename"],
-                    "patch": file["patch"]
+                    # Binary files have no patch
+                    "patch": file.get("patch", ""),
+                    "additions": file.get("additions", 0),
+                    "deletions": file.get("deletions", 0)
                 }
             )
-        
-        commit_history.append(commit_info)
-    
-    return commit_history
+        return commit_info
+
+    if executor is None:
+        return [fetch_commit_info(commit) for commit in commits]
+    # Only a window of commit details is in flight, and the commit order is kept
+    return list(bounded_map(fetch_commit_info, commits, executor, GITHUB_FETCH_WORKERS * 2))
 
-def extract_review_info(reviews: dict) -> List[dict]:
+def extract_review_info(reviews: Iterable[dict]) -> List[dict]:
     """Extract necessary information from the review comments
 
     Args:
-        reviews (dict): The review comments raw data
+        reviews (Iterable[dict]): The review comments raw data, consumed lazily
 
     Returns:
         List[str]: The list of extracted review information
@@ -201,11 +317,11 @@ def extract_review_info(reviews: dict) -> List[dict]:
     
     return review_comment_list
 
-def extract_pull_request_url(data: List[dict]) -> List[str]:
+def extract_pull_request_url(data: Iterable[dict]) -> List[str]:
     """Extract the pull request URL from the event data
 
     Args:
-        data (list): The issue timeline data
+        data (Iterable[dict]): The issue timeline data, consumed lazily
 
     Returns:
         List[str]: The pull request URLs
@@ -222,6 +338,79 @@ def extract_pull_request_url(data: List[dict]) -> List[str]:
                 urls.append(url)
     return urls
 
+def collect_pull_request_history(pull_request_detail: dict, executor: Executor) -> tuple[List[dict], List[dict]]:
+    """Collect the commit history and review comments of one pull request
+
+    Args:
+        pull_request_detail (dict): The pull request raw data
+        executor (Executor): The pool the GitHub requests run on
+
+    Returns:
+        tuple: The extracted commit information and review comments
+    """
+    # The review comments are fetched while the commits are streamed
+    reviews_future = executor.submit(
+        lambda: extract_review_info(iter_github_items(pull_request_detail["_links"]["review_comments"]["href"]))
+    )
+    # Retrieve the committer, committed files, and modification details
+    commit_history = extract_commit_info(
+        iter_github_items(pull_request_detail["_links"]["commits"]["href"]),
+        executor
+    )
+    return commit_history, reviews_future.result()
+
+def collect_contribution_history(
+        repo_owner: str,
+        repo_name: str,
+        issue_number: int,
+        executor: Executor | None = None
+    ) -> tuple[List[List[dict]] | None, List[List[dict]] | None]:
+    """Collect the commit history and review comments of the pull requests that closed an issue
+
+    GitHub requests are fanned out on a bounded thread pool: the pull requests are
+    handled concurrently, and each streams its commits page by page while their
+    details are fetched in parallel. The latency therefore depends on the depth of
+    this graph rather than on the number of commits. The results keep the order
+    of the timeline and of each commit list.
+
+    Args:
+        repo_owner (str): The owner of the GitHub repository.
+        repo_name (str): The name of the GitHub repository.
+        issue_number (int): The number of the GitHub issue.
+        executor (Executor | None): The pool to run the requests on. A new one is created when omitted.
+
+    Returns:
+        tuple: The commit history and review comments per pull request, or (None, None) on a GitHub API error.
+    """
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=GITHUB_FETCH_WORKERS, thread_name_prefix="github-fetch") as pool:
+            return collect_contribution_history(repo_owner, repo_name, issue_number, pool)
+
+    try:
+        # Retrieve related pull request url
+        pull_request_urls = extract_pull_request_url(
+            iter_github_items(f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/issues/{issue_number}/timeline")
+        )
+
+        # Retrieve pull request information
+        pull_request_details = list(executor.map(request_get_github_api, pull_request_urls))
+        if any(detail is None for detail in pull_request_details):
+            return None, None
+
+        # Pull requests are coordinated on their own threads so they never wait on a request slot
+        with ThreadPoolExecutor(max_workers=max(len(pull_request_details), 1), thread_name_prefix="pull-request") as pull_request_pool:
+            results = list(pull_request_pool.map(
+                lambda detail: collect_pull_request_history(detail, executor),
+                pull_request_details
+            ))
+    except Exception as e:
+        logging.error(f"An exception occurred while collecting the contribution history: {str(e)}")
+        return None, None
+
+    commit_history = [result[0] for result in results]
+    review_comment_list = [result[1] for result in results]
+    return commit_history, review_comment_list
+
 def format_contribution_report(data: List[dict]) -> str:
     """Format the contribution report in markdown
 
@@ -244,53 +433,84 @@ def format_contribution_report(data: List[dict]) -> str:
 
     return markdown
 
-def evaluate_contribution(
-        wallet: Wallet,
-        repo_owner: str,
-        repo_name: str,
-        issue_number: int,
+def compute_evidence_hash(
         issue_title: str,
-        issue_body: str
+        issue_body: str,
+        commit_history: List[List[dict]],
+        review_comment_list: List[List[dict]],
+        model: str = constants.EVALUATION_MODEL,
+        prompt_version: str = constants.EVALUATION_PROMPT_VERSION,
+        token_budget: int = PROMPT_TOKEN_BUDGET
     ) -> str:
-    """Evaluate the contribution of each contributor to a closed issue.
+    """Hash the normalized evaluation input
 
-    Args:
-        wallet (Wallet): The wallet to use for the transaction.
-        repo_owner (str): The owner of the GitHub repository.
-        repo_name (str): The name of the GitHub repository.
-        issue_number (int): The number of the GitHub issue.
-        issue_title (str): The title of the GitHub issue.
-        issue_body (str): The body of the GitHub issue.
+    Whitespace-only differences in patches and comments, and the commit URLs
+    (which differ between forks), do not change the hash. The token budget does,
+    since it decides which hunks the prompt shows.
 
     Returns:
-        str: The result of the contribution evaluation.
+        str: The hex SHA-256 of the evidence, model, prompt version and token budget
     """
-    # Retrieve related pull request url
-    timeline = request_get_github_api(f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/issues/{issue_number}/timeline")
-
-    pull_request_urls = extract_pull_request_url(timeline)
-
-    commit_history = []
-    review_comment_list = []
+    def normalize(text: str | None) -> str:
+        return "\n".join(line.rstrip() for line in (text or "").strip().splitlines())
+
+    evidence = {
+        "model": model,
+        "prompt_version": prompt_version,
+        "token_budget": token_budget,
+        "issue_title": normalize(issue_title),
+        "issue_body": normalize(issue_body),
+        "commits": [
+            [
+                {
+                    "name": commit["name"],
+                    "sha": commit["commit_url"].rsplit("/", 1)[-1],
+                    "files": [[file["filename"], normalize(file.get("patch"))] for file in commit["change_files"]]
+                }
+                for commit in commits
+            ]
+            for commits in commit_history
+        ],
+        "reviews": [
+            [[review["name"], normalize(review["comment"])] for review in reviews]
+            for reviews in review_comment_list
+        ],
+    }
+    return hashlib.sha256(json.dumps(evidence, sort_keys=True).encode()).hexdigest()
 
-    # Retrieve pull request information
-    for pull_rq_url in pull_request_urls:
-        pull_request_detail_res = request_get_github_api(pull_rq_url)
+def judge_contribution(
+        repository_name: str,
+        issue_number: int,
+        issue_title: str,
+        issue_body: str,
+        commit_history: List[List[dict]],
+        review_comment_list: List[List[dict]],
+        llm=None
+    ) -> List[dict]:
+    """Ask the LLM for the contribution distribution, memoized by evidence hash
 
-        if pull_request_detail_res is None:
-            logging.error("GitHub API Error")
-            return "GitHub API Error"
+    A retry on identical evidence returns the stored distribution without calling the LLM,
+    so the split stays stable. Use db.verdicts.invalidate_verdicts to force a new verdict.
 
-        # Retrieve pull request commit information
-        commits_res = request_get_github_api(pull_request_detail_res["_links"]["commits"]["href"])
-        # Retrieve the committer, committed files, and modification details
-        commit_history.append(extract_commit_info(commits_res))
+    Args:
+        repository_name (str): The repository in "owner/name" format.
+        issue_number (int): The number of the GitHub issue.
+        issue_title (str): The title of the GitHub issue.
+        issue_body (str): The body of the GitHub issue.
+        commit_history (List[List[dict]]): The extracted commit information per pull request.
+        review_comment_list (List[List[dict]]): The extracted review comments per pull request.
+        llm: The chat model to query. Defaults to ChatOpenAI with constants.EVALUATION_MODEL.
 
-        # Retrieve pull request review comments
-        reviews_res = request_get_github_api(pull_request_detail_res["_links"]["review_comments"]["href"])
-        # Retrieve the reviewer and review comments.
-        review_comment_list.append(extract_review_info(reviews_res))
+    Returns:
+        List[dict]: [{name, contribution, reason}, ...]
+    """
+    evidence_hash = compute_evidence_hash(issue_title, issue_body, commit_history, review_comment_list)
+    cached = get_verdict(evidence_hash)
+    if cached is not None:
+        logging.info(f"Reusing the stored contribution verdict {evidence_hash} for {repository_name} issue {issue_number}")
+        return json.loads(cached)
 
+    commit_evidence, review_evidence = build_evidence(commit_history, review_comment_list)
     # Create prompto for LLM
     prompt = (
         "You are an agent that evaluates each contributor's impact on closing a GitHub Issue."
@@ -300,8 +520,8 @@ def evaluate_contribution(
         f"[Issue Title]\n{issue_title}\n\n"
         f"[Issue Body]\n{issue_body}\n\n"
         "The following is the commit history and review comments of a pull request related to the closed issue.\n\n"
-        f"[Commit History]\n{commit_history}\n\n"
-        f"[Review Comment]\n{review_comment_list}\n\n"
+        f"[Commit History]\n{commit_evidence}\n\n"
+        f"[Review Comment]\n{review_evidence}\n\n"
         "Based on the above information,"
         "analyze the contribution of each contributor (committer and reviewer) towards the completion of this closed issue,"
         "and calculate the percentage contribution of each, assuming the closed issue completion is 100%."
@@ -314,44 +534,87 @@ def evaluate_contribution(
     )
     logging.info(f"Input for the LLM: {prompt}")
 
-    # Query the LLM
-    llm = ChatOpenAI(model="gpt-4o-mini")
+    # Query the LLM (langchain is imported on first use to keep startup fast)
+    from langchain_core.messages import HumanMessage
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model=constants.EVALUATION_MODEL)
     response = llm.invoke([HumanMessage(content=prompt)])
     logging.info(f"Response from the LLM: {response.content}")
-    
+
     # Parse the response from the LLM
     contributer_to_distribution = json.loads(response.content)
-    names = [item["name"] for item in contributer_to_distribution]
-    contributions = [str(item["contribution"]) for item in contributer_to_distribution]
-    # Execute registerAndCompleteIssue contract method
-    register_and_complete_issue(wallet, f"{repo_owner}/{repo_name}", str(issue_number), names, contributions)
-
-    # Comment to issue
-    post_data = {
-        "body": f"{format_contribution_report(contributer_to_distribution)}"
-    }
-    request_post_github_api(f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/issues/{issue_number}/comments", post_data)
+    save_verdict(
+        evidence_hash,
+        repository_name,
+        issue_number,
+        constants.EVALUATION_MODEL,
+        constants.EVALUATION_PROMPT_VERSION,
+        json.dumps(contributer_to_distribution)
+    )
+    return contributer_to_distribution
+
+def build_claim_comment(contributer_to_distribution: List[dict], reward_id: int) -> str:
+    """Build the comment inviting the contributors to claim their reward
 
-    # Update is_merged = 1
-    mark_reward_as_merged(f"{repo_owner}/{repo_name}", issue_number)
+    Only contributors who have a positive contribution are mentioned.
 
-    # Retrieve reward ID
-    updated_id = get_reward_id(f"{repo_owner}/{repo_name}", issue_number)
-    logging.info(f"Updated reward ID: {updated_id}")
+    Args:
+        contributer_to_distribution (List[dict]): The contribution distribution.
+        reward_id (int): The ID of the reward.
 
-    # Mention contributors. Only mention contributors who have a positive contribution
+    Returns:
+        str: The comment text
+    """
     mention_names = []
     for item in contributer_to_distribution:
         if item["contribution"] > 0:
             mention_names.append(f"@{item['name']}")
-   
+
     claim_domain = os.environ.get("CLAIM_DOMAIN", "http://localhost:3000/claim")
     mention_text = " ".join(mention_names) if mention_names else ""
-    comment_text = f"{mention_text}\nYou can claim from the following URL.\n{claim_domain}?id={updated_id}\n"
+    return f"{mention_text}\nYou can claim from the following URL.\n{claim_domain}?id={reward_id}\n"
 
-    request_post_github_api(
-        f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/issues/{issue_number}/comments",
-        {"body": comment_text}
-    )
+def evaluate_contribution(
+        wallet: "Wallet",
+        repo_owner: str,
+        repo_name: str,
+        issue_number: int,
+        issue_title: str,
+        issue_body: str
+    ) -> str:
+    """Evaluate the contribution of each contributor to a closed issue.
+
+    The evaluation is queued as a settlement job (see settlement.py): its stages (GitHub
+    history, LLM verdict, contract call, comments, reward update) are persisted and retried
+    from the last completed stage, so calling this again for the same issue is harmless.
+    Without a settlement worker running in this process, the job is settled right away.
+
+    Args:
+        wallet (Wallet): The wallet to use for the transaction.
+        repo_owner (str): The owner of the GitHub repository.
+        repo_name (str): The name of the GitHub repository.
+        issue_number (int): The number of the GitHub issue.
+        issue_title (str): The title of the GitHub issue.
+        issue_body (str): The body of the GitHub issue.
 
-    return "Contribution evaluation completed successfully."
\ No newline at end of file
+    Returns:
+        str: The result of the contribution evaluation.
+    """
+    from settlement import SettlementWorker, notify_settlement_workers
+
+    repository_name = f"{repo_owner}/{repo_name}"
+    job_id = enqueue_settlement(repository_name, issue_number, issue_title, issue_body)
+    if job_id is None:
+        return "Failed to queue the contribution evaluation."
+
+    if notify_settlement_workers():
+        return f"Contribution evaluation queued (settlement job {job_id})."
+
+    SettlementWorker().drain()
+    job = get_settlement_job(repository_name, issue_number)
+    if job is not None and job["status"] == "done":
+        return "Contribution evaluation completed successfully."
+    if job is not None and job["last_error"]:
+        return f"Contribution evaluation is pending at the {job['stage']} stage: {job['last_error']}"
+    return f"Contribution evaluation queued (settlement job {job_id})."
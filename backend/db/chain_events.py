@@ -0,0 +1,214 @@
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from db.connection import get_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Columns of each event table, in insertion order
+EVENT_COLUMNS = {
+    "reward_locked_events": ("block_number", "log_index", "tx_hash", "repository_hash", "issue_id", "reward", "token_address", "user_address"),
+    "issue_completed_events": ("block_number", "log_index", "tx_hash", "repository_hash", "issue_id"),
+    "issue_contributors": ("block_number", "log_index", "position", "repository_hash", "issue_id", "github_id", "github_id_hash"),
+    "reward_claimed_events": ("block_number", "log_index", "tx_hash", "repository_hash", "issue_id", "github_id_hash", "claimant"),
+    "github_linked_events": ("block_number", "log_index", "tx_hash", "github_id_hash", "contributor_address"),
+}
+
+def get_cursor() -> Optional[dict]:
+    """
+    Retrieve the indexed contract and the last block whose events are stored.
+    Returns None if nothing was indexed yet or in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT contract_address, block_number FROM chain_cursor WHERE id = 1")
+            row = cur.fetchone()
+            return {"contract_address": row[0], "block_number": row[1]} if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve the chain cursor: {str(e)}")
+        return None
+
+def reset_events(contract_address: str, block_number: int) -> bool:
+    """
+    Delete every indexed event and start indexing contract_address after block_number.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            for table in EVENT_COLUMNS:
+                cur.execute(f"DELETE FROM {table}")
+            cur.execute("DELETE FROM chain_blocks")
+            cur.execute(
+                """
+                INSERT INTO chain_cursor(id, contract_address, block_number, updated_at) VALUES (1, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET contract_address = excluded.contract_address,
+                    block_number = excluded.block_number, updated_at = excluded.updated_at
+                """,
+                (contract_address, block_number, time.time())
+            )
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to reset the indexed events: {str(e)}")
+        return False
+
+def save_events(to_block: int, events: Dict[str, List[tuple]], block_hash: Optional[str] = None, keep_blocks_from: Optional[int] = None) -> bool:
+    """
+    Store the events of the blocks up to to_block and move the cursor there, in one transaction.
+    events maps event tables to rows in EVENT_COLUMNS order. block_hash, if given, is recorded
+    for reorg detection; hashes of blocks before keep_blocks_from are dropped.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            for table, rows in events.items():
+                if rows:
+                    columns = EVENT_COLUMNS[table]
+                    # A range indexed again after a crash or rewind inserts the same (block, log index)
+                    cur.executemany(
+                        f"INSERT OR IGNORE INTO {table}({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        rows
+                    )
+            if block_hash is not None:
+                cur.execute("INSERT OR REPLACE INTO chain_blocks(block_number, block_hash) VALUES (?, ?)", (to_block, block_hash))
+            if keep_blocks_from is not None:
+                cur.execute("DELETE FROM chain_blocks WHERE block_number < ?", (keep_blocks_from,))
+            cur.execute("UPDATE chain_cursor SET block_number = ?, updated_at = ? WHERE id = 1", (to_block, time.time()))
+            con.commit()
+            return cur.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save the events up to block {to_block}: {str(e)}")
+        return False
+
+def get_recent_blocks() -> List[Tuple[int, str]]:
+    """
+    Retrieve the recorded (block number, block hash) pairs, newest first.
+    Returns an empty list in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT block_number, block_hash FROM chain_blocks ORDER BY block_number DESC")
+            return cur.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve the recent blocks: {str(e)}")
+        return []
+
+def rewind_events(block_number: int) -> bool:
+    """
+    Delete the events and block hashes after block_number and move the cursor back to it,
+    e.g. after a reorg replaced those blocks.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            for table in EVENT_COLUMNS:
+                cur.execute(f"DELETE FROM {table} WHERE block_number > ?", (block_number,))
+            cur.execute("DELETE FROM chain_blocks WHERE block_number > ?", (block_number,))
+            cur.execute("UPDATE chain_cursor SET block_number = ?, updated_at = ? WHERE id = 1", (block_number, time.time()))
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to rewind the events to block {block_number}: {str(e)}")
+        return False
+
+def get_issue_claim_status(repository_hash: str, issue_id: int) -> Optional[dict]:
+    """
+    Retrieve the on-chain state of an issue: the locked rewards, whether it is completed,
+    and for each contributor whether the reward was claimed.
+    Returns None in case of error.
+    """
+    # claimReward does not refuse a second claim; with MIN(), SQLite returns the columns of the first one
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT reward, token_address, user_address, tx_hash, block_number FROM reward_locked_events
+                WHERE repository_hash = ? AND issue_id = ? ORDER BY block_number, log_index
+                """,
+                (repository_hash, issue_id)
+            )
+            locks = [
+                {"reward": row[0], "token_address": row[1], "user_address": row[2], "tx_hash": row[3], "block_number": row[4]}
+                for row in cur.fetchall()
+            ]
+            cur.execute(
+                "SELECT tx_hash, block_number FROM issue_completed_events WHERE repository_hash = ? AND issue_id = ? LIMIT 1",
+                (repository_hash, issue_id)
+            )
+            completion = cur.fetchone()
+            cur.execute(
+                """
+                SELECT c.github_id, r.claimant, r.tx_hash, MIN(r.block_number) FROM issue_contributors c
+                LEFT JOIN reward_claimed_events r ON r.repository_hash = c.repository_hash
+                    AND r.issue_id = c.issue_id AND r.github_id_hash = c.github_id_hash
+                WHERE c.repository_hash = ? AND c.issue_id = ?
+                GROUP BY c.block_number, c.log_index, c.position ORDER BY c.position
+                """,
+                (repository_hash, issue_id)
+            )
+            contributors = [
+                {"github_id": row[0], "claimed": row[1] is not None, "claimant": row[1], "claim_tx_hash": row[2], "claim_block_number": row[3]}
+                for row in cur.fetchall()
+            ]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve the claim status of issue {issue_id}: {str(e)}")
+        return None
+    return {
+        "locks": locks,
+        "completed": completion is not None,
+        "completion_tx_hash": completion[0] if completion else None,
+        "contributors": contributors,
+    }
+
+def get_contributor_claims(github_id: str) -> Optional[List[dict]]:
+    """
+    Retrieve the completed issues a GitHub id contributed to, with whether the reward was claimed.
+    Returns None in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT c.repository_hash, c.issue_id, r.claimant, r.tx_hash, MIN(r.block_number) FROM issue_contributors c
+                LEFT JOIN reward_claimed_events r ON r.repository_hash = c.repository_hash
+                    AND r.issue_id = c.issue_id AND r.github_id_hash = c.github_id_hash
+                WHERE c.github_id = ?
+                GROUP BY c.block_number, c.log_index, c.position ORDER BY c.block_number, c.log_index
+                """,
+                (github_id,)
+            )
+            return [
+                {"repository_hash": row[0], "issue_id": row[1], "claimed": row[2] is not None, "claimant": row[2],
+                 "claim_tx_hash": row[3], "claim_block_number": row[4]}
+                for row in cur.fetchall()
+            ]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve the claims of {github_id}: {str(e)}")
+        return None
+
+def get_linked_addresses(github_id_hash: str) -> List[str]:
+    """
+    Retrieve the addresses linked to a GitHub id (hash) by GitHubLinked events, latest last.
+    Returns an empty list in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                "SELECT contributor_address FROM github_linked_events WHERE github_id_hash = ? ORDER BY block_number, log_index",
+                (github_id_hash,)
+            )
+            return [row[0] for row in cur.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve the addresses linked to {github_id_hash}: {str(e)}")
+        return []
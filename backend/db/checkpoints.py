@@ -0,0 +1,211 @@
+import sqlite3
+import time
+from typing import Iterator, List, Optional, Tuple
+import logging
+
+from db.connection import get_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Serialized values are stored as (type, bytes) pairs produced by the checkpointer's serializer
+Typed = Tuple[str, bytes]
+
+# The functions reading and writing checkpoints raise sqlite3.Error instead of returning a
+# default: losing a checkpoint silently would corrupt the conversation, so the agent run must fail.
+
+def save_checkpoint(thread_id: str, checkpoint_ns: str, checkpoint_id: str, parent_checkpoint_id: Optional[str],
+                    checkpoint: Typed, metadata: Typed) -> None:
+    """
+    Store a checkpoint and record activity on its thread.
+    """
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute(
+            """
+            INSERT OR REPLACE INTO checkpoints(
+                thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                type, checkpoint, metadata_type, metadata
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, *checkpoint, *metadata)
+        )
+        cur.execute(
+            "INSERT OR REPLACE INTO checkpoint_threads(thread_id, last_access) VALUES (?, ?)",
+            (thread_id, time.time())
+        )
+        con.commit()
+
+def save_writes(thread_id: str, checkpoint_ns: str, checkpoint_id: str,
+                writes: List[Tuple[str, int, str, str, bytes]], replace: bool) -> None:
+    """
+    Store pending writes given as (task_id, idx, channel, type, value) rows.
+    Existing rows are kept unless replace is True.
+    """
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.executemany(
+            f"""
+            INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO checkpoint_writes(
+                thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(thread_id, checkpoint_ns, checkpoint_id, *write) for write in writes]
+        )
+        con.commit()
+
+def get_checkpoint(thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str] = None) -> Optional[tuple]:
+    """
+    Retrieve a checkpoint, or the latest one of the thread if checkpoint_id is None, as
+    (checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata).
+    Returns None if there is no such checkpoint.
+    """
+    with get_connection() as con:
+        cur = con.cursor()
+        if checkpoint_id is None:
+            # Checkpoint ids are time-ordered, so the greatest id is the latest checkpoint
+            cur.execute(
+                """
+                SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata
+                FROM checkpoints
+                WHERE thread_id = ? AND checkpoint_ns = ?
+                ORDER BY checkpoint_id DESC
+                LIMIT 1
+                """,
+                (thread_id, checkpoint_ns)
+            )
+        else:
+            cur.execute(
+                """
+                SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata
+                FROM checkpoints
+                WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+                """,
+                (thread_id, checkpoint_ns, checkpoint_id)
+            )
+        return cur.fetchone()
+
+def get_writes(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[tuple]:
+    """
+    Retrieve the pending writes of a checkpoint as (task_id, idx, channel, type, value) rows.
+    """
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute(
+            """
+            SELECT task_id, idx, channel, type, value
+            FROM checkpoint_writes
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+            ORDER BY task_id, idx
+            """,
+            (thread_id, checkpoint_ns, checkpoint_id)
+        )
+        return cur.fetchall()
+
+def list_checkpoints(thread_id: Optional[str] = None, checkpoint_ns: Optional[str] = None,
+                     before: Optional[str] = None, limit: Optional[int] = None) -> Iterator[tuple]:
+    """
+    Iterate over checkpoints, newest first, as (thread_id, checkpoint_ns, checkpoint_id,
+    parent_checkpoint_id, type, checkpoint, metadata_type, metadata) rows.
+    """
+    conditions = []
+    params = []
+    if thread_id is not None:
+        conditions.append("thread_id = ?")
+        params.append(thread_id)
+    if checkpoint_ns is not None:
+        conditions.append("checkpoint_ns = ?")
+        params.append(checkpoint_ns)
+    if before is not None:
+        conditions.append("checkpoint_id < ?")
+        params.append(before)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = " LIMIT ?"
+        params.append(limit)
+
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute(
+            f"""
+            SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                   type, checkpoint, metadata_type, metadata
+            FROM checkpoints{where}
+            ORDER BY checkpoint_id DESC{limit_clause}
+            """,
+            params
+        )
+        # Fetched eagerly: the caller may checkpoint on this thread's connection while iterating
+        rows = cur.fetchall()
+    yield from rows
+
+def expire_threads(max_idle_seconds: int) -> List[str]:
+    """
+    Delete every thread without a checkpoint for more than max_idle_seconds, with its
+    checkpoints and pending writes.
+    Returns the ids of the deleted threads.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                "SELECT thread_id FROM checkpoint_threads WHERE last_access < ?",
+                (time.time() - max_idle_seconds,)
+            )
+            expired = [row[0] for row in cur.fetchall()]
+            for thread_id in expired:
+                cur.execute("DELETE FROM checkpoint_writes WHERE thread_id = ?", (thread_id,))
+                cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                cur.execute("DELETE FROM checkpoint_threads WHERE thread_id = ?", (thread_id,))
+            con.commit()
+            if expired:
+                logger.info(f"Expired {len(expired)} idle conversation threads")
+            return expired
+    except sqlite3.Error as e:
+        logger.error(f"Failed to expire idle conversation threads: {str(e)}")
+        return []
+
+def compact_checkpoints(keep: int, since: float = 0) -> int:
+    """
+    Delete all but the newest `keep` checkpoints of each thread and namespace, together with
+    their pending writes. Only threads active since the given timestamp are compacted.
+    Returns the number of deleted checkpoints.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT c.rowid, ROW_NUMBER() OVER (
+                            PARTITION BY c.thread_id, c.checkpoint_ns ORDER BY c.checkpoint_id DESC
+                        ) AS position
+                        FROM checkpoints c
+                        JOIN checkpoint_threads t ON t.thread_id = c.thread_id
+                        WHERE t.last_access >= ?
+                    )
+                    WHERE position > ?
+                )
+                """,
+                (since, keep)
+            )
+            deleted = cur.rowcount
+            if deleted:
+                cur.execute("""
+                    DELETE FROM checkpoint_writes WHERE NOT EXISTS (
+                        SELECT 1 FROM checkpoints c
+                        WHERE c.thread_id = checkpoint_writes.thread_id
+                          AND c.checkpoint_ns = checkpoint_writes.checkpoint_ns
+                          AND c.checkpoint_id = checkpoint_writes.checkpoint_id
+                    )
+                """)
+                logger.info(f"Compacted {deleted} old conversation checkpoints")
+            con.commit()
+            return deleted
+    except sqlite3.Error as e:
+        logger.error(f"Failed to compact conversation checkpoints: {str(e)}")
+        return 0
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import time
+from typing import Optional
+import logging
+
+from db.connection import get_connection
+from db.http_cache import HTTP_CACHE_DB
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Commits are immutable, so entries never go stale; the cache is only bounded by size
+COMMIT_CACHE_MAX_BYTES = int(os.environ.get("COMMIT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# A hit only records its access time when the stored one is older than this many seconds, so most
+# hits are plain reads; eviction order is approximate within this interval
+COMMIT_CACHE_TOUCH_INTERVAL = float(os.environ.get("COMMIT_CACHE_TOUCH_INTERVAL", "3600"))
+
+def setup_commit_cache() -> None:
+    """
+    Create the table holding commit details keyed by SHA.
+    """
+    try:
+        with get_connection(HTTP_CACHE_DB) as con:
+            cur = con.cursor()
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS commit_cache(
+                    sha TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_commit_cache_last_access ON commit_cache(last_access)")
+            # Running total of the cached sizes, kept by triggers so a save does not sum the table
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS commit_cache_size(
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total INTEGER NOT NULL
+                )
+            """)
+            cur.execute("INSERT OR IGNORE INTO commit_cache_size(id, total) SELECT 1, COALESCE(SUM(size), 0) FROM commit_cache")
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS commit_cache_size_insert AFTER INSERT ON commit_cache BEGIN
+                    UPDATE commit_cache_size SET total = total + new.size WHERE id = 1;
+                END
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS commit_cache_size_delete AFTER DELETE ON commit_cache BEGIN
+                    UPDATE commit_cache_size SET total = total - old.size WHERE id = 1;
+                END
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS commit_cache_size_update AFTER UPDATE OF size ON commit_cache BEGIN
+                    UPDATE commit_cache_size SET total = total + new.size - old.size WHERE id = 1;
+                END
+            """)
+            con.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Failed to setup commit cache: {str(e)}")
+        raise
+
+def get_cached_commit(sha: str, touch_interval: float = COMMIT_CACHE_TOUCH_INTERVAL) -> Optional[str]:
+    """
+    Retrieve the cached commit details for the given SHA, marking them as recently used if
+    they were last marked more than touch_interval seconds ago.
+    Returns None if the commit is not cached or in case of error.
+    """
+    try:
+        with get_connection(HTTP_CACHE_DB) as con:
+            cur = con.cursor()
+            cur.execute("SELECT body, last_access FROM commit_cache WHERE sha = ?", (sha,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > touch_interval:
+                cur.execute("UPDATE commit_cache SET last_access = ? WHERE sha = ?", (now, sha))
+                con.commit()
+            return row[0]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve cached commit {sha}: {str(e)}")
+        return None
+
+def save_cached_commit(sha: str, body: str, max_bytes: int = COMMIT_CACHE_MAX_BYTES) -> bool:
+    """
+    Store the commit details for the given SHA, then evict the least recently used
+    commits until the cache fits in max_bytes.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection(HTTP_CACHE_DB) as con:
+            cur = con.cursor()
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete does not fire the size trigger
+            cur.execute(
+                """
+                INSERT INTO commit_cache(sha, body, size, last_access) VALUES (?, ?, ?, ?)
+                ON CONFLICT(sha) DO UPDATE SET body = excluded.body, size = excluded.size, last_access = excluded.last_access
+                """,
+                (sha, body, len(body.encode()), time.time())
+            )
+
+            cur.execute("SELECT total FROM commit_cache_size WHERE id = 1")
+            excess = cur.fetchone()[0] - max_bytes
+            if excess > 0:
+                evicted = []
+                # Read only as many of the oldest entries as needed
+                for evict_sha, size in con.execute("SELECT sha, size FROM commit_cache ORDER BY last_access"):
+                    if excess <= 0:
+                        break
+                    evicted.append((evict_sha,))
+                    excess -= size
+                cur.executemany("DELETE FROM commit_cache WHERE sha = ?", evicted)
+                logger.info(f"Evicted {len(evicted)} commits from the commit cache")
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save cached commit {sha}: {str(e)}")
+        return False
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import threading
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DB_PATH = "agent.db"
+# Milliseconds a connection waits for a lock held by another writer before failing
+BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+# Number of prepared statements kept per connection
+STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "256"))
+
+_local = threading.local()
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    # WAL lets readers run while a writer commits; NORMAL only syncs at checkpoints, which is safe in WAL mode
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return con
+
+def get_connection(path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    Return this thread's connection to the given database, opening it on first use.
+
+    Connections are reused for the lifetime of the thread, so prepared statements
+    stay cached between calls. Use it as `with get_connection() as con:`, which
+    commits on success and rolls back on error without closing the connection.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    con = connections.get(path)
+    if con is None:
+        con = connections[path] = _open_connection(path)
+    return con
+
+def close_connections() -> None:
+    """
+    Close every connection opened by the current thread.
+    """
+    connections = getattr(_local, "connections", None) or {}
+    for path, con in list(connections.items()):
+        try:
+            con.close()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to close connection to {path}: {str(e)}")
+    connections.clear()
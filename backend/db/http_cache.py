@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import time
+from typing import Optional
+import logging
+
+from db.connection import get_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The cache lives in its own file next to agent.db so it can be deleted at any time
+HTTP_CACHE_DB = os.environ.get("GITHUB_CACHE_DB", "github_cache.db")
+# Responses not revalidated for this many seconds are dropped; a week by default
+HTTP_CACHE_MAX_AGE = float(os.environ.get("HTTP_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+# Total size of the cached responses, beyond which the least recently used are evicted
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+# A 304 only records its access time when the stored one is older than this many seconds
+HTTP_CACHE_TOUCH_INTERVAL = float(os.environ.get("HTTP_CACHE_TOUCH_INTERVAL", "3600"))
+
+def setup_http_cache() -> None:
+    """
+    Create the table holding cached GitHub responses and their validators, keyed by the
+    identity that requested them and the URL.
+    """
+    try:
+        with get_connection(HTTP_CACHE_DB) as con:
+            cur = con.cursor()
+            # Caches made before responses were keyed by identity are dropped; they only cost a refetch
+            columns = [row[1] for row in cur.execute("PRAGMA table_info(http_cache)")]
+            if columns and "identity" not in columns:
+                cur.execute("DROP TABLE http_cache")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache(
+                    identity TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    link TEXT,
+                    body TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (identity, url)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_updated_at ON http_cache(updated_at)")
+            # Running total of the cached sizes, kept by triggers like commit_cache_size
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache_size(
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total INTEGER NOT NULL
+                )
+            """)
+            cur.execute("INSERT OR REPLACE INTO http_cache_size(id, total) SELECT 1, COALESCE(SUM(size), 0) FROM http_cache")
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS http_cache_size_insert AFTER INSERT ON http_cache BEGIN
+                    UPDATE http_cache_size SET total = total + new.size WHERE id = 1;
+                END
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS http_cache_size_delete AFTER DELETE ON http_cache BEGIN
+                    UPDATE http_cache_size SET total = total - old.size WHERE id = 1;
+                END
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS http_cache_size_update AFTER UPDATE OF size ON http_cache BEGIN
+                    UPDATE http_cache_size SET total = total + new.size - old.size WHERE id = 1;
+                END
+            """)
+            con.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Failed to setup http cache: {str(e)}")
+        raise
+
+def get_cached_response(url: str, identity: str = "") -> Optional[dict]:
+    """
+    Retrieve the response cached for the given URL and identity.
+    Returns None if the URL is not cached or in case of error.
+    """
+    try:
+        with get_connection(HTTP_CACHE_DB) as con:
+            cur = con.cursor()
+            cur.execute(
+                "SELECT etag, last_modified, link, body, updated_at FROM http_cache WHERE identity = ? AND url = ?",
+                (identity, url)
+            )
+            row = cur.fetchone()
+            if row is None:
+                return None
+            return {
+                "etag": row[0],
+                "last_modified": row[1],
+                "link": row[2],
+                "body": row[3],
+                "updated_at": row[4],
+            }
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve cached response for {url}: {str(e)}")
+        return None
+
+def touch_cached_response(url: str, identity: str = "") -> bool:
+    """
+    Mark the response cached for the given URL and identity as revalidated now.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection(HTTP_CACHE_DB) as con:
+            cur = con.cursor()
+            cur.execute(
+                "UPDATE http_cache SET updated_at = ? WHERE identity = ? AND url = ?",
+                (time.time(), identity, url)
+            )
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to touch cached response for {url}: {str(e)}")
+        return False
+
+def save_cached_response(url: str,
+                         etag: Optional[str],
+                         last_modified: Optional[str],
+                         link: Optional[str],
+                         body: str,
+                         identity: str = "",
+                         max_age: float = HTTP_CACHE_MAX_AGE,
+                         max_bytes: int = HTTP_CACHE_MAX_BYTES) -> bool:
+    """
+    Store or replace the response cached for the given URL and identity, then drop the
+    responses older than max_age seconds and evict the least recently used until the cache
+    fits in max_bytes.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection(HTTP_CACHE_DB) as con:
+            cur = con.cursor()
+            now = time.time()
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete does not fire the size trigger
+            cur.execute(
+                """
+                INSERT INTO http_cache(identity, url, etag, last_modified, link, body, size, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(identity, url) DO UPDATE SET
+                    etag = excluded.etag, last_modified = excluded.last_modified, link = excluded.link,
+                    body = excluded.body, size = excluded.size, updated_at = excluded.updated_at
+                """,
+                (identity, url, etag, last_modified, link, body, len(body.encode()), now)
+            )
+
+            cur.execute("DELETE FROM http_cache WHERE updated_at < ?", (now - max_age,))
+            expired = cur.rowcount
+            cur.execute("SELECT total FROM http_cache_size WHERE id = 1")
+            excess = cur.fetchone()[0] - max_bytes
+            evicted = []
+            if excess > 0:
+                # Read only as many of the oldest entries as needed
+                for evict_identity, evict_url, size in con.execute("SELECT identity, url, size FROM http_cache ORDER BY updated_at"):
+                    if excess <= 0:
+                        break
+                    evicted.append((evict_identity, evict_url))
+                    excess -= size
+                cur.executemany("DELETE FROM http_cache WHERE identity = ? AND url = ?", evicted)
+            if expired or evicted:
+                logger.info(f"Dropped {expired} expired and evicted {len(evicted)} responses from the http cache")
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save cached response for {url}: {str(e)}")
+        return False
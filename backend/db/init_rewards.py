@@ -1,5 +1,5 @@
 import logging
-from setup import initialize_rewards_table
+from db.setup import initialize_rewards_table
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
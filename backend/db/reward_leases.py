@@ -0,0 +1,143 @@
+import math
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+import logging
+
+from db.connection import get_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LEASED_REWARD_COLUMNS = ("id", "repository_name", "issue_id", "reward_amount")
+
+def sync_reward_leases(worker_id: str, lease_seconds: float, pinned_ids: Iterable[int] = ()) -> Optional[List[dict]]:
+    """
+    Heartbeat of an issue monitor process: renews its leases and rebalances the open rewards.
+
+    In one write transaction, the worker's heartbeat and leases are extended by lease_seconds,
+    workers without a heartbeat for lease_seconds are forgotten, and the worker converges
+    on its fair share of the open rewards (open rewards / live workers, rounded up): it claims
+    unleased or expired rewards, lowest id first, or releases its highest ids beyond its
+    share so newer peers can claim them. Rewards in pinned_ids (being processed) are never released.
+    Returns the open rewards leased by the worker, or None in case of error.
+    """
+    now = time.time()
+    expires_at = now + lease_seconds
+    pinned_ids = set(pinned_ids)
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            # Take the write lock up front, so two workers never count and claim from the same snapshot
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(
+                """
+                INSERT INTO monitor_workers(worker_id, heartbeat_at) VALUES (?, ?)
+                ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+                """,
+                (worker_id, now)
+            )
+            cur.execute("DELETE FROM monitor_workers WHERE heartbeat_at < ?", (now - lease_seconds,))
+            cur.execute(
+                "UPDATE rewards SET lease_expires_at = ? WHERE lease_owner = ? AND is_merged = 0",
+                (expires_at, worker_id)
+            )
+            owned = cur.rowcount
+
+            cur.execute("SELECT COUNT(*) FROM monitor_workers")
+            workers = cur.fetchone()[0]
+            cur.execute("SELECT COUNT(*) FROM rewards WHERE is_merged = 0")
+            share = math.ceil(cur.fetchone()[0] / workers)
+
+            if owned > share:
+                cur.execute(
+                    "SELECT id FROM rewards WHERE lease_owner = ? AND is_merged = 0 ORDER BY id DESC",
+                    (worker_id,)
+                )
+                released = [row[0] for row in cur.fetchall() if row[0] not in pinned_ids][:owned - share]
+                cur.executemany(
+                    "UPDATE rewards SET lease_owner = NULL, lease_expires_at = NULL WHERE id = ?",
+                    [(reward_id,) for reward_id in released]
+                )
+            elif owned < share:
+                cur.execute(
+                    """
+                    UPDATE rewards SET lease_owner = ?, lease_expires_at = ?
+                    WHERE id IN (
+                        SELECT id FROM rewards
+                        WHERE is_merged = 0 AND (lease_owner IS NULL OR lease_expires_at < ?)
+                        ORDER BY id
+                        LIMIT ?
+                    )
+                    """,
+                    (worker_id, expires_at, now, share - owned)
+                )
+
+            cur.execute(
+                f"SELECT {', '.join(LEASED_REWARD_COLUMNS)} FROM rewards WHERE lease_owner = ? AND is_merged = 0 ORDER BY id",
+                (worker_id,)
+            )
+            rewards = [dict(zip(LEASED_REWARD_COLUMNS, row)) for row in cur.fetchall()]
+            con.commit()
+            return rewards
+    except sqlite3.Error as e:
+        logger.error(f"Failed to synchronize the reward leases of {worker_id}: {str(e)}")
+        return None
+
+def get_open_rewards_for_issue(issue_id: int) -> List[dict]:
+    """
+    Retrieve the open rewards of the given issue number, in any repository.
+    Returns an empty list in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                f"SELECT {', '.join(LEASED_REWARD_COLUMNS)} FROM rewards WHERE issue_id = ? AND is_merged = 0",
+                (issue_id,)
+            )
+            return [dict(zip(LEASED_REWARD_COLUMNS, row)) for row in cur.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve the open rewards of issue {issue_id}: {str(e)}")
+        return []
+
+def take_over_reward_lease(reward_id: int, worker_id: str, lease_seconds: float) -> bool:
+    """
+    Lease one open reward to worker_id, whoever holds it. Used when this process received
+    the webhook of an issue another process monitors, so the close is handled without
+    waiting for the owner's next poll; the owner drops the reward at its next heartbeat.
+    Returns True if the reward is open and now leased by worker_id.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                "UPDATE rewards SET lease_owner = ?, lease_expires_at = ? WHERE id = ? AND is_merged = 0",
+                (worker_id, time.time() + lease_seconds, reward_id)
+            )
+            con.commit()
+            return cur.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Failed to take over the lease of reward {reward_id}: {str(e)}")
+        return False
+
+def release_reward_leases(worker_id: str) -> int:
+    """
+    Release every lease of a worker that stops, so its peers take its rewards over
+    at their next heartbeat instead of waiting for the leases to expire.
+    Returns the number of released rewards.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                "UPDATE rewards SET lease_owner = NULL, lease_expires_at = NULL WHERE lease_owner = ?",
+                (worker_id,)
+            )
+            released = cur.rowcount
+            cur.execute("DELETE FROM monitor_workers WHERE worker_id = ?", (worker_id,))
+            con.commit()
+            return released
+    except sqlite3.Error as e:
+        logger.error(f"Failed to release the reward leases of {worker_id}: {str(e)}")
+        return 0
@@ -1,10 +1,52 @@
 import sqlite3
-from typing import List, Tuple
+import time
+from typing import Iterator, List, Optional, Sequence, Tuple
 import logging
 
+from db.connection import get_connection
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def get_rewards_version() -> Optional[int]:
+    """
+    Return the version of the rewards table, which triggers bump in the transaction of every
+    write, whichever process makes it.
+    Returns None in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT version FROM table_versions WHERE name = 'rewards'")
+            row = cur.fetchone()
+            return row[0] if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve the rewards version: {str(e)}")
+        return None
+
+def _add_reward(cur, repository_name: str, issue_id: int, reward_amount: int, issue_title: str, issue_body: str) -> None:
+    # Check if the reward already exists
+    cur.execute("""
+        SELECT reward_amount FROM rewards
+        WHERE repository_name = ? AND issue_id = ?
+    """, (repository_name, issue_id))
+    row = cur.fetchone()
+
+    if row:
+        # If exists, update the reward_amount
+        new_amount = row[0] + reward_amount
+        cur.execute("""
+            UPDATE rewards
+            SET reward_amount = ?
+            WHERE repository_name = ? AND issue_id = ?
+        """, (new_amount, repository_name, issue_id))
+    else:
+        # If not exists, insert the new reward
+        cur.execute("""
+            INSERT INTO rewards(repository_name, issue_id, reward_amount, is_merged, issue_title, issue_body)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (repository_name, issue_id, reward_amount, 0, issue_title, issue_body))
+
 def add_reward(repository_name: str, issue_id: int, reward_amount: int, issue_title: str, issue_body: str) -> bool:
     """
     Add a reward to the database.
@@ -12,31 +54,9 @@ def add_reward(repository_name: str, issue_id: int, reward_amount: int, issue_ti
     Returns True if successful, False otherwise.
     """
     try:
-        with sqlite3.connect("agent.db") as con:
+        with get_connection() as con:
             cur = con.cursor()
-            
-            # Check if the reward already exists
-            cur.execute("""
-                SELECT reward_amount FROM rewards
-                WHERE repository_name = ? AND issue_id = ?
-            """, (repository_name, issue_id))
-            row = cur.fetchone()
-            
-            if row:
-                # If exists, update the reward_amount
-                new_amount = row[0] + reward_amount
-                cur.execute("""
-                    UPDATE rewards
-                    SET reward_amount = ?
-                    WHERE repository_name = ? AND issue_id = ?
-                """, (new_amount, repository_name, issue_id))
-            else:
-                # If not exists, insert the new reward
-                cur.execute("""
-                    INSERT INTO rewards(repository_name, issue_id, reward_amount, is_merged, issue_title, issue_body)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (repository_name, issue_id, reward_amount, 0, issue_title, issue_body))
-            
+            _add_reward(cur, repository_name, issue_id, reward_amount, issue_title, issue_body)
             con.commit()
             
             # Verify the insertion or update
@@ -57,13 +77,85 @@ def add_reward(repository_name: str, issue_id: int, reward_amount: int, issue_ti
         logger.error(f"Unexpected error occurred: {str(e)}")
         return False
 
+def add_pending_reward_lock(label: str, repository_name: str, issue_id: int, reward_amount: int) -> bool:
+    """
+    Record a reward whose lockReward transaction, sent with label, is not confirmed yet.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                "INSERT INTO pending_reward_locks(label, repository_name, issue_id, reward_amount, created_at) VALUES (?, ?, ?, ?, ?)",
+                (label, repository_name, issue_id, reward_amount, time.time())
+            )
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to record the pending reward lock {label}: {str(e)}")
+        return False
+
+def get_pending_reward_locks() -> List[dict]:
+    """
+    Retrieve the rewards whose lockReward transaction is not confirmed yet, oldest first.
+    Returns an empty list in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT label, repository_name, issue_id, reward_amount FROM pending_reward_locks ORDER BY created_at")
+            return [
+                {"label": row[0], "repository_name": row[1], "issue_id": row[2], "reward_amount": row[3]}
+                for row in cur.fetchall()
+            ]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve the pending reward locks: {str(e)}")
+        return []
+
+def record_reward_lock(label: str, issue_title: str, issue_body: str) -> bool:
+    """
+    Add the reward of a confirmed lockReward transaction and drop its pending lock, in one
+    transaction, so a lock confirmed twice (e.g. again after a restart) is only counted once.
+    Returns True if the reward was added, False if it already was or in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT repository_name, issue_id, reward_amount FROM pending_reward_locks WHERE label = ?", (label,))
+            row = cur.fetchone()
+            if row is None:
+                return False
+            _add_reward(cur, row[0], row[1], row[2], issue_title, issue_body)
+            cur.execute("DELETE FROM pending_reward_locks WHERE label = ?", (label,))
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to record the reward lock {label}: {str(e)}")
+        return False
+
+def drop_pending_reward_lock(label: str) -> bool:
+    """
+    Forget a pending reward lock whose transaction failed.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("DELETE FROM pending_reward_locks WHERE label = ?", (label,))
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to drop the pending reward lock {label}: {str(e)}")
+        return False
+
 def get_rewards() -> List[Tuple[str, int, int]]:
     """
     Retrieve all rewards from the database.
-    Returns empty list if no rewards found or in case of error.
+    Returns empty list if no rewards found. Raises sqlite3.Error in case of database error,
+    so a failed read is not mistaken for an empty table.
     """
     try:
-        with sqlite3.connect("agent.db") as con:
+        with get_connection() as con:
             cur = con.cursor()
             cur.execute("SELECT repository_name, issue_id, reward_amount, id, is_merged, issue_title, issue_body FROM rewards")
             results = cur.fetchall()
@@ -72,17 +164,14 @@ def get_rewards() -> List[Tuple[str, int, int]]:
             
     except sqlite3.Error as e:
         logger.error(f"Failed to retrieve rewards: {str(e)}")
-        return []
-    except Exception as e:
-        logger.error(f"Unexpected error while retrieving rewards: {str(e)}")
-        return [] 
+        raise
     
 def mark_reward_as_merged(repository_name: str, issue_id: int) -> bool:
     """
     Update is_merged to 1 for the specified repository and issue.
     """
     try:
-        with sqlite3.connect("agent.db") as con:
+        with get_connection() as con:
             cur = con.cursor()
             cur.execute(
                 """
@@ -113,7 +202,7 @@ def get_reward_id(repository_name: str, issue_id: int) -> int | None:
     Returns None if not found or in case of error.
     """
     try:
-        with sqlite3.connect("agent.db") as con:
+        with get_connection() as con:
             cur = con.cursor()
             cur.execute(
                 """
@@ -133,4 +222,124 @@ def get_reward_id(repository_name: str, issue_id: int) -> int | None:
         return None
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+def get_reward(reward_id: int) -> Optional[dict]:
+    """
+    Retrieve a reward by id as a dict of its columns (without issue_body).
+    Returns None if not found or in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                f"SELECT {', '.join(DEFAULT_REWARD_COLUMNS)} FROM rewards WHERE id = ?",
+                (reward_id,)
+            )
+            row = cur.fetchone()
+            return dict(zip(DEFAULT_REWARD_COLUMNS, row)) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve reward {reward_id}: {str(e)}")
+        return None
+
+def get_repository_names() -> List[str]:
+    """
+    Retrieve the distinct repository names of the rewards.
+    Returns an empty list in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT DISTINCT repository_name FROM rewards")
+            return [row[0] for row in cur.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve repository names: {str(e)}")
+        return []
+
+# Columns that can be selected through query_rewards
+REWARD_COLUMNS = ("id", "repository_name", "issue_id", "reward_amount", "is_merged", "issue_title", "issue_body")
+# Columns returned when none are requested; issue_body is only returned on request
+DEFAULT_REWARD_COLUMNS = ("id", "repository_name", "issue_id", "reward_amount", "is_merged", "issue_title")
+MAX_PAGE_SIZE = 1000
+
+def query_rewards(
+    status: Optional[str] = None,
+    repository_name: Optional[str] = None,
+    min_amount: Optional[int] = None,
+    max_amount: Optional[int] = None,
+    columns: Optional[Sequence[str]] = None,
+    include_body: bool = False,
+    after_id: Optional[int] = None,
+    limit: int = 100
+) -> Tuple[List[dict], Optional[int]]:
+    """
+    Retrieve one page of rewards ordered by id, using keyset pagination.
+    status is "open" (is_merged = 0) or "merged". Pass the returned cursor as
+    after_id to get the next page; it is None on the last page.
+    Raises ValueError for unknown columns or status, and sqlite3.Error in case of database error.
+    """
+    selected = list(columns) if columns else list(DEFAULT_REWARD_COLUMNS)
+    if include_body and "issue_body" not in selected:
+        selected.append("issue_body")
+    unknown = [column for column in selected if column not in REWARD_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown reward columns: {', '.join(unknown)}")
+    # The cursor is always needed
+    query_columns = selected if "id" in selected else ["id"] + selected
+
+    conditions = []
+    params = []
+    if status == "open":
+        # Matches the partial index idx_rewards_open
+        conditions.append("is_merged = 0")
+    elif status == "merged":
+        conditions.append("is_merged = 1")
+    elif status is not None:
+        raise ValueError(f"Unknown reward status: {status}")
+    if repository_name is not None:
+        conditions.append("repository_name = ?")
+        params.append(repository_name)
+    if min_amount is not None:
+        conditions.append("reward_amount >= ?")
+        params.append(min_amount)
+    if max_amount is not None:
+        conditions.append("reward_amount <= ?")
+        params.append(max_amount)
+    if after_id is not None:
+        conditions.append("id > ?")
+        params.append(after_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            # Fetch one extra row to know whether another page exists
+            cur.execute(
+                f"SELECT {', '.join(query_columns)} FROM rewards {where} ORDER BY id LIMIT ?",
+                params + [limit + 1]
+            )
+            rows = cur.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Failed to query rewards: {str(e)}")
+        raise
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rewards = [dict(zip(query_columns, row)) for row in rows]
+    next_cursor = rewards[-1]["id"] if has_more else None
+    if "id" not in selected:
+        for reward in rewards:
+            del reward["id"]
+    return rewards, next_cursor
+
+def iter_rewards(page_size: int = MAX_PAGE_SIZE, **filters) -> Iterator[dict]:
+    """
+    Iterate over every reward matching the query_rewards filters, one page at a time.
+    """
+    after_id = None
+    while True:
+        rewards, after_id = query_rewards(after_id=after_id, limit=page_size, **filters)
+        yield from rewards
+        if after_id is None:
+            return
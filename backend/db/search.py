@@ -0,0 +1,170 @@
+import os
+import re
+import sqlite3
+from typing import List, Optional, Tuple
+import logging
+
+from db.connection import get_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_SEARCH_PAGE_SIZE = 100
+# Title matches weigh more than body matches in the bm25 ranking
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+# Most matches ranked by one search: bm25 scores every match, so a broad query over 100k rewards
+# would take hundreds of milliseconds. Beyond this many, only the most recent matches are ranked
+SEARCH_MAX_CANDIDATES = int(os.environ.get("SEARCH_MAX_CANDIDATES", "2000"))
+
+def build_match_query(text: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the last word
+    also matches as a prefix so results update while typing.
+    Returns None if the text contains no searchable word.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def parse_search_cursor(cursor: str) -> Tuple[float, int, int]:
+    """
+    Split a cursor returned by search_rewards into the rank and reward id of the last result,
+    and the lowest reward id ranked by the search.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        rank, reward_id, min_id = cursor.split(":")
+        return float(rank), int(reward_id), int(min_id)
+    except ValueError:
+        raise ValueError(f"Invalid search cursor: {cursor}")
+
+def search_rewards(
+    text: str,
+    status: Optional[str] = None,
+    repository_name: Optional[str] = None,
+    min_amount: Optional[int] = None,
+    max_amount: Optional[int] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    max_candidates: int = SEARCH_MAX_CANDIDATES
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Search issue titles and bodies of rewards, ranked by bm25, using keyset pagination on
+    (rank, id) so a later page costs the same as the first. Only the max_candidates most
+    recent matches are ranked; the cursor keeps the same candidates for every page.
+    Each result has the reward columns, the highlighted title and a snippet of the body.
+    Returns (results, next_cursor); pass next_cursor as cursor to get the next page, it is
+    None on the last page.
+    Raises ValueError for an unknown status or a malformed cursor, and sqlite3.Error in case of database error.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return [], None
+
+    rank = f"bm25(rewards_fts, {TITLE_WEIGHT}, {BODY_WEIGHT})"
+    conditions = ["rewards_fts MATCH ?"]
+    params = [match]
+    if status == "open":
+        conditions.append("r.is_merged = 0")
+    elif status == "merged":
+        conditions.append("r.is_merged = 1")
+    elif status is not None:
+        raise ValueError(f"Unknown reward status: {status}")
+    if repository_name is not None:
+        conditions.append("r.repository_name = ?")
+        params.append(repository_name)
+    if min_amount is not None:
+        conditions.append("r.reward_amount >= ?")
+        params.append(min_amount)
+    if max_amount is not None:
+        conditions.append("r.reward_amount <= ?")
+        params.append(max_amount)
+    # Without reward filters the matches are ranked in the index alone, and only the page is joined
+    join = "JOIN rewards r ON r.id = rewards_fts.rowid" if len(conditions) > 1 else ""
+    after = parse_search_cursor(cursor) if cursor is not None else None
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            if after is not None:
+                min_id = after[2]
+            else:
+                # Walking the matches by rowid does not score them
+                cur.execute(
+                    f"""
+                    SELECT rewards_fts.rowid FROM rewards_fts {join}
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY rewards_fts.rowid DESC
+                    LIMIT 1 OFFSET ?
+                    """,
+                    params + [max_candidates - 1]
+                )
+                row = cur.fetchone()
+                min_id = row[0] if row else 0
+
+            # Rank first and only build highlights and snippets for the returned page;
+            # auxiliary functions in the ranking query would run for every match.
+            # Materialized, so the keyset condition does not score every candidate again
+            cur.execute(
+                f"""
+                WITH ranked AS MATERIALIZED (
+                    SELECT rewards_fts.rowid AS id, {rank} AS relevance
+                    FROM rewards_fts {join}
+                    WHERE {' AND '.join(conditions)} AND rewards_fts.rowid >= ?
+                )
+                SELECT id, relevance FROM ranked
+                {'WHERE relevance > ? OR (relevance = ? AND id > ?)' if after else ''}
+                ORDER BY relevance, id
+                LIMIT ?
+                """,
+                params + [min_id] + ([after[0], after[0], after[1]] if after else []) + [limit + 1]
+            )
+            rows = cur.fetchall()
+
+            page = rows[:limit]
+            page_ids = [row[0] for row in page]
+            placeholders = ", ".join("?" * len(page_ids))
+            cur.execute(
+                f"SELECT id, repository_name, issue_id, reward_amount, is_merged FROM rewards WHERE id IN ({placeholders})",
+                page_ids
+            )
+            rewards = {row[0]: row for row in cur.fetchall()}
+            cur.execute(
+                f"""
+                SELECT rowid,
+                       highlight(rewards_fts, 0, '<mark>', '</mark>'),
+                       snippet(rewards_fts, 1, '<mark>', '</mark>', '…', 24)
+                FROM rewards_fts
+                WHERE rewards_fts MATCH ? AND rowid BETWEEN ? AND ? AND rowid IN ({placeholders})
+                """,
+                # The index applies the range, not the IN list; the range stays within the candidates
+                [match, min(page_ids, default=0), max(page_ids, default=0)] + page_ids
+            )
+            excerpts = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+    except sqlite3.Error as e:
+        logger.error(f"Failed to search rewards for {text!r}: {str(e)}")
+        raise
+
+    # repr keeps every digit of the rank, so the next page starts exactly after this one
+    next_cursor = f"{page[-1][1]!r}:{page[-1][0]}:{min_id}" if len(rows) > limit else None
+    results = [
+        {
+            "id": reward_id,
+            "repository_name": rewards[reward_id][1],
+            "issue_id": rewards[reward_id][2],
+            "reward_amount": rewards[reward_id][3],
+            "is_merged": rewards[reward_id][4],
+            "issue_title": excerpts.get(reward_id, (None, None))[0],
+            "snippet": excerpts.get(reward_id, (None, None))[1],
+            "score": -relevance,
+        }
+        for reward_id, relevance in page
+        # A reward deleted between the two queries is left out
+        if reward_id in rewards
+    ]
+    return results, next_cursor
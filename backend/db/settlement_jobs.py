@@ -0,0 +1,214 @@
+import sqlite3
+import time
+from typing import List, Optional
+import logging
+
+from db.connection import get_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FIRST_STAGE = "collect"
+# Columns a completed stage may write its result to
+RESULT_COLUMNS = ("evidence", "distribution", "tx_result", "report_comment_id", "reward_id", "claim_comment_id")
+
+def _row_to_job(cur, row) -> dict:
+    return {column[0]: value for column, value in zip(cur.description, row)}
+
+def enqueue_settlement(repository_name: str, issue_id: int, issue_title: str, issue_body: str) -> Optional[int]:
+    """
+    Create the settlement job of a closed issue, unless the issue already has one.
+    Returns the id of the (new or existing) job, or None in case of error.
+    """
+    now = time.time()
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO settlement_jobs(
+                    repository_name, issue_id, issue_title, issue_body, stage, next_attempt_at, created_at, updated_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (repository_name, issue_id, issue_title or "", issue_body, FIRST_STAGE, now, now, now)
+            )
+            cur.execute(
+                "SELECT id FROM settlement_jobs WHERE repository_name = ? AND issue_id = ?",
+                (repository_name, issue_id)
+            )
+            con.commit()
+            return cur.fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to enqueue settlement of {repository_name} issue {issue_id}: {str(e)}")
+        return None
+
+def get_settlement_job(repository_name: str, issue_id: int) -> Optional[dict]:
+    """
+    Retrieve the settlement job of an issue as a dict of its columns.
+    Returns None if the issue has no job or in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                "SELECT * FROM settlement_jobs WHERE repository_name = ? AND issue_id = ?",
+                (repository_name, issue_id)
+            )
+            row = cur.fetchone()
+            return _row_to_job(cur, row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve settlement of {repository_name} issue {issue_id}: {str(e)}")
+        return None
+
+def claim_due_jobs(worker_id: str, stages: List[str], limit: int, lease_seconds: float) -> List[dict]:
+    """
+    Lock up to `limit` pending jobs whose current stage is one of `stages` and whose next
+    attempt is due, for lease_seconds. Jobs locked by a worker whose lease expired are claimed again.
+    Returns the claimed jobs.
+    """
+    if limit <= 0 or not stages:
+        return []
+    now = time.time()
+    locked_until = now + lease_seconds
+    placeholders = ", ".join("?" * len(stages))
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            # A single UPDATE, so two workers (or processes) never claim the same job
+            cur.execute(
+                f"""
+                UPDATE settlement_jobs
+                SET locked_by = ?, locked_until = ?, status = 'running', updated_at = ?
+                WHERE id IN (
+                    SELECT id FROM settlement_jobs
+                    WHERE stage IN ({placeholders})
+                      AND next_attempt_at <= ?
+                      AND (status = 'pending' OR (status = 'running' AND locked_until < ?))
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                """,
+                (worker_id, locked_until, now, *stages, now, now, limit)
+            )
+            cur.execute(
+                "SELECT * FROM settlement_jobs WHERE locked_by = ? AND locked_until = ? AND status = 'running'",
+                (worker_id, locked_until)
+            )
+            jobs = [_row_to_job(cur, row) for row in cur.fetchall()]
+            con.commit()
+            return jobs
+    except sqlite3.Error as e:
+        logger.error(f"Failed to claim settlement jobs: {str(e)}")
+        return []
+
+def renew_lease(job_id: int, worker_id: str, lease_seconds: float) -> bool:
+    """
+    Extend the lock of a job still held by worker_id, for stages that outlive one lease.
+    Returns False if the job is no longer locked by this worker.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                "UPDATE settlement_jobs SET locked_until = ? WHERE id = ? AND locked_by = ? AND status = 'running'",
+                (time.time() + lease_seconds, job_id, worker_id)
+            )
+            con.commit()
+            return cur.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Failed to renew the lease of settlement job {job_id}: {str(e)}")
+        return False
+
+def complete_stage(job_id: int, worker_id: str, next_stage: str, results: dict) -> bool:
+    """
+    Record the results of the current stage and move the job to next_stage ("done" ends it).
+    Returns False if the job is no longer locked by this worker or in case of error.
+    """
+    unknown = set(results) - set(RESULT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown settlement result columns: {', '.join(sorted(unknown))}")
+    assignments = "".join(f", {column} = ?" for column in results)
+    now = time.time()
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                f"""
+                UPDATE settlement_jobs
+                SET stage = ?, status = ?, attempts = 0, next_attempt_at = ?, last_error = NULL,
+                    locked_by = NULL, locked_until = NULL, updated_at = ?{assignments}
+                WHERE id = ? AND locked_by = ?
+                """,
+                (next_stage, "done" if next_stage == "done" else "pending", now, now, *results.values(), job_id, worker_id)
+            )
+            con.commit()
+            return cur.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Failed to complete stage of settlement job {job_id}: {str(e)}")
+        return False
+
+def fail_stage(job_id: int, worker_id: str, error: str, retry_at: Optional[float]) -> bool:
+    """
+    Record a failed attempt of the current stage. The stage is retried at retry_at;
+    with retry_at None the job is marked failed and left for an operator.
+    Returns False if the job is no longer locked by this worker or in case of error.
+    """
+    now = time.time()
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                UPDATE settlement_jobs
+                SET status = ?, attempts = attempts + 1, next_attempt_at = ?, last_error = ?,
+                    locked_by = NULL, locked_until = NULL, updated_at = ?
+                WHERE id = ? AND locked_by = ?
+                """,
+                ("pending" if retry_at is not None else "failed", retry_at or now, error, now, job_id, worker_id)
+            )
+            con.commit()
+            return cur.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Failed to record the failure of settlement job {job_id}: {str(e)}")
+        return False
+
+def retry_failed_job(job_id: int) -> bool:
+    """
+    Put a failed job back in the queue at the stage it failed on.
+    Returns True if the job was failed and is now pending.
+    """
+    now = time.time()
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                UPDATE settlement_jobs
+                SET status = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ?
+                WHERE id = ? AND status = 'failed'
+                """,
+                (now, now, job_id)
+            )
+            con.commit()
+            return cur.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retry settlement job {job_id}: {str(e)}")
+        return False
+
+def next_due_time(stages: List[str]) -> Optional[float]:
+    """
+    Return when the earliest pending job in one of `stages` becomes due, or None if there is none.
+    """
+    placeholders = ", ".join("?" * len(stages))
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                f"SELECT MIN(next_attempt_at) FROM settlement_jobs WHERE status = 'pending' AND stage IN ({placeholders})",
+                stages
+            )
+            return cur.fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to read the settlement queue: {str(e)}")
+        return None
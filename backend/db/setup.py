@@ -67,17 +67,27 @@
 #         raise
 import sqlite3
 import logging
+from db.connection import get_connection
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _add_column(cur, table: str, column: str, definition: str) -> None:
+    """
+    Add a column to an existing table unless it is already there (tables created by older versions).
+    """
+    cur.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cur.fetchall()]:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Added column {table}.{column}")
+
 def setup():
     """
     Initialize the database with proper table schemas including primary keys
     and appropriate constraints.
     """
     try:
-        with sqlite3.connect("agent.db") as con:
+        with get_connection() as con:
             cur = con.cursor()
             
             # Wallet table
@@ -98,9 +108,295 @@ def setup():
                     is_merged BOOLEAN NOT NULL DEFAULT 0,
                     issue_title TEXT NOT NULL,
                     issue_body TEXT,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
                     UNIQUE(repository_name, issue_id)
                 )
             """)
+
+            # Monitoring lease: the issue monitor owning the reward and until when (db.reward_leases)
+            _add_column(cur, "rewards", "lease_owner", "TEXT")
+            _add_column(cur, "rewards", "lease_expires_at", "REAL")
+
+            # Indexes for the reward query layer (db.rewards.query_rewards)
+            # Open rewards are what every monitor sweep reads; the partial index stays small as rewards are merged
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_rewards_open ON rewards(id) WHERE is_merged = 0")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_rewards_repository ON rewards(repository_name, id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_rewards_amount ON rewards(reward_amount, id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_rewards_lease_owner ON rewards(lease_owner, id) WHERE is_merged = 0")
+
+            # Version of the rewards table, bumped by triggers in the transaction of every write, so the
+            # processes sharing the database know when their cached /rewards responses are stale.
+            # Lease updates do not change the served rows and leave it alone.
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS table_versions(
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            """)
+            cur.execute("INSERT OR IGNORE INTO table_versions(name, version) VALUES ('rewards', 0)")
+            for event in ("INSERT", "DELETE", "UPDATE OF repository_name, issue_id, reward_amount, is_merged, issue_title, issue_body"):
+                cur.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS rewards_version_{event.split()[0].lower()} AFTER {event} ON rewards BEGIN
+                        UPDATE table_versions SET version = version + 1 WHERE name = 'rewards';
+                    END
+                """)
+
+            # Issue monitor processes sharing the rewards, with their last heartbeat
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS monitor_workers(
+                    worker_id TEXT PRIMARY KEY,
+                    heartbeat_at REAL NOT NULL
+                )
+            """)
+
+            # Full-text index over issue titles and bodies, kept in sync with rewards by triggers
+            cur.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'rewards_fts'")
+            fts_row = cur.fetchone()
+            if fts_row is not None and "prefix=" not in fts_row[0]:
+                # Indexes made before the prefix indexes are rebuilt with them
+                cur.execute("DROP TABLE rewards_fts")
+                fts_row = None
+            fts_exists = fts_row is not None
+            # The prefix indexes serve the last word of a search, matched as a prefix while typing,
+            # without merging the doclists of every term it starts
+            cur.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS rewards_fts USING fts5(
+                    issue_title,
+                    issue_body,
+                    content='rewards',
+                    content_rowid='id',
+                    tokenize='porter unicode61',
+                    prefix='2 3 4 5 6'
+                )
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS rewards_fts_insert AFTER INSERT ON rewards BEGIN
+                    INSERT INTO rewards_fts(rowid, issue_title, issue_body)
+                    VALUES (new.id, new.issue_title, new.issue_body);
+                END
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS rewards_fts_delete AFTER DELETE ON rewards BEGIN
+                    INSERT INTO rewards_fts(rewards_fts, rowid, issue_title, issue_body)
+                    VALUES ('delete', old.id, old.issue_title, old.issue_body);
+                END
+            """)
+            # Amount and merge updates do not touch the index
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS rewards_fts_update AFTER UPDATE OF issue_title, issue_body ON rewards BEGIN
+                    INSERT INTO rewards_fts(rewards_fts, rowid, issue_title, issue_body)
+                    VALUES ('delete', old.id, old.issue_title, old.issue_body);
+                    INSERT INTO rewards_fts(rowid, issue_title, issue_body)
+                    VALUES (new.id, new.issue_title, new.issue_body);
+                END
+            """)
+            if not fts_exists:
+                # Index the rewards created before the full-text table existed
+                cur.execute("INSERT INTO rewards_fts(rewards_fts) VALUES ('rebuild')")
+
+            # LLM contribution verdicts keyed by a hash of the evidence, model and prompt version
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS contribution_verdicts(
+                    evidence_hash TEXT PRIMARY KEY,
+                    repository_name TEXT NOT NULL,
+                    issue_id INTEGER NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    distribution TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+            # Processed GitHub webhook deliveries, used to drop redeliveries
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS webhook_deliveries(
+                    delivery_id TEXT PRIMARY KEY,
+                    event TEXT NOT NULL,
+                    received_at REAL NOT NULL
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_webhook_deliveries_received_at ON webhook_deliveries(received_at)")
+
+            # Agent conversation checkpoints (agent.checkpointer.SqliteCheckpointer)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints(
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    parent_checkpoint_id TEXT,
+                    type TEXT NOT NULL,
+                    checkpoint BLOB NOT NULL,
+                    metadata_type TEXT NOT NULL,
+                    metadata BLOB NOT NULL,
+                    PRIMARY KEY(thread_id, checkpoint_ns, checkpoint_id)
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoint_writes(
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    PRIMARY KEY(thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                )
+            """)
+            # Last activity per conversation, used to expire idle threads
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoint_threads(
+                    thread_id TEXT PRIMARY KEY,
+                    last_access REAL NOT NULL
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_checkpoint_threads_last_access ON checkpoint_threads(last_access)")
+
+            # Settlement of closed issues, one row per issue, advanced stage by stage by settlement.SettlementWorker
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS settlement_jobs(
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    repository_name TEXT NOT NULL,
+                    issue_id INTEGER NOT NULL,
+                    issue_title TEXT NOT NULL,
+                    issue_body TEXT,
+                    stage TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    locked_by TEXT,
+                    locked_until REAL,
+                    last_error TEXT,
+                    evidence TEXT,
+                    distribution TEXT,
+                    tx_result TEXT,
+                    report_comment_id INTEGER,
+                    reward_id INTEGER,
+                    claim_comment_id INTEGER,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    UNIQUE(repository_name, issue_id)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_settlement_jobs_due ON settlement_jobs(stage, next_attempt_at) WHERE status = 'pending'")
+
+            # Contract transactions sent by tx_submitter.TransactionSubmitter, tracked until their receipt
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS transactions(
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    label TEXT,
+                    contract_address TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    args TEXT NOT NULL,
+                    sender TEXT,
+                    nonce INTEGER,
+                    tx_hash TEXT,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    block_number INTEGER,
+                    gas_used INTEGER,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_transactions_label ON transactions(label, id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_transactions_unconfirmed ON transactions(id) WHERE status IN ('submitted', 'timeout')")
+            # Rewards whose lockReward transaction (found by its label) is not confirmed yet; moved to
+            # rewards on confirmation, also when the confirmation comes after a restart
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS pending_reward_locks(
+                    label TEXT PRIMARY KEY,
+                    repository_name TEXT NOT NULL,
+                    issue_id INTEGER NOT NULL,
+                    reward_amount INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+            # Contract events indexed by event_indexer.EventIndexer. Indexed strings are only logged as
+            # their keccak hash, so repositories and GitHub ids are stored as hashes (hex).
+            # The cursor is the last block whose events are stored, for one contract
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS chain_cursor(
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    contract_address TEXT NOT NULL,
+                    block_number INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            # Hashes of the recently indexed blocks, compared with the chain to detect reorgs
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS chain_blocks(
+                    block_number INTEGER PRIMARY KEY,
+                    block_hash TEXT NOT NULL
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS reward_locked_events(
+                    block_number INTEGER NOT NULL,
+                    log_index INTEGER NOT NULL,
+                    tx_hash TEXT NOT NULL,
+                    repository_hash TEXT NOT NULL,
+                    issue_id INTEGER NOT NULL,
+                    reward TEXT NOT NULL,
+                    token_address TEXT NOT NULL,
+                    user_address TEXT NOT NULL,
+                    PRIMARY KEY(block_number, log_index)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_reward_locked_events_issue ON reward_locked_events(repository_hash, issue_id)")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS issue_completed_events(
+                    block_number INTEGER NOT NULL,
+                    log_index INTEGER NOT NULL,
+                    tx_hash TEXT NOT NULL,
+                    repository_hash TEXT NOT NULL,
+                    issue_id INTEGER NOT NULL,
+                    PRIMARY KEY(block_number, log_index)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_issue_completed_events_issue ON issue_completed_events(repository_hash, issue_id)")
+            # One row per contributor of an IssueCompleted event, the only event logging GitHub ids in clear
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS issue_contributors(
+                    block_number INTEGER NOT NULL,
+                    log_index INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    repository_hash TEXT NOT NULL,
+                    issue_id INTEGER NOT NULL,
+                    github_id TEXT NOT NULL,
+                    github_id_hash TEXT NOT NULL,
+                    PRIMARY KEY(block_number, log_index, position)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_issue_contributors_issue ON issue_contributors(repository_hash, issue_id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_issue_contributors_github_id ON issue_contributors(github_id)")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS reward_claimed_events(
+                    block_number INTEGER NOT NULL,
+                    log_index INTEGER NOT NULL,
+                    tx_hash TEXT NOT NULL,
+                    repository_hash TEXT NOT NULL,
+                    issue_id INTEGER NOT NULL,
+                    github_id_hash TEXT NOT NULL,
+                    claimant TEXT NOT NULL,
+                    PRIMARY KEY(block_number, log_index)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_reward_claimed_events_issue ON reward_claimed_events(repository_hash, issue_id, github_id_hash)")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS github_linked_events(
+                    block_number INTEGER NOT NULL,
+                    log_index INTEGER NOT NULL,
+                    tx_hash TEXT NOT NULL,
+                    github_id_hash TEXT NOT NULL,
+                    contributor_address TEXT NOT NULL,
+                    PRIMARY KEY(block_number, log_index)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_github_linked_events_github_id ON github_linked_events(github_id_hash)")
             
             con.commit()
             logger.info("Database tables created successfully")
@@ -108,16 +404,24 @@ def setup():
         logger.error(f"Failed to setup database: {str(e)}")
         raise
 
+    # Cached GitHub responses and commit details are kept in a separate database file
+    from db.http_cache import setup_http_cache
+    from db.commit_cache import setup_commit_cache
+    setup_http_cache()
+    setup_commit_cache()
+
 def initialize_rewards_table():
     """
     Initialize only the rewards table.
     """
     try:
-        with sqlite3.connect("agent.db") as con:
+        with get_connection() as con:
             cur = con.cursor()
             
             # Drop the existing rewards table if it exists
             cur.execute("DROP TABLE IF EXISTS rewards")
+            # The full-text index and its triggers are recreated by setup()
+            cur.execute("DROP TABLE IF EXISTS rewards_fts")
             
             # Create the rewards table with an is_merged boolean column that defaults to false
             cur.execute("""
@@ -129,6 +433,8 @@ def initialize_rewards_table():
                     is_merged BOOLEAN NOT NULL DEFAULT 0,
                     issue_title TEXT NOT NULL,
                     issue_body TEXT,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
                     UNIQUE(repository_name, issue_id)
                 )
             """)
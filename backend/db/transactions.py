@@ -0,0 +1,108 @@
+import sqlite3
+import time
+from typing import List, Optional
+import logging
+
+from db.connection import get_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Statuses of a transaction: sending -> submitted -> confirmed | failed, or timeout when no
+# receipt arrived in time (the transaction may still be mined; it stays tracked).
+# A transaction that could not be sent goes from sending to failed.
+UNCONFIRMED_STATUSES = ("submitted", "timeout")
+
+def _row_to_transaction(cur, row) -> dict:
+    return {column[0]: value for column, value in zip(cur.description, row)}
+
+def record_transaction(contract_address: str, method: str, args: str, label: Optional[str] = None) -> Optional[int]:
+    """
+    Record a transaction about to be sent. args is the JSON of the method arguments.
+    Returns the id of the transaction, or None in case of error.
+    """
+    now = time.time()
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                INSERT INTO transactions(label, contract_address, method, args, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, 'sending', ?, ?)
+                """,
+                (label, contract_address, method, args, now, now)
+            )
+            con.commit()
+            return cur.lastrowid
+    except sqlite3.Error as e:
+        logger.error(f"Failed to record transaction {method}: {str(e)}")
+        return None
+
+def update_transaction(tx_id: int, status: str, **fields) -> bool:
+    """
+    Update the status of a transaction and any of sender, nonce, tx_hash, error, block_number, gas_used.
+    Returns True if successful, False otherwise.
+    """
+    unknown = set(fields) - {"sender", "nonce", "tx_hash", "error", "block_number", "gas_used"}
+    if unknown:
+        raise ValueError(f"Unknown transaction columns: {', '.join(sorted(unknown))}")
+    assignments = "".join(f", {column} = ?" for column in fields)
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                f"UPDATE transactions SET status = ?, updated_at = ?{assignments} WHERE id = ?",
+                (status, time.time(), *fields.values(), tx_id)
+            )
+            con.commit()
+            return cur.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Failed to update transaction {tx_id}: {str(e)}")
+        return False
+
+def get_transaction(tx_id: int) -> Optional[dict]:
+    """
+    Retrieve a transaction as a dict of its columns.
+    Returns None if not found or in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT * FROM transactions WHERE id = ?", (tx_id,))
+            row = cur.fetchone()
+            return _row_to_transaction(cur, row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve transaction {tx_id}: {str(e)}")
+        return None
+
+def get_latest_transaction(label: str) -> Optional[dict]:
+    """
+    Retrieve the most recent transaction sent with the given label.
+    Returns None if there is none or in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT * FROM transactions WHERE label = ? ORDER BY id DESC LIMIT 1", (label,))
+            row = cur.fetchone()
+            return _row_to_transaction(cur, row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve transaction {label}: {str(e)}")
+        return None
+
+def get_unconfirmed_transactions() -> List[dict]:
+    """
+    Retrieve the transactions that were sent and have no receipt yet, oldest first.
+    Returns an empty list in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                f"SELECT * FROM transactions WHERE status IN ({', '.join('?' * len(UNCONFIRMED_STATUSES))}) ORDER BY id",
+                UNCONFIRMED_STATUSES
+            )
+            return [_row_to_transaction(cur, row) for row in cur.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve unconfirmed transactions: {str(e)}")
+        return []
@@ -0,0 +1,80 @@
+import sqlite3
+import time
+from typing import Optional
+import logging
+
+from db.connection import get_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def get_verdict(evidence_hash: str) -> Optional[str]:
+    """
+    Retrieve the stored contribution distribution (JSON) for the given evidence hash.
+    Returns None if not found or in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                "SELECT distribution FROM contribution_verdicts WHERE evidence_hash = ?",
+                (evidence_hash,)
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve verdict {evidence_hash}: {str(e)}")
+        return None
+
+def save_verdict(evidence_hash: str, repository_name: str, issue_id: int, model: str, prompt_version: str, distribution: str) -> bool:
+    """
+    Store the contribution distribution (JSON) computed for the given evidence hash.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                INSERT OR REPLACE INTO contribution_verdicts(
+                    evidence_hash, repository_name, issue_id, model, prompt_version, distribution, created_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (evidence_hash, repository_name, issue_id, model, prompt_version, distribution, time.time())
+            )
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save verdict for {repository_name} issue {issue_id}: {str(e)}")
+        return False
+
+def invalidate_verdicts(repository_name: Optional[str] = None, issue_id: Optional[int] = None, evidence_hash: Optional[str] = None) -> int:
+    """
+    Delete stored verdicts so the next evaluation queries the LLM again.
+    Filters are combined; without any filter every verdict is deleted.
+    Returns the number of deleted verdicts.
+    """
+    conditions = []
+    params = []
+    if repository_name is not None:
+        conditions.append("repository_name = ?")
+        params.append(repository_name)
+    if issue_id is not None:
+        conditions.append("issue_id = ?")
+        params.append(issue_id)
+    if evidence_hash is not None:
+        conditions.append("evidence_hash = ?")
+        params.append(evidence_hash)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(f"DELETE FROM contribution_verdicts{where}", params)
+            con.commit()
+            logger.info(f"Invalidated {cur.rowcount} contribution verdicts")
+            return cur.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Failed to invalidate verdicts: {str(e)}")
+        return 0
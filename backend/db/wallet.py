@@ -3,6 +3,8 @@ from typing import Optional
 import logging
 import json
 
+from db.connection import get_connection
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -11,7 +13,7 @@ def add_wallet_info(info: str) -> None:
     Add or update wallet information in the database.
     """
     try:
-        with sqlite3.connect("agent.db") as con:
+        with get_connection() as con:
             cur = con.cursor()
             
             # Check if wallet info exists
@@ -42,7 +44,7 @@ def get_wallet_info() -> Optional[str]:
     Retrieve wallet information from the database.
     """
     try:
-        with sqlite3.connect("agent.db") as con:
+        with get_connection() as con:
             cur = con.cursor()
             cur.execute("SELECT info FROM wallet")
             result = cur.fetchone()
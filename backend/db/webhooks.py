@@ -0,0 +1,63 @@
+import sqlite3
+import time
+import logging
+from typing import Optional
+
+from db.connection import get_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def record_delivery(delivery_id: str, event: str) -> Optional[bool]:
+    """
+    Record a GitHub webhook delivery.
+    Returns True if the delivery is new, False if it was already recorded, or None in case of error.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO webhook_deliveries(delivery_id, event, received_at)
+                VALUES (?, ?, ?)
+                """,
+                (delivery_id, event, time.time())
+            )
+            con.commit()
+            return cur.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Failed to record webhook delivery {delivery_id}: {str(e)}")
+        return None
+
+def forget_delivery(delivery_id: str) -> bool:
+    """
+    Delete a recorded delivery whose processing failed, so GitHub's redelivery is processed.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute("DELETE FROM webhook_deliveries WHERE delivery_id = ?", (delivery_id,))
+            con.commit()
+            return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to forget webhook delivery {delivery_id}: {str(e)}")
+        return False
+
+def prune_deliveries(max_age_seconds: int) -> int:
+    """
+    Delete deliveries older than max_age_seconds. GitHub only redelivers recent events.
+    Returns the number of deleted rows.
+    """
+    try:
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(
+                "DELETE FROM webhook_deliveries WHERE received_at < ?",
+                (time.time() - max_age_seconds,)
+            )
+            con.commit()
+            return cur.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Failed to prune webhook deliveries: {str(e)}")
+        return 0
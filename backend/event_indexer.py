@@ -0,0 +1,290 @@
+# backend/event_indexer.py
+import os
+import logging
+import threading
+from typing import Dict, List, Optional
+import settings.logging  # noqa: F401
+import settings.env  # noqa: F401
+
+from db.chain_events import (
+    get_contributor_claims,
+    get_cursor,
+    get_issue_claim_status,
+    get_recent_blocks,
+    reset_events,
+    rewind_events,
+    save_events,
+)
+from db.rewards import get_repository_names, get_reward, get_reward_id
+
+# Node the contract events are read from; the indexer only runs when it and CONTRACT_ADDRESS are set
+INDEXER_RPC_URL = os.environ.get("INDEXER_RPC_URL")
+CONTRACT_ADDRESS = os.environ.get("CONTRACT_ADDRESS")
+# Block the contract was deployed in; indexing starts there
+INDEXER_START_BLOCK = int(os.environ.get("INDEXER_START_BLOCK", "0"))
+# Blocks per eth_getLogs request: the range starts at the initial size, is halved when the node
+# rejects it or returns more than INDEXER_MAX_LOGS logs, and doubles while results are sparse
+INDEXER_INITIAL_RANGE = int(os.environ.get("INDEXER_INITIAL_RANGE", "2000"))
+INDEXER_MAX_RANGE = int(os.environ.get("INDEXER_MAX_RANGE", "100000"))
+INDEXER_MAX_LOGS = int(os.environ.get("INDEXER_MAX_LOGS", "5000"))
+# Blocks near the head whose hashes are kept to detect reorgs; a deeper reorg is not undone
+INDEXER_REORG_DEPTH = int(os.environ.get("INDEXER_REORG_DEPTH", "64"))
+# Seconds between two looks at the head once caught up
+INDEXER_POLL_INTERVAL = float(os.environ.get("INDEXER_POLL_INTERVAL", "5"))
+
+EVENT_SIGNATURES = {
+    "RewardLocked": "RewardLocked(string,uint256,uint256,address,address)",
+    "IssueCompleted": "IssueCompleted(string,uint256,string[])",
+    "GitHubLinked": "GitHubLinked(string,address)",
+    "RewardClaimed": "RewardClaimed(string,uint256,string,address)",
+}
+# Issue ids are GitHub issue numbers; anyone can lock a reward on a larger one, which SQLite cannot store
+MAX_ISSUE_ID = 2 ** 63 - 1
+
+def keccak_hex(text: str) -> str:
+    """Returns the hex keccak hash of a string, i.e. the topic of an indexed string argument."""
+    from eth_utils import keccak  # Deferred like web3, which provides it
+    return "0x" + keccak(text=text).hex()
+
+def _hex(value) -> str:
+    if isinstance(value, str):
+        return value.lower() if value.startswith("0x") else "0x" + value.lower()
+    return "0x" + bytes(value).hex()
+
+def _topic_address(topic) -> str:
+    return "0x" + _hex(topic)[-40:]
+
+class Web3LogSource:
+    """Reads the head, block hashes and logs from a node through web3."""
+
+    def __init__(self, rpc_url):
+        from web3 import Web3  # Deferred: web3 is slow to import and only needed to index events
+
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+
+    def head(self) -> int:
+        return self.w3.eth.block_number
+
+    def block_hash(self, block_number: int) -> str:
+        return _hex(self.w3.eth.get_block(block_number)["hash"])
+
+    def get_logs(self, contract_address: str, from_block: int, to_block: int, topics: List[str]) -> list:
+        return self.w3.eth.get_logs({
+            "address": self.w3.to_checksum_address(contract_address),
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            # Any of the event signatures
+            "topics": [topics],
+        })
+
+class EventIndexer:
+    """
+    Copies the events of the GitHubIssueReward contract into SQLite tables (db.chain_events).
+
+    The blocks are read in ranges of adaptive size: a range the node rejects (too wide, too
+    many results, timeout) is halved and retried, and sparse ranges grow. Each range is
+    decoded and stored with the cursor in one transaction, so only one range of logs is in
+    memory and a restart resumes after the last stored range. The hashes of the blocks
+    indexed within reorg_depth of the head are kept; when one no longer matches the chain,
+    the events after the last matching block are deleted and indexed again.
+    """
+
+    def __init__(self,
+                 source,
+                 contract_address,
+                 start_block=INDEXER_START_BLOCK,
+                 initial_range=INDEXER_INITIAL_RANGE,
+                 max_range=INDEXER_MAX_RANGE,
+                 max_logs=INDEXER_MAX_LOGS,
+                 reorg_depth=INDEXER_REORG_DEPTH,
+                 poll_interval=INDEXER_POLL_INTERVAL):
+        self.source = source
+        self.contract_address = contract_address.lower()
+        self.start_block = start_block
+        self.range = initial_range
+        self.max_range = max_range
+        self.max_logs = max_logs
+        self.reorg_depth = reorg_depth
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._topics = None
+
+    def topics(self) -> Dict[str, str]:
+        """Returns the event names by topic (hash of the signature)."""
+        if self._topics is None:
+            self._topics = {keccak_hex(signature): name for name, signature in EVENT_SIGNATURES.items()}
+        return self._topics
+
+    def cursor(self) -> int:
+        """Returns the last indexed block, starting over if another contract was indexed."""
+        cursor = get_cursor()
+        if cursor is None or cursor["contract_address"] != self.contract_address:
+            if cursor is not None:
+                logging.warning(f"Indexed events of {cursor['contract_address']} are replaced by those of {self.contract_address}")
+            if not reset_events(self.contract_address, self.start_block - 1):
+                raise RuntimeError("Failed to initialize the event cursor")
+            return self.start_block - 1
+        return cursor["block_number"]
+
+    def run_forever(self) -> None:
+        """Indexes until stop() is called, back to back while behind and every poll_interval once caught up."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            try:
+                behind = self.index_once()
+            except Exception as e:
+                logging.error(f"Failed to index the contract events: {e}")
+                behind = False
+            if not behind:
+                self._stop.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def index_once(self) -> bool:
+        """
+        Indexes the next range of blocks.
+        Returns True if more blocks are waiting, False once the head is reached.
+        """
+        head = self.source.head()
+        cursor = self.cursor()
+        if head - cursor <= self.reorg_depth:
+            cursor = self.check_reorg(cursor, head)
+        if cursor >= head:
+            return False
+
+        from_block = cursor + 1
+        while True:
+            to_block = min(head, from_block + self.range - 1)
+            # A reorg can only replace the blocks near the head; their hashes are kept to check later.
+            # Read before the logs: if a reorg happens in between, the stale hash is caught by the next check
+            block_hash = self.source.block_hash(to_block) if head - to_block < self.reorg_depth else None
+            try:
+                logs = self.source.get_logs(self.contract_address, from_block, to_block, list(self.topics()))
+                break
+            except Exception as e:
+                if to_block == from_block:
+                    raise
+                # Nodes cap the range or the result size of eth_getLogs; the message varies by provider
+                self.range = max(1, (to_block - from_block + 1) // 2)
+                logging.info(f"eth_getLogs of blocks {from_block}-{to_block} failed ({e}), retrying with {self.range} blocks")
+
+        if not save_events(to_block, self.decode(logs), block_hash, keep_blocks_from=head - self.reorg_depth):
+            raise RuntimeError(f"Failed to save the events up to block {to_block}")
+
+        blocks = to_block - from_block + 1
+        if len(logs) > self.max_logs:
+            self.range = max(1, blocks // 2)
+        elif len(logs) < self.max_logs // 4 and blocks == self.range:
+            self.range = min(self.max_range, self.range * 2)
+        logging.debug(f"Indexed {len(logs)} events of blocks {from_block}-{to_block}, next range {self.range}")
+        return to_block < head
+
+    def check_reorg(self, cursor: int, head: int) -> int:
+        """
+        Compares the kept block hashes with the chain, newest first, and rewinds the events to
+        the newest block still on the chain. Returns the cursor to continue from.
+        """
+        recent = get_recent_blocks()
+        for i, (block_number, block_hash) in enumerate(recent):
+            # After a reorg to a shorter chain, the blocks above the head are gone
+            if block_number <= head and self.source.block_hash(block_number) == block_hash:
+                if i == 0:
+                    return cursor
+                logging.warning(f"Reorg: blocks after {block_number} were replaced, indexing them again")
+                break
+        else:
+            if not recent:
+                return cursor
+            # Deeper than the kept hashes: go back one more reorg depth before the oldest of them
+            block_number = max(self.start_block - 1, recent[-1][0] - self.reorg_depth)
+            logging.warning(f"Reorg deeper than {len(recent)} kept blocks, indexing again after block {block_number}")
+        if not rewind_events(block_number):
+            raise RuntimeError(f"Failed to rewind the events to block {block_number}")
+        return block_number
+
+    def decode(self, logs) -> Dict[str, List[tuple]]:
+        """Decodes logs into rows of the event tables of db.chain_events."""
+        from eth_abi import decode
+
+        events = {
+            "reward_locked_events": [],
+            "issue_completed_events": [],
+            "issue_contributors": [],
+            "reward_claimed_events": [],
+            "github_linked_events": [],
+        }
+        topics = self.topics()
+        for log in logs:
+            log_topics = [_hex(topic) for topic in log["topics"]]
+            name = topics.get(log_topics[0]) if log_topics else None
+            if name is None or _hex(log["address"]) != self.contract_address:
+                continue
+            key = (log["blockNumber"], log["logIndex"], _hex(log["transactionHash"]))
+            data = bytes(log["data"]) if not isinstance(log["data"], str) else bytes.fromhex(log["data"].removeprefix("0x"))
+            if name == "GitHubLinked":
+                events["github_linked_events"].append((*key, log_topics[1], _topic_address(log_topics[2])))
+                continue
+            repository_hash, issue_id = log_topics[1], int(log_topics[2], 16)
+            if issue_id > MAX_ISSUE_ID:
+                logging.warning(f"Skipped {name} event of issue {issue_id} in block {key[0]}: not a GitHub issue number")
+                continue
+            if name == "RewardLocked":
+                reward, token_address, user_address = decode(["uint256", "address", "address"], data)
+                events["reward_locked_events"].append((*key, repository_hash, issue_id, str(reward), token_address.lower(), user_address.lower()))
+            elif name == "IssueCompleted":
+                (contributors,) = decode(["string[]"], data)
+                events["issue_completed_events"].append((*key, repository_hash, issue_id))
+                events["issue_contributors"].extend(
+                    (key[0], key[1], position, repository_hash, issue_id, github_id, keccak_hex(github_id))
+                    for position, github_id in enumerate(contributors)
+                )
+            elif name == "RewardClaimed":
+                (claimant,) = decode(["address"], data)
+                events["reward_claimed_events"].append((*key, repository_hash, issue_id, log_topics[3], claimant.lower()))
+        return events
+
+def get_reward_claim_status(reward_id: int) -> Optional[dict]:
+    """
+    Returns the indexed on-chain state of a reward: the locked amount, whether the issue is
+    completed and which contributors claimed their share. Returns None if the reward does not exist.
+    """
+    reward = get_reward(reward_id)
+    if reward is None:
+        return None
+    status = get_issue_claim_status(keccak_hex(reward["repository_name"]), reward["issue_id"])
+    if status is None:
+        raise RuntimeError(f"Failed to read the claim status of reward {reward_id}")
+    cursor = get_cursor()
+    return {
+        "reward_id": reward_id,
+        "repository_name": reward["repository_name"],
+        "issue_id": reward["issue_id"],
+        "locked_amount": str(sum(int(lock["reward"]) for lock in status["locks"])),
+        **status,
+        "indexed_block": cursor["block_number"] if cursor else None,
+    }
+
+def get_github_id_claims(github_id: str) -> List[dict]:
+    """
+    Returns the completed issues a GitHub id contributed to with their claim status, with the
+    repository name and reward id of the issues that have a reward in the rewards table.
+    """
+    claims = get_contributor_claims(github_id)
+    if claims is None:
+        raise RuntimeError(f"Failed to read the claims of {github_id}")
+    # Events only carry the hash of the repository name
+    names = {keccak_hex(name): name for name in get_repository_names()}
+    for claim in claims:
+        claim["repository_name"] = names.get(claim["repository_hash"])
+        claim["reward_id"] = get_reward_id(claim["repository_name"], claim["issue_id"]) if claim["repository_name"] else None
+    return claims
+
+def start_event_indexer() -> Optional[EventIndexer]:
+    """Starts indexing the contract events in a daemon thread if INDEXER_RPC_URL and CONTRACT_ADDRESS are set."""
+    if not (INDEXER_RPC_URL and CONTRACT_ADDRESS):
+        logging.info("INDEXER_RPC_URL or CONTRACT_ADDRESS is not set, contract events are not indexed")
+        return None
+    indexer = EventIndexer(Web3LogSource(INDEXER_RPC_URL), CONTRACT_ADDRESS)
+    threading.Thread(target=indexer.run_forever, name="event-indexer", daemon=True).start()
+    return indexer
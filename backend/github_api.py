@@ -0,0 +1,247 @@
+# backend/github_api.py
+import os
+import json
+import hashlib
+import time
+import logging
+from typing import Iterator, NamedTuple, Optional, Any
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+import requests
+import settings.logging  # noqa: F401
+import settings.env  # noqa: F401
+
+from db.http_cache import HTTP_CACHE_TOUCH_INTERVAL, get_cached_response, save_cached_response, touch_cached_response
+
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+# Timeout in seconds for a single GitHub request
+REQUEST_TIMEOUT = int(os.environ.get("GITHUB_REQUEST_TIMEOUT", "10"))
+
+# A shared session keeps connections to api.github.com alive between requests
+_session = requests.Session()
+
+class GitHubResponse(NamedTuple):
+    data: Any
+    link: Optional[str]
+    from_cache: bool
+
+def github_headers() -> dict:
+    """Return the headers sent with every GitHub API request."""
+    headers = {"Accept": "application/vnd.github+json"}
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"token {GITHUB_TOKEN}"
+    return headers
+
+def cache_identity(headers: dict) -> str:
+    """Return the key separating the cached responses of different credentials, empty when anonymous."""
+    authorization = headers.get("Authorization")
+    if not authorization:
+        return ""
+    # A digest, so the cache file does not hold the token
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+def request_github(url: str) -> GitHubResponse:
+    """Execute a conditional GET against the GitHub API
+
+    The ETag / Last-Modified validators of the previous response are sent back,
+    and a 304 Not Modified answer is served from the cache. With a token set,
+    304 responses do not count against GitHub's rate limit. Responses are cached per
+    credentials, since the same URL can answer differently to another token.
+
+    Args:
+        url (str): The URL of the GitHub API
+
+    Returns:
+        GitHubResponse: The decoded body, the Link header and whether the cache was used
+
+    Raises:
+        requests.HTTPError: If GitHub answers with an error status
+    """
+    headers = github_headers()
+    identity = cache_identity(headers)
+    cached = get_cached_response(url, identity)
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    res = _session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if res.status_code == 304 and cached:
+        # Keeps responses still in use from being pruned, without a write on every hit
+        if time.time() - cached["updated_at"] > HTTP_CACHE_TOUCH_INTERVAL:
+            touch_cached_response(url, identity)
+        return GitHubResponse(json.loads(cached["body"]), cached["link"], True)
+    res.raise_for_status()
+
+    data = res.json()
+    etag = res.headers.get("ETag")
+    last_modified = res.headers.get("Last-Modified")
+    link = res.headers.get("Link")
+    if etag or last_modified:
+        save_cached_response(url, etag, last_modified, link, res.text, identity)
+    return GitHubResponse(data, link, False)
+
+def next_page_url(link: Optional[str]) -> Optional[str]:
+    """Return the rel="next" URL of a Link header, or None on the last page."""
+    if not link:
+        return None
+    for item in requests.utils.parse_header_links(link):
+        if item.get("rel") == "next":
+            return item.get("url")
+    return None
+
+def with_per_page(url: str, per_page: int = 100) -> str:
+    """Add per_page to a list endpoint URL unless it is already set."""
+    parsed = urlparse(url)
+    query = dict(parse_qsl(parsed.query))
+    query.setdefault("per_page", str(per_page))
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+def get_github_json(url: str) -> Any:
+    """Execute a conditional GET against the GitHub API and return the decoded body
+
+    Args:
+        url (str): The URL of the GitHub API
+
+    Returns:
+        Any: The response from the GitHub API, or None if the request failed
+    """
+    try:
+        return request_github(url).data
+    except Exception as e:
+        logging.error(f"An exception occurred during the GitHub API request to {url}: {str(e)}")
+        return None
+
+def iter_github_items(url: str, per_page: int = 100, limit: Optional[int] = None) -> Iterator:
+    """Yield the items of a GitHub list endpoint lazily, page by page
+
+    The next page is only requested once the previous one has been consumed,
+    so closing the generator or reaching limit stops the pagination early.
+
+    Args:
+        url (str): The URL of the GitHub API list endpoint
+        per_page (int): The page size requested from GitHub (max 100)
+        limit (Optional[int]): The maximum number of items to yield
+
+    Raises:
+        requests.HTTPError: If GitHub answers with an error status
+    """
+    next_url = with_per_page(url, per_page)
+    count = 0
+    while next_url:
+        response = request_github(next_url)
+        for item in response.data:
+            if limit is not None and count >= limit:
+                return
+            yield item
+            count += 1
+        next_url = next_page_url(response.link)
+
+# ---------------------------
+# GraphQL: batched issue state lookups
+# ---------------------------
+GITHUB_GRAPHQL_URL = os.environ.get("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+# Number of issues resolved by a single GraphQL query
+GRAPHQL_BATCH_SIZE = int(os.environ.get("GRAPHQL_BATCH_SIZE", "50"))
+
+# Polled for every open issue; the details are only fetched once an issue is closed
+ISSUE_STATE_FIELDS = "number state closedAt"
+ISSUE_DETAIL_FIELDS = "number title body author { login }"
+
+def build_issue_state_query(targets: list, fields: str = ISSUE_STATE_FIELDS) -> tuple[str, dict]:
+    """Build one aliased GraphQL query resolving the state of many issues
+
+    Issues of the same repository share one repository() selection.
+
+    Args:
+        targets (list): (owner, repo, issue_number) tuples
+        fields (str): The issue fields to select
+
+    Returns:
+        tuple[str, dict]: The query and a map from (repository alias, issue alias) to the target
+    """
+    repositories = {}
+    for target in targets:
+        owner, repo, _ = target
+        repositories.setdefault((owner, repo), []).append(target)
+
+    aliases = {}
+    selections = []
+    for repo_index, ((owner, repo), repo_targets) in enumerate(repositories.items()):
+        issue_selections = []
+        for issue_index, target in enumerate(repo_targets):
+            aliases[(f"r{repo_index}", f"i{issue_index}")] = target
+            issue_selections.append(f"i{issue_index}: issue(number: {int(target[2])}) {{ {fields} }}")
+        # json.dumps produces valid GraphQL string literals
+        selections.append(
+            f"r{repo_index}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) {{ {' '.join(issue_selections)} }}"
+        )
+    return "query { " + " ".join(selections) + " }", aliases
+
+def _normalize_graphql_issue(node: dict) -> dict:
+    # Use the REST field names so GraphQL and REST results are interchangeable
+    return {
+        "number": node.get("number"),
+        "state": (node.get("state") or "").lower(),
+        "closed_at": node.get("closedAt"),
+        "title": node.get("title", ""),
+        "body": node.get("body", ""),
+        "user": {"login": (node.get("author") or {}).get("login", "")},
+    }
+
+def _query_issues(targets: list, fields: str, batch_size: int) -> dict:
+    """Select fields of many issues with aliased GraphQL queries.
+    Returns (owner, repo, issue_number) -> issue node, or None if it could not be resolved."""
+    results = {}
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        query, aliases = build_issue_state_query(batch, fields)
+        try:
+            res = _session.post(
+                GITHUB_GRAPHQL_URL,
+                json={"query": query},
+                headers=github_headers(),
+                timeout=REQUEST_TIMEOUT
+            )
+            res.raise_for_status()
+            payload = res.json()
+        except Exception as e:
+            logging.error(f"An exception occurred during the GitHub GraphQL request: {str(e)}")
+            results.update({target: None for target in batch})
+            continue
+
+        # Missing repositories or issues are reported in "errors" while the rest of the data is returned
+        for error in payload.get("errors") or []:
+            logging.warning(f"GitHub GraphQL error: {error.get('message')}")
+        data = payload.get("data") or {}
+        for (repo_alias, issue_alias), target in aliases.items():
+            results[target] = (data.get(repo_alias) or {}).get(issue_alias) or None
+    return results
+
+def fetch_issue_states(targets: list, batch_size: int = GRAPHQL_BATCH_SIZE) -> dict:
+    """Resolve the state of many issues with aliased GraphQL queries
+
+    Only the state is polled; the title, body and author of the issues found closed are
+    fetched by a second query, so open issues do not download their bodies on every poll.
+
+    Args:
+        targets (list): (owner, repo, issue_number) tuples
+        batch_size (int): The maximum number of issues per query
+
+    Returns:
+        dict: (owner, repo, issue_number) -> issue in REST format, or None if it could not be resolved
+    """
+    states = _query_issues(targets, ISSUE_STATE_FIELDS, batch_size)
+    closed = [target for target, node in states.items() if node and node.get("closedAt")]
+    details = _query_issues(closed, ISSUE_DETAIL_FIELDS, batch_size) if closed else {}
+
+    results = {}
+    for target, node in states.items():
+        if node is None:
+            results[target] = None
+        elif target in details:
+            # A closed issue without its details is resolved again at the next poll
+            results[target] = _normalize_graphql_issue({**details[target], **node}) if details[target] else None
+        else:
+            results[target] = _normalize_graphql_issue(node)
+    return results
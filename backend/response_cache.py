@@ -0,0 +1,42 @@
+# backend/response_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+class VersionedResponseCache:
+    """
+    Keeps serialized responses per key together with the data version they were built from.
+
+    An entry is reused while the version is unchanged, so repeated requests skip both the
+    database query and the JSON encoding. Each entry carries a strong ETag derived from the body.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, body, etag)
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, version: Optional[int], build: Callable[[], bytes]) -> tuple[bytes, str]:
+        """
+        Returns (body, etag) for key at version, calling build() only on a miss.
+        With version None (unknown), the body is built and not cached.
+        """
+        if version is None:
+            body = build()
+            return body, hashlib.sha256(body).hexdigest()[:32]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+
+        # Built outside the lock; concurrent misses for the same key may build twice
+        body = build()
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        with self._lock:
+            self._entries[key] = (version, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
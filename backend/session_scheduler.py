@@ -0,0 +1,158 @@
+# backend/session_scheduler.py
+import os
+import math
+import threading
+import time
+from collections import deque
+from typing import Iterator
+
+# Agent runs (LLM and CDP calls) allowed at the same time, across all clients
+MAX_AGENT_SESSIONS = int(os.environ.get("MAX_AGENT_SESSIONS", "8"))
+# Runs one client may have running or waiting at the same time
+MAX_AGENT_SESSIONS_PER_CLIENT = int(os.environ.get("MAX_AGENT_SESSIONS_PER_CLIENT", "2"))
+# Requests allowed to wait for a free session; beyond that requests are rejected immediately
+AGENT_QUEUE_SIZE = int(os.environ.get("AGENT_QUEUE_SIZE", "16"))
+# Seconds a request waits for a session before it is rejected
+AGENT_QUEUE_TIMEOUT = float(os.environ.get("AGENT_QUEUE_TIMEOUT", "10"))
+# Sessions only priority work (closed-issue processing) may use, so user traffic cannot starve it
+PRIORITY_RESERVED_SESSIONS = int(os.environ.get("PRIORITY_RESERVED_SESSIONS", "1"))
+
+class AdmissionRejected(Exception):
+    """Raised when a session cannot be admitted; status is the HTTP status to answer with"""
+
+    def __init__(self, status: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+class Session:
+    """A running session slot; release it exactly once (it is also a context manager)."""
+
+    def __init__(self, scheduler, client_id, priority):
+        self._scheduler = scheduler
+        self.client_id = client_id
+        self.priority = priority
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._scheduler._release(self)
+
+    def hold(self, stream: Iterator) -> Iterator:
+        """Yields from a streamed response and releases the session when it ends or is closed."""
+        try:
+            yield from stream
+        finally:
+            self.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class SessionScheduler:
+    """
+    Admission control for agent runs.
+
+    At most max_sessions runs execute at once and each client may hold max_per_client of
+    them (running or waiting; over that: 429). Other requests wait in a bounded FIFO queue
+    for up to queue_timeout seconds (full queue or timeout: 503), so an overload is answered
+    quickly with Retry-After instead of piling up LLM and CDP calls. Priority sessions have
+    their own lane: they are served before queued user requests, are not limited by the
+    queue size, and can use the reserved_for_priority sessions user traffic never gets.
+    """
+
+    def __init__(self,
+                 max_sessions=MAX_AGENT_SESSIONS,
+                 max_per_client=MAX_AGENT_SESSIONS_PER_CLIENT,
+                 max_queue=AGENT_QUEUE_SIZE,
+                 queue_timeout=AGENT_QUEUE_TIMEOUT,
+                 reserved_for_priority=PRIORITY_RESERVED_SESSIONS):
+        self.max_sessions = max_sessions
+        self.max_per_client = max_per_client
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.reserved_for_priority = min(reserved_for_priority, max_sessions - 1)
+
+        self._cond = threading.Condition()
+        self._running = 0
+        self._per_client = {}  # client_id -> running + waiting sessions
+        self._waiting = deque()  # tickets of waiting user requests, in arrival order
+        self._waiting_priority = deque()
+        # Moving average of session duration, used for Retry-After
+        self._average_duration = 5.0
+
+    def _can_start(self, ticket, priority) -> bool:
+        if priority:
+            return self._waiting_priority[0] is ticket and self._running < self.max_sessions
+        return (not self._waiting_priority and self._waiting[0] is ticket
+                and self._running < self.max_sessions - self.reserved_for_priority)
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely get a session."""
+        backlog = len(self._waiting) + len(self._waiting_priority) + 1
+        return max(1, math.ceil(self._average_duration * backlog / self.max_sessions))
+
+    def acquire(self, client_id: str, priority: bool = False, timeout: float = None) -> Session:
+        """
+        Waits for a session and returns it, or raises AdmissionRejected.
+        timeout defaults to queue_timeout for user requests; priority work waits until admitted.
+        """
+        if timeout is None and not priority:
+            timeout = self.queue_timeout
+        with self._cond:
+            if not priority:
+                if self._per_client.get(client_id, 0) >= self.max_per_client:
+                    raise AdmissionRejected(429, self.retry_after(), "Too many concurrent requests from this client")
+                if len(self._waiting) >= self.max_queue:
+                    raise AdmissionRejected(503, self.retry_after(), "The agent is busy")
+
+            lane = self._waiting_priority if priority else self._waiting
+            ticket = object()
+            lane.append(ticket)
+            self._per_client[client_id] = self._per_client.get(client_id, 0) + 1
+            deadline = None if timeout is None else time.monotonic() + timeout
+            try:
+                while not self._can_start(ticket, priority):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise AdmissionRejected(503, self.retry_after(), "Timed out waiting for the agent")
+                    self._cond.wait(remaining)
+            except BaseException:
+                lane.remove(ticket)
+                self._forget_client(client_id)
+                # The next waiter may be able to start now that this one left the queue
+                self._cond.notify_all()
+                raise
+            lane.popleft()
+            self._running += 1
+            # Let the next waiter re-check; it may fit in a remaining slot
+            self._cond.notify_all()
+        return Session(self, client_id, priority)
+
+    def _forget_client(self, client_id) -> None:
+        count = self._per_client.get(client_id, 0) - 1
+        if count > 0:
+            self._per_client[client_id] = count
+        else:
+            self._per_client.pop(client_id, None)
+
+    def _release(self, session: Session) -> None:
+        with self._cond:
+            self._running -= 1
+            self._forget_client(session.client_id)
+            self._average_duration += 0.1 * (time.monotonic() - session.started - self._average_duration)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "running": self._running,
+                "waiting": len(self._waiting),
+                "waiting_priority": len(self._waiting_priority),
+                "clients": len(self._per_client),
+            }
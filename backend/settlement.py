@@ -0,0 +1,400 @@
+# backend/settlement.py
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import settings.logging  # noqa: F401
+import settings.env  # noqa: F401
+
+from db.settlement_jobs import (
+    claim_due_jobs,
+    complete_stage,
+    fail_stage,
+    renew_lease,
+    next_due_time,
+)
+from db.rewards import mark_reward_as_merged, get_reward_id
+from db.verdicts import invalidate_verdicts
+from custom_actions.evaluate_contribution import (
+    CONTRACT_ABI_PATH,
+    CONTRACT_ADDRESS,
+    GITHUB_API_URL,
+    build_claim_comment,
+    collect_contribution_history,
+    find_issue_comment,
+    format_contribution_report,
+    judge_contribution,
+    load_abi,
+    request_post_github_api,
+    send_register_and_complete_issue,
+)
+from settlement_batcher import SETTLEMENT_BATCH_SIZE, SETTLEMENT_BATCH_WINDOW, SettlementBatcher
+from tx_submitter import get_transaction_submitter
+
+# Stages of a settlement job, in order. A job resumes from the stage it is at.
+STAGES = ("collect", "judge", "register", "report", "merge", "claim_comment", "done")
+# Stages are run by separate worker pools, so a slow transaction does not hold up
+# the GitHub and LLM stages of other issues
+LANES = {
+    "github": ("collect", "report", "merge", "claim_comment"),
+    "llm": ("judge",),
+    "chain": ("register",),
+}
+
+SETTLEMENT_GITHUB_WORKERS = int(os.environ.get("SETTLEMENT_GITHUB_WORKERS", "4"))
+SETTLEMENT_LLM_WORKERS = int(os.environ.get("SETTLEMENT_LLM_WORKERS", "2"))
+# Settlements waiting for their transaction at the same time; also the most a batch of settlements can hold
+SETTLEMENT_CHAIN_WORKERS = int(os.environ.get("SETTLEMENT_CHAIN_WORKERS", "16"))
+# Seconds between two looks at the queue when nothing wakes the worker up (other processes, retries)
+SETTLEMENT_POLL_INTERVAL = float(os.environ.get("SETTLEMENT_POLL_INTERVAL", "30"))
+# Seconds a claimed job stays locked; renewed while the stage runs, so a crashed worker's jobs are picked up again
+SETTLEMENT_LEASE_SECONDS = float(os.environ.get("SETTLEMENT_LEASE_SECONDS", "300"))
+# Failed attempts of one stage before the job is marked failed
+SETTLEMENT_MAX_ATTEMPTS = int(os.environ.get("SETTLEMENT_MAX_ATTEMPTS", "8"))
+# Exponential backoff between attempts: base * 2^attempts seconds, capped, with jitter
+SETTLEMENT_RETRY_BASE = float(os.environ.get("SETTLEMENT_RETRY_BASE", "30"))
+SETTLEMENT_RETRY_MAX = float(os.environ.get("SETTLEMENT_RETRY_MAX", "3600"))
+
+# Hidden markers identifying the comments posted by the pipeline, so a retried stage never posts twice
+REPORT_COMMENT_MARKER = "<!-- oss-rewards-agent:contribution-report -->"
+CLAIM_COMMENT_MARKER = "<!-- oss-rewards-agent:claim -->"
+# Revert reason of registerAndCompleteIssue when the issue was registered by an earlier attempt
+ALREADY_COMPLETED_REASON = "Issue already completed"
+
+class SettlementError(Exception):
+    """Raised by a stage that should be retried later"""
+
+_workers = weakref.WeakSet()
+_workers_lock = threading.Lock()
+
+def notify_settlement_workers() -> bool:
+    """
+    Wakes up the settlement workers of this process, e.g. after a job was queued.
+    Returns False if no worker is running in this process.
+    """
+    with _workers_lock:
+        workers = [worker for worker in _workers if worker.running]
+    for worker in workers:
+        worker.wake()
+    return bool(workers)
+
+def retry_delay(attempts: int, base: float = SETTLEMENT_RETRY_BASE, maximum: float = SETTLEMENT_RETRY_MAX) -> float:
+    """Seconds to wait before the next attempt of a stage that already failed `attempts` times."""
+    delay = min(maximum, base * (2 ** attempts))
+    # Full jitter on the upper half, so jobs failing together do not retry together
+    return delay * random.uniform(0.5, 1.0)
+
+def split_repository_name(repository_name: str) -> tuple[str, str]:
+    owner, repo = repository_name.split("/", 1)
+    return owner, repo
+
+def validate_distribution(distribution) -> list:
+    """
+    Returns the verdict with integer contributions, as the contract takes them.
+    Raises SettlementError unless it is a list of whole percentages summing to exactly 100.
+    """
+    if not isinstance(distribution, list) or not distribution:
+        raise SettlementError("The contribution verdict is not a non-empty list")
+    normalized = []
+    for item in distribution:
+        if not isinstance(item, dict) or not item.get("name"):
+            raise SettlementError(f"Malformed contribution entry: {item!r}")
+        contribution = item.get("contribution")
+        # json.loads turns 50.0 into a float; it is still a whole percentage
+        if isinstance(contribution, float) and contribution.is_integer():
+            contribution = int(contribution)
+        if isinstance(contribution, bool) or not isinstance(contribution, int):
+            raise SettlementError(f"Contribution of {item['name']} is not a whole percentage: {contribution!r}")
+        if contribution < 0:
+            raise SettlementError(f"Negative contribution for {item['name']}")
+        normalized.append({**item, "contribution": contribution})
+    total = sum(item["contribution"] for item in normalized)
+    if total != 100:
+        raise SettlementError(f"Contributions sum to {total}%, not 100%")
+    return normalized
+
+class _Lane:
+    def __init__(self, name, stages, workers):
+        self.name = name
+        self.stages = list(stages)
+        self.workers = workers
+        self.pool = None
+        self.in_flight = {}  # job_id -> time the lease should be renewed
+        self.wakeup = threading.Event()
+
+class SettlementWorker:
+    """
+    Runs the stages of the settlement jobs stored in the settlement_jobs table.
+
+    Each lane (GitHub, LLM, chain) has its own dispatcher thread and worker pool and claims
+    due jobs at its stages with a lease, so several processes can share the queue. A stage
+    either completes, storing its result and moving the job to the next stage, or fails and
+    is retried later with exponential backoff; after max_attempts failures the job is
+    marked failed. Every stage is idempotent: the verdict is memoized, a contract revert or
+    skip for an already completed issue counts as success and comments are looked up before
+    posting. The register stages running together share transactions (see SettlementBatcher).
+    """
+
+    def __init__(self,
+                 github_workers=SETTLEMENT_GITHUB_WORKERS,
+                 llm_workers=SETTLEMENT_LLM_WORKERS,
+                 chain_workers=SETTLEMENT_CHAIN_WORKERS,
+                 poll_interval=SETTLEMENT_POLL_INTERVAL,
+                 lease_seconds=SETTLEMENT_LEASE_SECONDS,
+                 max_attempts=SETTLEMENT_MAX_ATTEMPTS,
+                 batch_size=SETTLEMENT_BATCH_SIZE,
+                 batch_window=SETTLEMENT_BATCH_WINDOW):
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lanes = {
+            "github": _Lane("github", LANES["github"], github_workers),
+            "llm": _Lane("llm", LANES["llm"], llm_workers),
+            "chain": _Lane("chain", LANES["chain"], chain_workers),
+        }
+        self.running = False
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._batcher = None
+        self.handlers = {
+            "collect": self.collect,
+            "judge": self.judge,
+            "register": self.register,
+            "report": self.report,
+            "merge": self.merge,
+            "claim_comment": self.claim_comment,
+        }
+
+    # ---------------------------
+    # Scheduling
+    # ---------------------------
+    def start(self) -> None:
+        """Starts one dispatcher thread per lane."""
+        self._stop.clear()
+        self.running = True
+        with _workers_lock:
+            _workers.add(self)
+        for lane in self.lanes.values():
+            lane.pool = ThreadPoolExecutor(max_workers=lane.workers, thread_name_prefix=f"settlement-{lane.name}")
+            thread = threading.Thread(target=self._dispatch, args=(lane,), name=f"settlement-{lane.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logging.info(f"Settlement worker {self.worker_id} started")
+
+    def run_forever(self) -> None:
+        """Starts the worker and blocks until stop() is called."""
+        self.start()
+        self._stop.wait()
+
+    def stop(self, wait: bool = True) -> None:
+        self.running = False
+        self._stop.set()
+        self.wake()
+        with self._lock:
+            batcher, self._batcher = self._batcher, None
+        if batcher is not None:
+            # Queued settlements are sent rather than left waiting in the chain lane
+            batcher.stop()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for lane in self.lanes.values():
+            if lane.pool is not None:
+                lane.pool.shutdown(wait=wait)
+                lane.pool = None
+
+    def wake(self) -> None:
+        for lane in self.lanes.values():
+            lane.wakeup.set()
+
+    def _dispatch(self, lane: _Lane) -> None:
+        while not self._stop.is_set():
+            lane.wakeup.clear()
+            self._renew_leases(lane)
+            with self._lock:
+                free = lane.workers - len(lane.in_flight)
+            wait = min(self.poll_interval, self.lease_seconds / 4)
+            if free <= 0:
+                # Every slot is busy; a finished job sets the event
+                lane.wakeup.wait(wait)
+                continue
+            jobs = claim_due_jobs(self.worker_id, lane.stages, free, self.lease_seconds)
+            for job in jobs:
+                with self._lock:
+                    lane.in_flight[job["id"]] = time.time() + self.lease_seconds / 2
+                lane.pool.submit(self._run_claimed, lane, job)
+            if jobs:
+                continue
+            due = next_due_time(lane.stages)
+            if due is not None:
+                wait = max(0.0, min(wait, due - time.time()))
+            lane.wakeup.wait(wait)
+
+    def _renew_leases(self, lane: _Lane) -> None:
+        now = time.time()
+        with self._lock:
+            due = [job_id for job_id, renew_at in lane.in_flight.items() if renew_at <= now]
+        for job_id in due:
+            renew_lease(job_id, self.worker_id, self.lease_seconds)
+            with self._lock:
+                if job_id in lane.in_flight:
+                    lane.in_flight[job_id] = now + self.lease_seconds / 2
+
+    def _run_claimed(self, lane: _Lane, job: dict) -> None:
+        try:
+            self.run_stage(job)
+        finally:
+            with self._lock:
+                lane.in_flight.pop(job["id"], None)
+            # A slot is free, and the job's next stage may belong to another lane
+            self.wake()
+
+    def drain(self) -> None:
+        """
+        Runs the due stages of every pending job in the calling thread, until no job is due.
+        Used where no worker is running; failed stages are left for their retry.
+        """
+        stages = [stage for lane in self.lanes.values() for stage in lane.stages]
+        while True:
+            jobs = claim_due_jobs(self.worker_id, stages, 1, self.lease_seconds)
+            if not jobs:
+                return
+            self.run_stage(jobs[0])
+
+    def run_stage(self, job: dict) -> None:
+        """Runs the current stage of a claimed job and records its outcome."""
+        stage = job["stage"]
+        label = f"{job['repository_name']} issue {job['issue_id']}"
+        started = time.perf_counter()
+        try:
+            results = self.handlers[stage](job)
+        except Exception as e:
+            attempts = job["attempts"] + 1
+            if attempts >= self.max_attempts:
+                logging.error(f"Settlement of {label} failed at the {stage} stage after {attempts} attempts: {e}")
+                fail_stage(job["id"], self.worker_id, str(e), None)
+            else:
+                delay = retry_delay(job["attempts"])
+                logging.warning(f"Settlement of {label} failed at the {stage} stage (attempt {attempts}), retrying in {delay:.0f}s: {e}")
+                fail_stage(job["id"], self.worker_id, str(e), time.time() + delay)
+            return
+        next_stage = results.pop("next_stage", None) or STAGES[STAGES.index(stage) + 1]
+        if not complete_stage(job["id"], self.worker_id, next_stage, results):
+            logging.warning(f"Settlement of {label} lost its lease during the {stage} stage")
+            return
+        logging.info(f"Settlement of {label}: {stage} done in {time.perf_counter() - started:.2f}s, next: {next_stage}")
+
+    # ---------------------------
+    # Stages. Each returns the result columns to store.
+    # ---------------------------
+    def collect(self, job: dict) -> dict:
+        owner, repo = split_repository_name(job["repository_name"])
+        commit_history, review_comment_list = collect_contribution_history(owner, repo, job["issue_id"])
+        if commit_history is None:
+            raise SettlementError("GitHub API Error")
+        return {"evidence": json.dumps({"commit_history": commit_history, "review_comment_list": review_comment_list})}
+
+    def judge(self, job: dict) -> dict:
+        evidence = json.loads(job["evidence"])
+        distribution = judge_contribution(
+            job["repository_name"],
+            job["issue_id"],
+            job["issue_title"],
+            job["issue_body"],
+            evidence["commit_history"],
+            evidence["review_comment_list"],
+        )
+        try:
+            distribution = validate_distribution(distribution)
+        except SettlementError:
+            # The verdict was memoized; drop it so the retry asks the LLM again
+            invalidate_verdicts(repository_name=job["repository_name"], issue_id=job["issue_id"])
+            raise
+        return {"distribution": json.dumps(distribution)}
+
+    def register(self, job: dict) -> dict:
+        try:
+            distribution = validate_distribution(json.loads(job["distribution"]))
+        except SettlementError as e:
+            # Stored by an earlier, laxer judge stage; retrying the transaction cannot fix it
+            logging.warning(f"Settlement of {job['repository_name']} issue {job['issue_id']} is judged again: {e}")
+            invalidate_verdicts(repository_name=job["repository_name"], issue_id=job["issue_id"])
+            return {"next_stage": "judge", "distribution": None}
+        names = [item["name"] for item in distribution]
+        contributions = [str(item["contribution"]) for item in distribution]
+        submitter = get_transaction_submitter()
+        label = f"settlement:{job['id']}"
+        try:
+            # The transaction of an earlier attempt is waited for rather than sent again
+            handle = submitter.find(label)
+            if handle is None:
+                batcher = self._get_batcher(submitter)
+                if batcher is None:
+                    handle = send_register_and_complete_issue(
+                        submitter, job["repository_name"], str(job["issue_id"]), names, contributions, label=label
+                    )
+                else:
+                    handle = batcher.add(job["repository_name"], job["issue_id"], names, contributions, label=label)
+            tx_result = str(handle.result())
+        except Exception as e:
+            # An earlier attempt was mined after the worker lost track of it
+            if ALREADY_COMPLETED_REASON not in str(e):
+                raise
+            tx_result = ALREADY_COMPLETED_REASON
+        return {"tx_result": tx_result}
+
+    def _get_batcher(self, submitter):
+        """
+        Returns the batcher shared by the register stages of this worker, or None when settlements
+        are sent one by one: batching is disabled, or drain() runs the jobs one at a time.
+        """
+        if self.batch_size <= 1 or not self.running:
+            return None
+        with self._lock:
+            if self._batcher is None:
+                self._batcher = SettlementBatcher(
+                    submitter, CONTRACT_ADDRESS, load_abi(CONTRACT_ABI_PATH),
+                    window=self.batch_window, max_size=self.batch_size
+                )
+            return self._batcher
+
+    def _post_once(self, job: dict, marker: str, body: str):
+        owner, repo = split_repository_name(job["repository_name"])
+        existing = find_issue_comment(owner, repo, job["issue_id"], marker)
+        if existing is not None:
+            return existing["id"]
+        comment = request_post_github_api(
+            f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{job['issue_id']}/comments",
+            {"body": f"{body}\n{marker}"}
+        )
+        if comment is None:
+            raise SettlementError("Failed to post the issue comment")
+        return comment["id"]
+
+    def report(self, job: dict) -> dict:
+        body = format_contribution_report(json.loads(job["distribution"]))
+        return {"report_comment_id": self._post_once(job, REPORT_COMMENT_MARKER, body)}
+
+    def merge(self, job: dict) -> dict:
+        # Update is_merged = 1
+        mark_reward_as_merged(job["repository_name"], job["issue_id"])
+        reward_id = get_reward_id(job["repository_name"], job["issue_id"])
+        logging.info(f"Updated reward ID: {reward_id}")
+        if reward_id is None:
+            # No reward was locked for this issue, so there is nothing to claim
+            return {"next_stage": "done"}
+        return {"reward_id": reward_id}
+
+    def claim_comment(self, job: dict) -> dict:
+        body = build_claim_comment(json.loads(job["distribution"]), job["reward_id"])
+        return {"claim_comment_id": self._post_once(job, CLAIM_COMMENT_MARKER, body)}
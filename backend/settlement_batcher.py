@@ -0,0 +1,199 @@
+# backend/settlement_batcher.py
+import os
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from typing import List, Optional
+import settings.logging  # noqa: F401
+import settings.env  # noqa: F401
+
+from tx_submitter import TransactionFailed
+
+# Seconds the first settlement of a batch waits for others to join it before the batch is sent
+SETTLEMENT_BATCH_WINDOW = float(os.environ.get("SETTLEMENT_BATCH_WINDOW", "5"))
+# Settlements per registerAndCompleteIssues transaction; a full batch is sent right away. 1 disables batching,
+# the default: contracts deployed before registerAndCompleteIssues was added revert batches
+SETTLEMENT_BATCH_SIZE = int(os.environ.get("SETTLEMENT_BATCH_SIZE", "1"))
+
+BATCH_METHOD = "registerAndCompleteIssues"
+SINGLE_METHOD = "registerAndCompleteIssue"
+ISSUE_COMPLETED_EVENT = "IssueCompleted(string,uint256,string[])"
+ISSUE_SKIPPED_EVENT = "IssueSkipped(string,uint256,string)"
+
+class IssueSkipped(TransactionFailed):
+    """Raised by the handle of a settlement the contract skipped; the message contains the reason"""
+
+class SettlementHandle(Future):
+    """
+    Future of one settlement of a batch: result() returns the TransactionReceipt of the batch
+    once the issue is completed, and raises if the batch failed or the contract skipped the issue.
+    """
+
+    def __init__(self, repository_name, issue_id, github_ids, percentages, label=None):
+        super().__init__()
+        self.repository_name = repository_name
+        self.issue_id = int(issue_id)
+        self.github_ids = list(github_ids)
+        self.percentages = [int(percentage) for percentage in percentages]
+        self.label = label
+        self.batch = None  # TransactionHandle of the batch, once sent
+
+    def __str__(self):
+        return f"settlement of {self.repository_name} issue {self.issue_id}"
+
+class SettlementBatcher:
+    """
+    Collects the registerAndCompleteIssue calls of issues closed around the same time and
+    sends them as one registerAndCompleteIssues transaction through a TransactionSubmitter.
+
+    A batch is sent `window` seconds after its first settlement was added, or as soon as it
+    holds `max_size` of them. The contract skips the issues it cannot complete instead of
+    reverting the batch; each settlement's handle is resolved from the IssueCompleted and
+    IssueSkipped events of the receipt. Batches are not labelled: a settlement sent again
+    after a restart is skipped as "Issue already completed" if its first batch was mined.
+    """
+
+    def __init__(self, submitter, contract_address, abi,
+                 window=SETTLEMENT_BATCH_WINDOW, max_size=SETTLEMENT_BATCH_SIZE):
+        self.submitter = submitter
+        self.contract_address = contract_address
+        self.abi = abi
+        self.window = window
+        self.max_size = max(1, max_size)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._deadline = None
+        self._stopped = False
+        self._flusher = None
+
+    def add(self, repository_name: str, issue_id, github_ids: List[str], percentages: List[str], label: Optional[str] = None) -> SettlementHandle:
+        """
+        Queues the settlement of an issue and returns its handle.
+        Raises ValueError if the contract would reject it, so a skip can only mean the issue was completed before.
+        """
+        handle = SettlementHandle(repository_name, issue_id, github_ids, percentages, label)
+        if len(handle.github_ids) != len(handle.percentages):
+            raise ValueError(f"{handle} has {len(handle.github_ids)} contributors and {len(handle.percentages)} percentages")
+        if sum(handle.percentages) != 100:
+            raise ValueError(f"Percentages of {handle} sum to {sum(handle.percentages)}, not 100")
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("The settlement batcher is stopped")
+            if not self._queue:
+                self._deadline = time.monotonic() + self.window
+            self._queue.append(handle)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_forever, name="settlement-batcher", daemon=True)
+                self._flusher.start()
+            self._cond.notify()
+        return handle
+
+    def stop(self) -> None:
+        """Sends the queued settlements at once and stops the batcher."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            flusher = self._flusher
+        if flusher is not None:
+            flusher.join()
+
+    def _flush_forever(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (
+                    not self._queue
+                    or (len(self._queue) < self.max_size and time.monotonic() < self._deadline)
+                ):
+                    self._cond.wait(None if not self._queue else self._deadline - time.monotonic())
+                if not self._queue:
+                    return
+                handles, self._queue = self._queue[:self.max_size], self._queue[self.max_size:]
+                self._deadline = time.monotonic() + self.window
+            self._send(handles)
+
+    def _send(self, handles: List[SettlementHandle]) -> None:
+        try:
+            if len(handles) == 1:
+                # Nothing to share the transaction with; the single call costs less gas
+                handle = handles[0]
+                batch = self.submitter.submit(self.contract_address, self.abi, SINGLE_METHOD, {
+                    "repositoryName": handle.repository_name,
+                    "issueId": str(handle.issue_id),
+                    "githubIds": handle.github_ids,
+                    "percentages": [str(percentage) for percentage in handle.percentages],
+                }, label=handle.label)
+            else:
+                batch = self.submitter.submit(self.contract_address, self.abi, BATCH_METHOD, {
+                    "repositoryNames": [handle.repository_name for handle in handles],
+                    "issueIds": [str(handle.issue_id) for handle in handles],
+                    "githubIds": [handle.github_ids for handle in handles],
+                    "percentages": [[str(percentage) for percentage in handle.percentages] for handle in handles],
+                })
+        except Exception as e:
+            logging.error(f"Failed to send the settlement of {len(handles)} issues: {e}")
+            for handle in handles:
+                handle.set_exception(e)
+            return
+        logging.info(f"Sent the settlement of {len(handles)} issues in {batch}")
+        for handle in handles:
+            handle.batch = batch
+        batch.add_done_callback(lambda future: self._resolve(future, handles))
+
+    def _resolve(self, batch: Future, handles: List[SettlementHandle]) -> None:
+        error = batch.exception()
+        if error is not None:
+            for handle in handles:
+                handle.set_exception(error)
+            return
+        receipt = batch.result()
+        if len(handles) == 1 or receipt.logs is None:
+            # A single call reverts instead of skipping. Without logs (CDP wallet) every settlement
+            # counts as done: they were validated when added, so a skipped issue was completed before.
+            for handle in handles:
+                handle.set_result(receipt)
+            return
+        try:
+            self._resolve_from_logs(receipt, handles)
+        except Exception as e:
+            logging.error(f"Failed to read the outcome of {batch}: {e}")
+            for handle in handles:
+                if not handle.done():
+                    handle.set_exception(e)
+
+    def _resolve_from_logs(self, receipt, handles: List[SettlementHandle]) -> None:
+        from eth_utils import keccak  # Deferred like web3, which provides it
+
+        outcomes = self._outcomes(receipt.logs)
+        for handle in handles:
+            events = outcomes.get((keccak(text=handle.repository_name), handle.issue_id))
+            if not events:
+                handle.set_exception(TransactionFailed(f"No event for the {handle} in {receipt}"))
+                continue
+            # An issue sent twice in one batch has one event per occurrence, in order
+            reason = events.popleft()
+            if reason is None:
+                handle.set_result(receipt)
+            else:
+                handle.set_exception(IssueSkipped(f"The {handle} was skipped in {receipt}: {reason}"))
+
+    def _outcomes(self, logs) -> dict:
+        """Returns the skip reasons (None when completed) of the issues of a receipt by (repository name hash, issue id)."""
+        from eth_abi import decode
+        from eth_utils import keccak
+
+        completed_topic = keccak(text=ISSUE_COMPLETED_EVENT)
+        skipped_topic = keccak(text=ISSUE_SKIPPED_EVENT)
+        outcomes = defaultdict(deque)
+        for log in logs:
+            if str(log["address"]).lower() != self.contract_address.lower():
+                continue
+            topics = [bytes(topic) for topic in log["topics"]]
+            if len(topics) != 3 or topics[0] not in (completed_topic, skipped_topic):
+                continue
+            # Indexed strings are logged as their hash
+            key = (topics[1], int.from_bytes(topics[2], "big"))
+            reason = None if topics[0] == completed_topic else decode(["string"], bytes(log["data"]))[0]
+            outcomes[key].append(reason)
+        return outcomes
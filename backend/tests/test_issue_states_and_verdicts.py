@@ -0,0 +1,139 @@
+import json
+from unittest import mock
+
+import pytest
+
+import github_api
+from custom_actions import evaluate_contribution
+from custom_actions.evaluate_contribution import compute_evidence_hash, judge_contribution
+from db.connection import close_connections
+from db.setup import setup
+from db.verdicts import save_verdict
+
+ALICE_1 = ("alice", "app", 1)
+ALICE_2 = ("alice", "app", 2)
+BOB_7 = ("bob", "lib", 7)
+
+def _graphql_response(payload: dict) -> mock.Mock:
+    res = mock.Mock()
+    res.json.return_value = payload
+    return res
+
+def _commit_history(commit_url: str, patch: str) -> list:
+    return [[{
+        "name": "alice",
+        "commit_url": commit_url,
+        "change_files": [{"filename": "app.py", "patch": patch}],
+    }]]
+
+def _review_comment_list(comment: str) -> list:
+    return [[{"name": "bob", "comment": comment}]]
+
+def test_build_issue_state_query_groups_issues_by_repository():
+    query, aliases = github_api.build_issue_state_query([ALICE_1, BOB_7, ALICE_2])
+
+    assert aliases == {("r0", "i0"): ALICE_1, ("r0", "i1"): ALICE_2, ("r1", "i0"): BOB_7}
+    assert query.count("repository(") == 2
+
+def test_fetch_issue_states_maps_aliases_despite_partial_errors():
+    states = _graphql_response({
+        "data": {
+            "r0": {
+                "i0": {"number": 1, "state": "OPEN", "closedAt": None},
+                "i1": {"number": 2, "state": "CLOSED", "closedAt": "2024-01-02T00:00:00Z"},
+            },
+            "r1": None,
+        },
+        "errors": [{"message": "Could not resolve to a Repository with the name 'bob/lib'."}],
+    })
+    details = _graphql_response({
+        "data": {"r0": {"i0": {"number": 2, "title": "Fix", "body": "Details", "author": {"login": "carol"}}}},
+    })
+    with mock.patch.object(github_api, "_session") as session:
+        session.post.side_effect = [states, details]
+        results = github_api.fetch_issue_states([ALICE_1, ALICE_2, BOB_7])
+
+    assert results[BOB_7] is None
+    assert results[ALICE_1]["state"] == "open"
+    assert results[ALICE_1]["closed_at"] is None
+    assert results[ALICE_2] == {
+        "number": 2,
+        "state": "closed",
+        "closed_at": "2024-01-02T00:00:00Z",
+        "title": "Fix",
+        "body": "Details",
+        "user": {"login": "carol"},
+    }
+    # Only the closed issue is queried for its details
+    detail_query = session.post.call_args_list[1].kwargs["json"]["query"]
+    assert "issue(number: 2)" in detail_query
+    assert "issue(number: 1)" not in detail_query
+
+def test_evidence_hash_ignores_whitespace_and_fork_urls():
+    upstream = compute_evidence_hash(
+        "Fix the parser",
+        "It fails on empty input.",
+        _commit_history("https://github.com/alice/app/commit/abc123", "+return None\n-raise"),
+        _review_comment_list("Looks good"),
+    )
+    fork = compute_evidence_hash(
+        "Fix the parser  ",
+        "\nIt fails on empty input.   \n",
+        _commit_history("https://github.com/mallory/app-fork/commit/abc123", "+return None   \n-raise\n"),
+        _review_comment_list("Looks good \n"),
+    )
+
+    assert upstream == fork
+
+def test_evidence_hash_changes_with_the_evidence():
+    args = ("Fix the parser", "It fails on empty input.")
+    base = compute_evidence_hash(
+        *args,
+        _commit_history("https://github.com/alice/app/commit/abc123", "+return None"),
+        _review_comment_list("Looks good")
+    )
+    other_commit = compute_evidence_hash(
+        *args,
+        _commit_history("https://github.com/alice/app/commit/def456", "+return None"),
+        _review_comment_list("Looks good")
+    )
+    other_budget = compute_evidence_hash(
+        *args,
+        _commit_history("https://github.com/alice/app/commit/abc123", "+return None"),
+        _review_comment_list("Looks good"),
+        token_budget=100
+    )
+
+    assert len({base, other_commit, other_budget}) == 3
+
+@pytest.fixture
+def verdict_db(tmp_path, monkeypatch):
+    # The database lives at a relative path, so each test gets its own working directory
+    close_connections()
+    monkeypatch.chdir(tmp_path)
+    setup()
+    yield
+    close_connections()
+
+def test_judge_contribution_reuses_stored_verdict_without_llm(verdict_db):
+    distribution = [{"name": "alice", "contribution": 100, "reason": "Wrote the fix"}]
+    commit_history = _commit_history("https://github.com/alice/app/commit/abc123", "+return None")
+    review_comment_list = _review_comment_list("Looks good")
+    evidence_hash = compute_evidence_hash("Fix the parser", "Body", commit_history, review_comment_list)
+    assert save_verdict(evidence_hash, "alice/app", 2, "model", "v1", json.dumps(distribution))
+
+    llm = mock.Mock()
+    with mock.patch.object(evaluate_contribution, "build_evidence") as build_evidence:
+        result = judge_contribution(
+            "alice/app",
+            2,
+            "Fix the parser ",
+            "Body\n",
+            _commit_history("https://github.com/mallory/app-fork/commit/abc123", "+return None  "),
+            review_comment_list,
+            llm=llm
+        )
+
+    assert result == distribution
+    llm.invoke.assert_not_called()
+    build_evidence.assert_not_called()
@@ -0,0 +1,391 @@
+# backend/tx_submitter.py
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+import settings.logging  # noqa: F401
+import settings.env  # noqa: F401
+
+from db.transactions import (
+    UNCONFIRMED_STATUSES,
+    record_transaction,
+    update_transaction,
+    get_latest_transaction,
+    get_unconfirmed_transactions,
+)
+
+# With both set, transactions are signed locally and sent to this node (e.g. a local anvil node);
+# otherwise they go through the CDP wallet of the agent
+TX_RPC_URL = os.environ.get("TX_RPC_URL")
+TX_PRIVATE_KEY = os.environ.get("TX_PRIVATE_KEY")
+# Seconds between two rounds of receipt checks
+TX_POLL_INTERVAL = float(os.environ.get("TX_POLL_INTERVAL", "2"))
+# Blocks (including the one it is in) a transaction needs before it counts as confirmed
+TX_CONFIRMATIONS = int(os.environ.get("TX_CONFIRMATIONS", "1"))
+# Seconds a transaction may stay without receipt before its handle fails (it stays tracked in the database)
+TX_TIMEOUT = float(os.environ.get("TX_TIMEOUT", "600"))
+TX_EXPLORER_URL = os.environ.get("TX_EXPLORER_URL", "https://sepolia.basescan.org/tx/")
+
+class TransactionFailed(Exception):
+    """Raised by a transaction handle when the transaction reverted or was not confirmed in time"""
+
+class TransactionReceipt:
+    """The outcome of a confirmed transaction; logs is None when the sender cannot read them"""
+
+    def __init__(self, tx_hash, block_number=None, gas_used=None, link=None, logs=None):
+        self.tx_hash = tx_hash
+        self.block_number = block_number
+        self.gas_used = gas_used
+        self.link = link
+        self.logs = logs
+
+    def __str__(self):
+        block = f" in block {self.block_number}" if self.block_number is not None else ""
+        return f"Transaction {self.tx_hash} confirmed{block}: {self.link or self.tx_hash}"
+
+class SentTransaction:
+    """A transaction accepted by the network; state is whatever the sender needs to poll it"""
+
+    def __init__(self, tx_hash, nonce=None, sender=None, link=None, state=None):
+        self.tx_hash = tx_hash
+        self.nonce = nonce
+        self.sender = sender
+        self.link = link
+        self.state = state
+
+class TransactionHandle(Future):
+    """
+    Future of a submitted transaction: result() returns its TransactionReceipt once confirmed
+    and raises TransactionFailed if it reverted or timed out.
+    """
+
+    def __init__(self, tx_id, method, label=None):
+        super().__init__()
+        self.tx_id = tx_id
+        self.method = method
+        self.label = label
+        self.tx_hash = None
+        self.link = None
+
+    def __str__(self):
+        return f"{self.method} transaction {self.tx_id}: {self.link or self.tx_hash or 'not sent'}"
+
+def coerce_args(abi: list, method: str, args: dict) -> list:
+    """
+    Orders the named arguments of a contract call like the ABI inputs, converting the
+    decimal strings the CDP wallet accepts for integers.
+    """
+    for item in abi:
+        if item.get("type") == "function" and item.get("name") == method:
+            inputs = item["inputs"]
+            break
+    else:
+        raise ValueError(f"{method} is not a function of the ABI")
+
+    def convert(abi_type, value):
+        if abi_type.endswith("[]"):
+            return [convert(abi_type[:-2], item) for item in value]
+        if abi_type.startswith(("uint", "int")) and isinstance(value, str):
+            return int(value, 16) if value.startswith("0x") else int(value)
+        return value
+
+    return [convert(item["type"], args[item["name"]]) for item in inputs]
+
+class Web3Sender:
+    """
+    Signs transactions with a local key and assigns their nonces itself, so any number of
+    them are sent back to back without waiting for the previous one to be mined.
+    """
+
+    # Transactions sent before a restart are tracked again from their database row
+    resumable = True
+
+    def __init__(self, rpc_url, private_key, confirmations=TX_CONFIRMATIONS, explorer_url=TX_EXPLORER_URL):
+        from web3 import Web3  # Deferred: web3 is slow to import and only needed to send transactions
+
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.account = self.w3.eth.account.from_key(private_key)
+        self.address = self.account.address
+        self.confirmations = confirmations
+        self.explorer_url = explorer_url
+        self._contracts = {}
+        self._nonce = None
+        self._nonce_lock = threading.Lock()
+
+    def _contract(self, contract_address, abi):
+        key = contract_address.lower()
+        contract = self._contracts.get(key)
+        if contract is None:
+            contract = self._contracts[key] = self.w3.eth.contract(
+                address=self.w3.to_checksum_address(contract_address), abi=abi
+            )
+        return contract
+
+    def send(self, contract_address, abi, method, args) -> SentTransaction:
+        function = self._contract(contract_address, abi).get_function_by_name(method)(*coerce_args(abi, method, args))
+        # Gas estimation runs before a nonce is taken: a call that would revert raises here and uses no nonce
+        tx = function.build_transaction({"from": self.address})
+        with self._nonce_lock:
+            if self._nonce is None:
+                self._nonce = self.w3.eth.get_transaction_count(self.address, "pending")
+            tx["nonce"] = self._nonce
+            signed = self.account.sign_transaction(tx)
+            raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+            try:
+                tx_hash = self.w3.to_hex(self.w3.eth.send_raw_transaction(raw))
+            except Exception:
+                # The key may have been used elsewhere; read the nonce from the node again
+                self._nonce = None
+                raise
+            self._nonce += 1
+        return SentTransaction(tx_hash, tx["nonce"], self.address, f"{self.explorer_url}{tx_hash}", tx)
+
+    def resume(self, row: dict) -> Optional[SentTransaction]:
+        """Rebuilds a transaction sent before a restart from its database row."""
+        return SentTransaction(row["tx_hash"], row["nonce"], row["sender"], f"{self.explorer_url}{row['tx_hash']}")
+
+    def poll(self, sent: SentTransaction) -> Optional[TransactionReceipt]:
+        """Returns the receipt once confirmed, None while pending; raises TransactionFailed if reverted."""
+        from web3.exceptions import TransactionNotFound
+
+        try:
+            receipt = self.w3.eth.get_transaction_receipt(sent.tx_hash)
+        except TransactionNotFound:
+            return None
+        if self.confirmations > 1 and self.w3.eth.block_number - receipt["blockNumber"] + 1 < self.confirmations:
+            return None
+        if receipt["status"] != 1:
+            raise TransactionFailed(f"Transaction {sent.tx_hash} reverted: {self._revert_reason(sent, receipt)}")
+        return TransactionReceipt(sent.tx_hash, receipt["blockNumber"], receipt["gasUsed"], sent.link, receipt["logs"])
+
+    def _revert_reason(self, sent, receipt) -> str:
+        # Receipts carry no reason; replay the call on the state before its block
+        try:
+            tx = sent.state or self.w3.eth.get_transaction(sent.tx_hash)
+            self.w3.eth.call(
+                {"from": tx["from"], "to": tx["to"], "data": tx.get("data") or tx.get("input"), "value": tx.get("value", 0)},
+                receipt["blockNumber"] - 1
+            )
+        except Exception as e:
+            return str(e)
+        return "unknown reason"
+
+class CdpSender:
+    """
+    Sends transactions through the agent's CDP wallet. CDP assigns the nonces; only the wait
+    for the confirmation moves to the poller. Transactions sent before a restart cannot be resumed.
+    """
+
+    resumable = False
+
+    def __init__(self, wallet_factory):
+        self.wallet_factory = wallet_factory
+        self._send_lock = threading.Lock()
+
+    def send(self, contract_address, abi, method, args) -> SentTransaction:
+        # One broadcast at a time keeps the transactions of the wallet in submission order
+        with self._send_lock:
+            invocation = self.wallet_factory().invoke_contract(
+                contract_address=contract_address,
+                abi=abi,
+                method=method,
+                args=args
+            )
+        return SentTransaction(
+            invocation.transaction_hash,
+            sender=getattr(invocation, "address_id", None),
+            link=invocation.transaction_link,
+            state=invocation
+        )
+
+    def resume(self, row: dict) -> Optional[SentTransaction]:
+        return None
+
+    def poll(self, sent: SentTransaction) -> Optional[TransactionReceipt]:
+        invocation = sent.state
+        invocation.reload()
+        status = str(getattr(invocation.status, "value", invocation.status)).lower()
+        if status == "complete":
+            return TransactionReceipt(invocation.transaction_hash, link=invocation.transaction_link)
+        if status == "failed":
+            raise TransactionFailed(f"Transaction {invocation.transaction_hash} failed: {invocation}")
+        return None
+
+class TransactionSubmitter:
+    """
+    Sends contract transactions without waiting for them to be mined.
+
+    submit() returns as soon as the transaction is accepted by the network, with a
+    TransactionHandle (a Future). One background poller checks the receipts of every
+    pending transaction and resolves the handles; done-callbacks run on a small pool so
+    they never delay the poller. Each transaction is recorded in the transactions table
+    with its status, so a label can be used to find the transaction of an earlier attempt.
+    """
+
+    def __init__(self, sender, poll_interval=TX_POLL_INTERVAL, timeout=TX_TIMEOUT):
+        self.sender = sender
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._pending = {}  # handle -> (sent transaction, deadline)
+        self._poller = None
+        self._stopped = threading.Event()
+        self._callbacks = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tx-callback")
+
+    def submit(self, contract_address: str, abi: list, method: str, args: dict, label: Optional[str] = None) -> TransactionHandle:
+        """
+        Sends a contract call and returns its handle.
+        Raises if the transaction could not be sent, e.g. because the call would revert.
+        """
+        tx_id = record_transaction(contract_address, method, json.dumps(args), label)
+        handle = TransactionHandle(tx_id, method, label)
+        try:
+            sent = self.sender.send(contract_address, abi, method, args)
+        except Exception as e:
+            if tx_id is not None:
+                update_transaction(tx_id, "failed", error=str(e))
+            raise
+        if tx_id is not None:
+            update_transaction(tx_id, "submitted", sender=sent.sender, nonce=sent.nonce, tx_hash=sent.tx_hash)
+        logging.info(f"Sent {handle}")
+        self._track(handle, sent)
+        return handle
+
+    def find(self, label: str) -> Optional[TransactionHandle]:
+        """
+        Returns the handle of the latest transaction sent with label, if it is pending or
+        confirmed, including one sent before a restart. Returns None if it has to be sent (again).
+        """
+        with self._cond:
+            for handle in self._pending:
+                if handle.label == label:
+                    return handle
+        row = get_latest_transaction(label)
+        if row is None:
+            return None
+        handle = TransactionHandle(row["id"], row["method"], label)
+        handle.tx_hash = row["tx_hash"]
+        if row["status"] == "confirmed":
+            handle.set_result(TransactionReceipt(row["tx_hash"], row["block_number"], row["gas_used"]))
+            return handle
+        if row["status"] in UNCONFIRMED_STATUSES and row["tx_hash"]:
+            sent = self.sender.resume(row)
+            if sent is not None:
+                self._track(handle, sent)
+                return handle
+        return None
+
+    def resume_unconfirmed(self) -> int:
+        """
+        Tracks again the transactions sent before a restart that have no receipt yet.
+        Returns the number of resumed transactions.
+        """
+        resumed = 0
+        for row in get_unconfirmed_transactions():
+            with self._cond:
+                if any(handle.tx_id == row["id"] for handle in self._pending):
+                    continue
+            sent = self.sender.resume(row)
+            if sent is not None:
+                self._track(TransactionHandle(row["id"], row["method"], row["label"]), sent)
+                resumed += 1
+        return resumed
+
+    @property
+    def resumable(self) -> bool:
+        """Whether find() can track again a transaction sent before a restart or that timed out."""
+        return getattr(self.sender, "resumable", False)
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _track(self, handle, sent):
+        handle.tx_hash = sent.tx_hash
+        handle.link = sent.link
+        with self._cond:
+            self._pending[handle] = (sent, time.monotonic() + self.timeout)
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll_forever, name="tx-poller", daemon=True)
+                self._poller.start()
+            self._cond.notify()
+
+    def _finish(self, handle, status, result=None, exception=None, **fields):
+        with self._cond:
+            self._pending.pop(handle, None)
+        if handle.tx_id is not None:
+            update_transaction(handle.tx_id, status, **fields)
+        if exception is None:
+            logging.info(f"Confirmed {handle}")
+            self._callbacks.submit(handle.set_result, result)
+        else:
+            logging.error(f"{handle} {status}: {exception}")
+            self._callbacks.submit(handle.set_exception, exception)
+
+    def _poll_forever(self):
+        while not self._stopped.is_set():
+            with self._cond:
+                while not self._pending and not self._stopped.is_set():
+                    self._cond.wait()
+                pending = list(self._pending.items())
+            for handle, (sent, deadline) in pending:
+                try:
+                    receipt = self.sender.poll(sent)
+                except TransactionFailed as e:
+                    self._finish(handle, "failed", exception=e, error=str(e))
+                    continue
+                except Exception as e:
+                    # The node being unreachable for a moment is not a transaction failure
+                    logging.warning(f"Failed to check {handle}: {e}")
+                    receipt = None
+                if receipt is not None:
+                    self._finish(handle, "confirmed", result=receipt,
+                                 block_number=receipt.block_number, gas_used=receipt.gas_used)
+                elif time.monotonic() > deadline:
+                    error = TransactionFailed(f"{handle} was not confirmed after {self.timeout:.0f}s")
+                    self._finish(handle, "timeout", exception=error, error=str(error))
+            self._stopped.wait(self.poll_interval)
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+
+_submitter = None
+_submitter_lock = threading.Lock()
+_wallet_factory = None
+
+def configure_transaction_submitter(wallet_factory) -> None:
+    """
+    Sets the function returning the CDP wallet the process-wide submitter sends through when
+    TX_PRIVATE_KEY is not set. Called once at startup, before the first get_transaction_submitter.
+    """
+    global _wallet_factory
+    with _submitter_lock:
+        if _submitter is not None and _wallet_factory is not wallet_factory:
+            raise RuntimeError("The transaction submitter is already in use with another wallet")
+        _wallet_factory = wallet_factory
+
+def get_transaction_submitter() -> TransactionSubmitter:
+    """
+    Returns the process-wide submitter, creating it on first use. It signs with TX_PRIVATE_KEY
+    on TX_RPC_URL when both are set, and otherwise sends through the CDP wallet given to
+    configure_transaction_submitter.
+    """
+    global _submitter
+    if _submitter is None:
+        with _submitter_lock:
+            if _submitter is None:
+                if TX_RPC_URL and TX_PRIVATE_KEY:
+                    submitter = TransactionSubmitter(Web3Sender(TX_RPC_URL, TX_PRIVATE_KEY))
+                    # Transactions sent before a restart are confirmed or failed like new ones
+                    submitter.resume_unconfirmed()
+                elif _wallet_factory is None:
+                    raise RuntimeError("configure_transaction_submitter must be called before sending through the CDP wallet")
+                else:
+                    submitter = TransactionSubmitter(CdpSender(_wallet_factory))
+                _submitter = submitter
+    return _submitter
@@ -1,4 +1,7 @@
 import json
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Iterable, Iterator
 
 def format_sse(data: str, event: str = None, functions: str = []) -> str:
     """Format data as SSE"""
@@ -8,4 +11,20 @@ def format_sse(data: str, event: str = None, functions: str = []) -> str:
     }
     if (len(functions) > 0):
         response["functions"] = functions
-    return json.dumps(response) + "\n"
\ No newline at end of file
+    return json.dumps(response) + "\n"
+
+def bounded_map(func: Callable, iterable: Iterable, executor: Executor, max_in_flight: int) -> Iterator:
+    """Like Executor.map, but consumes the iterable lazily and keeps at most
+    max_in_flight calls pending. Results are yielded in input order."""
+    pending = deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Stop work nobody will consume when the caller exits early
+        for future in pending:
+            future.cancel()
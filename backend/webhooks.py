@@ -0,0 +1,49 @@
+# backend/webhooks.py
+import re
+import hmac
+import hashlib
+
+# Closing keywords GitHub recognizes in pull request descriptions, e.g. "Fixes #12"
+CLOSING_KEYWORDS = re.compile(
+    r"\b(?:close[sd]?|fix(?:e[sd])?|resolve[sd]?)\s+(?:([\w.-]+/[\w.-]+))?#(\d+)",
+    re.IGNORECASE
+)
+
+def verify_signature(secret: str, body: bytes, signature_header: str | None) -> bool:
+    """
+    Verifies the X-Hub-Signature-256 header of a webhook delivery.
+    """
+    if not secret or not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len("sha256="):])
+
+def extract_closed_issue(payload: dict):
+    """
+    Returns (owner, repo, issue_number, issue) for a closed issue in an `issues` event, or None.
+    Pull requests are delivered as issues too and are skipped.
+    """
+    issue = payload.get("issue") or {}
+    if payload.get("action") != "closed" or "pull_request" in issue:
+        return None
+    owner, repo = payload["repository"]["full_name"].split("/", 1)
+    return owner, repo, issue["number"], issue
+
+def extract_referenced_issues(payload: dict) -> list:
+    """
+    Returns the (owner, repo, issue_number) targets a merged pull request closes,
+    based on the closing keywords in its title and body.
+    """
+    pull_request = payload.get("pull_request") or {}
+    if payload.get("action") != "closed" or not pull_request.get("merged"):
+        return []
+    owner, repo = payload["repository"]["full_name"].split("/", 1)
+    text = f"{pull_request.get('title') or ''}\n{pull_request.get('body') or ''}"
+
+    targets = []
+    for match in CLOSING_KEYWORDS.finditer(text):
+        target_owner, target_repo = (match.group(1).split("/", 1) if match.group(1) else (owner, repo))
+        target = (target_owner, target_repo, int(match.group(2)))
+        if target not in targets:
+            targets.append(target)
+    return targets
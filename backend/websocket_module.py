@@ -1,18 +1,25 @@
 # backend/websocket_module.py
 import time
 import os
+import uuid
+import socket
+import heapq
+import random
 import logging
 import threading
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
-import requests
 import settings.logging
 import settings.env  # noqa: F401
 
 from chatbot import process_issue_event
+from github_api import request_github, fetch_issue_states, GITHUB_TOKEN, GRAPHQL_BATCH_SIZE
 
-# reward.py 内の get_rewards 関数をインポート
-from db.rewards import get_rewards
+# reward.py 内の iter_rewards 関数をインポート
+from db.rewards import iter_rewards
+from db.settlement_jobs import get_settlement_job
+from db.webhooks import prune_deliveries
+from db.reward_leases import sync_reward_leases, get_open_rewards_for_issue, take_over_reward_lease, release_reward_leases
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
@@ -22,116 +29,439 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(me
 GITHUB_OWNER = os.environ.get('GITHUB_OWNER', 'default_owner')
 # Polling interval in seconds
 POLL_INTERVAL = int(os.environ.get('POLL_INTERVAL', '120'))
+# Fraction of POLL_INTERVAL used to spread polls of different issues (0.2 -> +/-20%)
+POLL_JITTER = float(os.environ.get('POLL_JITTER', '0.2'))
+# Number of concurrent GitHub requests made by the monitor
+MONITOR_WORKERS = int(os.environ.get('MONITOR_WORKERS', '8'))
+# Resolve issue states in batches through the GraphQL API (requires GITHUB_TOKEN)
+MONITOR_USE_GRAPHQL = os.environ.get('MONITOR_USE_GRAPHQL', 'true').lower() == 'true'
+# Number of issues resolved by one GraphQL request
+MONITOR_BATCH_SIZE = int(os.environ.get('MONITOR_BATCH_SIZE', str(GRAPHQL_BATCH_SIZE)))
+# Number of closed issues handed to the agent at the same time
+MONITOR_PROCESS_WORKERS = int(os.environ.get('MONITOR_PROCESS_WORKERS', '1'))
+# Interval in seconds between reloads of the rewards table
+REWARDS_REFRESH_INTERVAL = int(os.environ.get('REWARDS_REFRESH_INTERVAL', '30'))
+# Seconds a monitor process keeps its rewards without a heartbeat; its peers take them over afterwards.
+# Heartbeats are sent every third of it.
+MONITOR_LEASE_SECONDS = float(os.environ.get('MONITOR_LEASE_SECONDS', '90'))
+# Seconds webhook deliveries are remembered to drop redeliveries; GitHub keeps them 3 days
+WEBHOOK_DELIVERY_RETENTION = int(os.environ.get('WEBHOOK_DELIVERY_RETENTION', str(3 * 24 * 3600)))
+# Client id of closed-issue processing in the agent session scheduler
+MONITOR_CLIENT_ID = 'issue-monitor'
+
+# ---------------------------
+# Helpers shared by the one-shot sweep and the scheduler
+# ---------------------------
+def parse_repository(repo_str):
+    """
+    Splits a repository string ("owner/repo", a GitHub URL or a bare repository name)
+    into (owner, repo). Returns None if the format is invalid.
+    """
+    # リポジトリ情報のフォーマットに応じて解析
+    if repo_str.startswith("https://"):
+        # URL形式の場合、パスから "owner/repository" を抽出
+        parsed = urlparse(repo_str)
+        path = parsed.path.strip("/")
+        if "/" in path:
+            owner, repo = path.split("/", 1)
+            return owner, repo
+        logging.error(f"Invalid repository format from URL: {repo_str}")
+        return None
+    elif "/" in repo_str:
+        # "owner/repository" 形式の場合
+        owner, repo = repo_str.split("/", 1)
+        return owner, repo
+    # 単一のリポジトリ名のみの場合、デフォルトのオーナーを利用
+    return GITHUB_OWNER, repo_str
+
+def reward_target(reward):
+    """
+    Returns the monitoring target (owner, repo, issue_number, reward_value) of a reward row,
+    or None if its repository name is invalid.
+    """
+    parsed = parse_repository(reward["repository_name"])
+    if parsed is None:
+        return None
+    owner, repo = parsed
+    return owner, repo, reward["issue_id"], reward["reward_amount"]
+
+def get_open_reward_targets():
+    """
+    Retrieves the open rewards from the database and returns their monitoring targets
+    (owner, repo, issue_number, reward_value). Issue bodies are not loaded.
+    """
+    targets = []
+    for reward in iter_rewards(status="open", columns=("repository_name", "issue_id", "reward_amount")):
+        target = reward_target(reward)
+        if target is not None:
+            targets.append(target)
+    logging.info(f"Number of open rewards: {len(targets)}")
+    return targets
+
+def fetch_issue(owner, repo, issue_number):
+    """
+    Fetches a single GitHub issue with a conditional request. Returns the issue JSON, or None on error.
+    This never sleeps; the caller decides when to poll again.
+    """
+    url = f'https://api.github.com/repos/{owner}/{repo}/issues/{issue_number}'
+    try:
+        response = request_github(url)
+    except Exception as e:
+        logging.error(f"GitHub API error for {owner}/{repo} Issue #{issue_number}: {e}")
+        return None
+    logging.info(f"Fetched issue #{issue_number} from {owner}/{repo} (cached: {response.from_cache})")
+    return response.data
+
+def fetch_issues(targets):
+    """
+    Fetches many issues at once. Returns {(owner, repo, issue_number): issue JSON or None}.
+    With a token, issues are resolved in batches through the GraphQL API;
+    otherwise one REST request is made per issue.
+    """
+    if MONITOR_USE_GRAPHQL and GITHUB_TOKEN:
+        return fetch_issue_states(list(targets), MONITOR_BATCH_SIZE)
+    return {target: fetch_issue(*target) for target in targets}
+
+def build_issue_info(owner, repo, issue_number, issue, reward_value):
+    """
+    Builds the issue_info payload passed to process_issue_event and emitted to socket clients.
+    """
+    return {
+        'owner': owner,
+        'repository': repo,
+        'number': issue_number,
+        'title': issue.get('title', ''),
+        'user': (issue.get('user') or {}).get('login', ''),
+        'closed_at': issue.get('closed_at'),
+        'body': issue.get('body', ''),
+        # Additional information such as reward_value can also be added
+        'reward_value': reward_value,
+    }
+
+def handle_closed_issue(socketio, agent_executor, config, issue_info):
+    """
+    Passes a closed issue to the agent and emits the issue_processed event.
+    """
+    logging.info(f"Issue #{issue_info['number']} in {issue_info['owner']}/{issue_info['repository']} has been closed at {issue_info['closed_at']}. Processing event...")
+    agent_response = process_issue_event(issue_info, agent_executor, config)
+    socketio.emit('issue_processed', {
+        'issue_info': issue_info,
+        'agent_response': agent_response
+    })
+    logging.info(f"Finished processing issue #{issue_info['number']} in {issue_info['owner']}/{issue_info['repository']}.")
+    return agent_response
 
 # ---------------------------
 # Function to monitor the specific issue for each reward entry
 # ---------------------------
 def monitor_specific_issue(socketio, agent_executor, config, owner, repo, issue_number, reward_value):
     """
-    Periodically polls a specific GitHub issue (issue_number) in the given repository,
+    Checks a specific GitHub issue (issue_number) in the given repository once,
     and when the issue is closed, calls process_issue_event.
+    Returns True if the issue was closed and processed.
     """
-    logging.info(f"Starting monitoring for issue #{issue_number} in {owner}/{repo}")
-
-    # while not processed:
     try:
-        # Access the API endpoint for the specified issue
-        url = f'https://api.github.com/repos/{owner}/{repo}/issues/{issue_number}'
-        response = requests.get(url)
-        logging.info(f"Fetching issue #{issue_number} from {owner}/{repo} - status: {response.status_code}")
-        
-        if response.status_code != 200:
-            logging.error(f"GitHub API error for {owner}/{repo} Issue #{issue_number}: {response.status_code} - {response.text}")
-            time.sleep(POLL_INTERVAL)
-            return
-
-        issue = response.json()
-        closed_at = issue.get('closed_at')
-        if closed_at is None:
-            logging.info(f"Issue #{issue_number} in {owner}/{repo} is not closed yet. Waiting {POLL_INTERVAL} seconds...")
-            time.sleep(POLL_INTERVAL)
-            return
+        issue = fetch_issue(owner, repo, issue_number)
+        if issue is None or issue.get('closed_at') is None:
+            return False
 
-        # Once the issue is closed, process it only once
-        logging.info(f"Issue #{issue_number} in {owner}/{repo} has been closed at {closed_at}. Processing event...")
-        issue_info = {
-            'owner': owner,
-            'repository': repo,
-            'number': issue_number,
-            'title': issue.get('title', ''),
-            'user': issue.get('user', {}).get('login', ''),
-            'closed_at': closed_at,
-            'body': issue.get('body', ''),
-            # Additional information such as reward_value can also be added
-            'reward_value': reward_value,
-        }
-        print(issue_info)
-        agent_response = process_issue_event(issue_info, agent_executor, config)
-        socketio.emit('issue_processed', {
-            'issue_info': issue_info,
-            'agent_response': agent_response
-        })
-        logging.info(f"Finished processing issue #{issue_number} in {owner}/{repo}. Exiting monitoring thread.")
+        issue_info = build_issue_info(owner, repo, issue_number, issue, reward_value)
+        handle_closed_issue(socketio, agent_executor, config, issue_info)
+        return True
     except Exception as e:
         logging.error(f"An error occurred while monitoring {owner}/{repo} Issue #{issue_number}: {e}")
-        time.sleep(POLL_INTERVAL)
-    
+        return False
+
 # ---------------------------
-# Updated start_monitors: Retrieve rewards directly from the database
+# Scheduler: per-issue deadlines polled by a bounded worker pool
 # ---------------------------
-def start_monitors(socketio, agent_executor, config):
+class IssuePollScheduler:
     """
-    Retrieves rewards directly from the database and starts a monitoring thread
-    for each reward entry based on the repository information and issue number.
+    Polls every open rewarded issue on its own jittered deadline.
+
+    Due issues are grouped into batches (one GraphQL query each) and fetched by a bounded
+    pool of poll workers, so the time to notice a close depends on POLL_INTERVAL and the
+    pool size, not on the number of rewards.
+    Closed issues are handed to a separate processing pool so a slow agent run
+    never holds up polling. agent_factory returns (agent_executor, config) and is only
+    called when a closed issue is processed, so the agent is not built just to poll.
+    With a session_scheduler.SessionScheduler as sessions, agent runs take its priority lane.
+
+    Any number of processes can share the rewards table: each one only monitors the rewards
+    it leases (db.reward_leases), renews its leases with a heartbeat every third of
+    lease_seconds and converges on an equal share of the open rewards. The rewards of a
+    process that stops heartbeating are taken over by its peers once its leases expire.
     """
-    try:
-        # 直接DBからリワード情報を取得
-        rewards = get_rewards()
-        logging.info(f"Number of rewards received: {len(rewards)}")
-        logging.info(f"Rewards: {rewards}")
-
-        for reward in rewards:
-            # reward はタプル形式 (repository_name, issue_id, reward_amount, id) を想定
-            if len(reward) < 1:
-                logging.error(f"Invalid reward entry (expected at least 2 elements): {reward}")
+
+    def __init__(self, socketio, agent_factory,
+                 max_workers=MONITOR_WORKERS,
+                 batch_size=MONITOR_BATCH_SIZE,
+                 process_workers=MONITOR_PROCESS_WORKERS,
+                 poll_interval=POLL_INTERVAL,
+                 jitter=POLL_JITTER,
+                 refresh_interval=REWARDS_REFRESH_INTERVAL,
+                 sessions=None,
+                 lease_seconds=MONITOR_LEASE_SECONDS,
+                 worker_id=None):
+        self.socketio = socketio
+        self.agent_factory = agent_factory
+        self.sessions = sessions
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.jitter = jitter
+        self.refresh_interval = refresh_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._cond = threading.Condition()
+        self._deadlines = []  # heap of (deadline, key)
+        self._targets = {}  # key -> (owner, repo, issue_number, reward_value)
+        self._reward_ids = {}  # key -> id of the leased reward row
+        self._in_flight = set()
+        self._running_batches = 0
+        self._processing = set()
+        self._stopped = threading.Event()
+        self._poll_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="issue-poll")
+        self._process_pool = ThreadPoolExecutor(max_workers=process_workers, thread_name_prefix="issue-process")
+
+    def _next_interval(self):
+        return self.poll_interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule(self, key, delay):
+        heapq.heappush(self._deadlines, (time.monotonic() + delay, key))
+        self._cond.notify()
+
+    def _track(self, reward):
+        # Called with self._cond held
+        target = reward_target(reward)
+        if target is None:
+            return None
+        key = target[:3]
+        self._reward_ids[key] = reward["id"]
+        if key not in self._targets and key not in self._processing:
+            self._targets[key] = target
+            self._schedule(key, random.uniform(0, self.poll_interval))
+        return key
+
+    def refresh(self):
+        """
+        Heartbeat: renews this process's reward leases, rebalances them with its peers and
+        synchronizes the tracked issues with the leased rewards.
+        New rewards get a random first deadline so a large batch does not poll in lockstep.
+        Also drops the webhook deliveries older than WEBHOOK_DELIVERY_RETENTION.
+        """
+        prune_deliveries(WEBHOOK_DELIVERY_RETENTION)
+        with self._cond:
+            pinned = [self._reward_ids[key] for key in self._processing if key in self._reward_ids]
+        rewards = sync_reward_leases(self.worker_id, self.lease_seconds, pinned)
+        if rewards is None:
+            # Keep monitoring the current issues; the leases are renewed at the next heartbeat
+            return
+        with self._cond:
+            leased_keys = {self._track(reward) for reward in rewards}
+
+            # Forget rewards that were merged, removed or handed to a peer; stale heap entries are skipped on pop
+            for key in list(self._targets):
+                if key not in leased_keys and key not in self._in_flight:
+                    del self._targets[key]
+            for key in list(self._reward_ids):
+                if key not in leased_keys and key not in self._targets and key not in self._processing:
+                    del self._reward_ids[key]
+            logging.info(f"Monitoring {len(self._targets)} open issues ({len(self._processing)} processing) as {self.worker_id}")
+
+    def _batch_size(self):
+        return self.batch_size if MONITOR_USE_GRAPHQL and GITHUB_TOKEN else 1
+
+    def _dispatch_due(self):
+        """
+        Groups due issues into batches and submits them to the poll pool,
+        keeping at most max_workers batches in flight.
+        Returns the number of seconds until the next deadline, or None if nothing is scheduled.
+        """
+        batch_size = self._batch_size()
+        with self._cond:
+            now = time.monotonic()
+            while self._deadlines and self._running_batches < self.max_workers:
+                batch = []
+                if self._deadlines[0][0] > now:
+                    break
+                # Once one issue is due, fill the batch with issues due within the jitter window
+                horizon = now + self.poll_interval * self.jitter if batch_size > 1 else now
+                while self._deadlines and len(batch) < batch_size and self._deadlines[0][0] <= horizon:
+                    _, key = heapq.heappop(self._deadlines)
+                    if key not in self._targets or key in self._in_flight:
+                        continue
+                    self._in_flight.add(key)
+                    batch.append(key)
+                if not batch:
+                    break
+                self._running_batches += 1
+                self._poll_pool.submit(self._poll, batch)
+
+            if self._running_batches >= self.max_workers or not self._deadlines:
+                return None
+            return max(self._deadlines[0][0] - now, 0)
+
+    def _poll(self, batch):
+        closed = set()
+        try:
+            issues = fetch_issues(batch)
+            for key in batch:
+                issue = issues.get(key)
+                if issue is None or issue.get('closed_at') is None:
+                    continue
+                closed.add(key)
+                with self._cond:
+                    # A webhook delivery may have picked the issue up in the meantime
+                    target = self._targets.pop(key, None)
+                    if target is None:
+                        continue
+                    self._processing.add(key)
+                owner, repo, issue_number, reward_value = target
+                issue_info = build_issue_info(owner, repo, issue_number, issue, reward_value)
+                self._process_pool.submit(self._process, key, issue_info)
+        except Exception as e:
+            logging.error(f"An error occurred while monitoring {len(batch)} issues: {e}")
+        finally:
+            with self._cond:
+                self._running_batches -= 1
+                for key in batch:
+                    self._in_flight.discard(key)
+                    if key not in closed and key in self._targets:
+                        self._schedule(key, self._next_interval())
+                self._cond.notify()
+
+    def _process(self, key, issue_info):
+        try:
+            job = get_settlement_job(f"{key[0]}/{key[1]}", key[2])
+            if job is not None:
+                # Already handed to the settlement pipeline, which retries it on its own
+                logging.info(f"{key[0]}/{key[1]} Issue #{key[2]} is being settled (stage: {job['stage']}, status: {job['status']})")
+                return
+            agent_executor, config = self.agent_factory()
+            if self.sessions is None:
+                handle_closed_issue(self.socketio, agent_executor, config, issue_info)
+            else:
+                # Priority lane: user traffic cannot delay settling a closed issue
+                with self.sessions.acquire(MONITOR_CLIENT_ID, priority=True):
+                    handle_closed_issue(self.socketio, agent_executor, config, issue_info)
+        except Exception as e:
+            logging.error(f"An error occurred while processing {key[0]}/{key[1]} Issue #{key[2]}: {e}")
+        finally:
+            # Re-check after one interval; the next refresh drops the issue once the reward is merged
+            with self._cond:
+                self._processing.discard(key)
+                self._targets[key] = (key[0], key[1], key[2], issue_info['reward_value'])
+                self._schedule(key, self._next_interval())
+
+    def _resolve_key(self, owner, repo, issue_number):
+        """
+        Returns the tracked key of an open rewarded issue. An issue monitored by another
+        process has its lease taken over, so the caller can handle it right away.
+        Returns None if the issue has no open reward.
+        """
+        wanted = (owner.lower(), repo.lower(), int(issue_number))
+
+        def matches(key):
+            return (key[0].lower(), key[1].lower(), int(key[2])) == wanted
+
+        with self._cond:
+            for key in list(self._targets) + list(self._processing):
+                if matches(key):
+                    return key
+        for reward in get_open_rewards_for_issue(int(issue_number)):
+            target = reward_target(reward)
+            if target is None or not matches(target[:3]):
                 continue
+            if take_over_reward_lease(reward["id"], self.worker_id, self.lease_seconds):
+                with self._cond:
+                    return self._track(reward)
+        return None
 
-            # skip if reward has already been processed
-            if reward[4] == 1:
-                logging.info(f"Reward for issue {reward[1]} has already been processed.")
+    def submit_closed_issue(self, owner, repo, issue_number, issue):
+        """
+        Processes an issue reported closed by a webhook without waiting for its next poll.
+        Returns True if the issue has an open reward and was queued for processing.
+        """
+        key = self._resolve_key(owner, repo, issue_number)
+        if key is None:
+            return False
+        with self._cond:
+            target = self._targets.pop(key, None)
+            if target is None:
+                # Already being processed
+                return False
+            self._processing.add(key)
+        owner, repo, issue_number, reward_value = target
+        issue_info = build_issue_info(owner, repo, issue_number, issue, reward_value)
+        self._process_pool.submit(self._process, key, issue_info)
+        return True
+
+    def poll_now(self, targets):
+        """
+        Moves the next poll of the given (owner, repo, issue_number) targets to now.
+        Returns the number of targets that have an open reward.
+        """
+        count = 0
+        for owner, repo, issue_number in targets:
+            key = self._resolve_key(owner, repo, issue_number)
+            if key is None:
                 continue
+            with self._cond:
+                if key in self._targets:
+                    self._schedule(key, 0)
+                    count += 1
+        return count
+
+    def run_forever(self):
+        """
+        Runs the scheduling loop until stop() is called.
+        """
+        next_refresh = 0
+        while not self._stopped.is_set():
+            if time.monotonic() >= next_refresh:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logging.error(f"Failed to refresh monitored rewards: {e}")
+                # The refresh is also the lease heartbeat
+                next_refresh = time.monotonic() + min(self.refresh_interval, self.lease_seconds / 3)
+
+            wait = self._dispatch_due()
+            until_refresh = max(next_refresh - time.monotonic(), 0)
+            timeout = until_refresh if wait is None else min(wait, until_refresh)
+            with self._cond:
+                if not self._stopped.is_set():
+                    self._cond.wait(timeout)
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._poll_pool.shutdown(wait=False, cancel_futures=True)
+        self._process_pool.shutdown(wait=False)
+        # Let the peers take the rewards over without waiting for the leases to expire
+        release_reward_leases(self.worker_id)
 
-            repo_str = reward[0]
-            issue_id = reward[1]
-            # Parse the repository information based on its format
-            reward_value = reward[2] if len(reward) > 2 else None
-
-            owner, repo = None, None
-            # リポジトリ情報のフォーマットに応じて解析
-            if repo_str.startswith("https://"):
-                # URL形式の場合、パスから "owner/repository" を抽出
-                parsed = urlparse(repo_str)
-                path = parsed.path.strip("/")
-                if "/" in path:
-                    owner, repo = path.split("/", 1)
-                else:
-                    logging.error(f"Invalid repository format from URL: {repo_str}")
+# ---------------------------
+# Updated start_monitors: Retrieve rewards directly from the database
+# ---------------------------
+def start_monitors(socketio, agent_executor, config, max_workers=MONITOR_WORKERS):
+    """
+    Retrieves rewards directly from the database and checks every open reward once.
+    Issue states are resolved in batches, and closed issues are processed concurrently
+    on a bounded worker pool.
+    """
+    try:
+        targets = get_open_reward_targets()
+        reward_values = {(owner, repo, issue_id): reward_value for owner, repo, issue_id, reward_value in targets}
+        issues = fetch_issues(list(reward_values))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="issue-process") as executor:
+            for (owner, repo, issue_id), issue in issues.items():
+                if issue is None or issue.get('closed_at') is None:
                     continue
-            elif "/" in repo_str:
-                # "owner/repository" 形式の場合
-                owner, repo = repo_str.split("/", 1)
-            else:
-                # 単一のリポジトリ名のみの場合、デフォルトのオーナーを利用
-                owner = GITHUB_OWNER
-                repo = repo_str
-
-            # 各リワードエントリの対象 issue を監視するスレッドを開始
-            # thread = threading.Thread(
-            #     target=monitor_specific_issue,
-            #     args=(socketio, agent_executor, config, owner, repo, issue_id, reward_value)
-            # )
-            # thread.start()
-            monitor_specific_issue(socketio, agent_executor, config, owner, repo, issue_id, reward_value)
-            logging.info(f"Started monitoring thread for {owner}/{repo} Issue #{issue_id}")
+                issue_info = build_issue_info(owner, repo, issue_id, issue, reward_values[(owner, repo, issue_id)])
+                executor.submit(handle_closed_issue, socketio, agent_executor, config, issue_info)
     except Exception as e:
         logging.error(f"Failed to start monitors: {e}")
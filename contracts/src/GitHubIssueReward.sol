@@ -29,6 +29,11 @@ contract GitHubIssueReward {
         uint256 indexed issueId,
         string[] contributors
     );
+    event IssueSkipped(
+        string indexed repositoryName,
+        uint256 indexed issueId,
+        string reason
+    );
     event GitHubLinked(
         string indexed githubId,
         address indexed contributorAddress
@@ -127,24 +132,101 @@ contract GitHubIssueReward {
         uint256 issueId,
         string[] memory githubIds,
         uint256[] memory percentages
+    ) public onlyPrivileged {
+        string memory reason = completionError(
+            repositoryName,
+            issueId,
+            githubIds,
+            percentages
+        );
+        require(bytes(reason).length == 0, reason);
+        completeIssue(repositoryName, issueId, githubIds, percentages);
+    }
+
+    /// @notice Registers contributors and completes several issues in one transaction.
+    /// An issue that cannot be completed is skipped with an IssueSkipped event instead of
+    /// reverting the whole batch.
+    /// @param repositoryNames The names of the repositories.
+    /// @param issueIds The IDs of the issues.
+    /// @param githubIds The list of GitHub IDs of contributors of each issue.
+    /// @param percentages The list of reward percentages for each contributor of each issue.
+    function registerAndCompleteIssues(
+        string[] memory repositoryNames,
+        uint256[] memory issueIds,
+        string[][] memory githubIds,
+        uint256[][] memory percentages
     ) public onlyPrivileged {
         require(
-            !issues[repositoryName][issueId].isCompleted,
-            "Issue already completed"
+            repositoryNames.length == issueIds.length &&
+                issueIds.length == githubIds.length &&
+                githubIds.length == percentages.length,
+            "Mismatched inputs"
         );
-        require(githubIds.length == percentages.length, "Mismatched inputs");
+        for (uint256 i = 0; i < issueIds.length; i++) {
+            string memory reason = completionError(
+                repositoryNames[i],
+                issueIds[i],
+                githubIds[i],
+                percentages[i]
+            );
+            if (bytes(reason).length != 0) {
+                emit IssueSkipped(repositoryNames[i], issueIds[i], reason);
+                continue;
+            }
+            completeIssue(
+                repositoryNames[i],
+                issueIds[i],
+                githubIds[i],
+                percentages[i]
+            );
+        }
+    }
 
+    /// @notice Checks whether an issue can be completed with the given contributors.
+    /// @param repositoryName The name of the repository.
+    /// @param issueId The ID of the issue.
+    /// @param githubIds The list of GitHub IDs of contributors.
+    /// @param percentages The list of reward percentages for each contributor.
+    /// @return The reason the issue cannot be completed, empty if it can.
+    function completionError(
+        string memory repositoryName,
+        uint256 issueId,
+        string[] memory githubIds,
+        uint256[] memory percentages
+    ) internal view returns (string memory) {
+        if (issues[repositoryName][issueId].isCompleted) {
+            return "Issue already completed";
+        }
+        if (githubIds.length != percentages.length) {
+            return "Mismatched inputs";
+        }
         uint256 totalPercentage = 0;
-        for (uint256 i = 0; i < githubIds.length; i++) {
-            issues[repositoryName][issueId].contributors.push(githubIds[i]);
-            issues[repositoryName][issueId].contributorPercentages[
-                    githubIds[i]
-                ] = percentages[i];
+        for (uint256 i = 0; i < percentages.length; i++) {
             totalPercentage += percentages[i];
         }
-        require(totalPercentage == 100, "Total percentage must be 100");
+        if (totalPercentage != 100) {
+            return "Total percentage must be 100";
+        }
+        return "";
+    }
 
-        issues[repositoryName][issueId].isCompleted = true;
+    /// @notice Records the contributors of an issue and marks it completed.
+    /// @param repositoryName The name of the repository.
+    /// @param issueId The ID of the issue.
+    /// @param githubIds The list of GitHub IDs of contributors.
+    /// @param percentages The list of reward percentages for each contributor.
+    function completeIssue(
+        string memory repositoryName,
+        uint256 issueId,
+        string[] memory githubIds,
+        uint256[] memory percentages
+    ) internal {
+        Issue storage issue = issues[repositoryName][issueId];
+        for (uint256 i = 0; i < githubIds.length; i++) {
+            issue.contributors.push(githubIds[i]);
+            issue.contributorPercentages[githubIds[i]] = percentages[i];
+        }
+        issue.isCompleted = true;
         emit IssueCompleted(repositoryName, issueId, githubIds);
     }
 
@@ -26,6 +26,17 @@ contract GitHubIssueRewardTest is Test {
 
     string public repositoryName = "example/repo"; // Example repository name
 
+    event IssueCompleted(
+        string indexed repositoryName,
+        uint256 indexed issueId,
+        string[] contributors
+    );
+    event IssueSkipped(
+        string indexed repositoryName,
+        uint256 indexed issueId,
+        string reason
+    );
+
     /// @notice Sets up the test environment by deploying the contract and minting tokens.
     function setUp() public {
         owner = vm.addr(ownerPrivateKey);
@@ -98,6 +109,103 @@ contract GitHubIssueRewardTest is Test {
         assertTrue(isCompleted);
     }
 
+    /// @notice Tests the registerAndCompleteIssues function to ensure every issue of a batch is completed.
+    function testRegisterAndCompleteIssues() public {
+        string[] memory repositoryNames = new string[](2);
+        repositoryNames[0] = repositoryName;
+        repositoryNames[1] = "example/other-repo";
+        uint256[] memory issueIds = new uint256[](2);
+        issueIds[0] = 1;
+        issueIds[1] = 2;
+        string[][] memory githubIds = new string[][](2);
+        githubIds[0] = new string[](1);
+        githubIds[0][0] = "contributor1";
+        githubIds[1] = new string[](2);
+        githubIds[1][0] = "contributor1";
+        githubIds[1][1] = "contributor2";
+        uint256[][] memory percentages = new uint256[][](2);
+        percentages[0] = new uint256[](1);
+        percentages[0][0] = 100;
+        percentages[1] = new uint256[](2);
+        percentages[1][0] = 60;
+        percentages[1][1] = 40;
+
+        vm.expectEmit(true, true, false, true);
+        emit IssueCompleted(repositoryName, 1, githubIds[0]);
+        vm.expectEmit(true, true, false, true);
+        emit IssueCompleted("example/other-repo", 2, githubIds[1]);
+        vm.prank(privilegedAccount);
+        rewardContract.registerAndCompleteIssues(
+            repositoryNames,
+            issueIds,
+            githubIds,
+            percentages
+        );
+        (, , bool isCompleted) = rewardContract.issues(repositoryName, 1);
+        assertTrue(isCompleted);
+        (, , isCompleted) = rewardContract.issues("example/other-repo", 2);
+        assertTrue(isCompleted);
+    }
+
+    /// @notice Tests that registerAndCompleteIssues skips the issues it cannot complete without reverting the batch.
+    function testRegisterAndCompleteIssuesSkipsInvalidIssues() public {
+        string[] memory single = new string[](1);
+        single[0] = "contributor1";
+        uint256[] memory full = new uint256[](1);
+        full[0] = 100;
+        vm.prank(privilegedAccount);
+        rewardContract.registerAndCompleteIssue(repositoryName, 1, single, full);
+
+        string[] memory repositoryNames = new string[](3);
+        repositoryNames[0] = repositoryName;
+        repositoryNames[1] = repositoryName;
+        repositoryNames[2] = repositoryName;
+        uint256[] memory issueIds = new uint256[](3);
+        issueIds[0] = 1; // Already completed
+        issueIds[1] = 2; // Percentages do not sum to 100
+        issueIds[2] = 3;
+        uint256[] memory short = new uint256[](1);
+        short[0] = 90;
+        string[][] memory githubIds = new string[][](3);
+        githubIds[0] = single;
+        githubIds[1] = single;
+        githubIds[2] = single;
+        uint256[][] memory percentages = new uint256[][](3);
+        percentages[0] = full;
+        percentages[1] = short;
+        percentages[2] = full;
+
+        vm.expectEmit(true, true, false, true);
+        emit IssueSkipped(repositoryName, 1, "Issue already completed");
+        vm.expectEmit(true, true, false, true);
+        emit IssueSkipped(repositoryName, 2, "Total percentage must be 100");
+        vm.expectEmit(true, true, false, true);
+        emit IssueCompleted(repositoryName, 3, single);
+        vm.prank(privilegedAccount);
+        rewardContract.registerAndCompleteIssues(
+            repositoryNames,
+            issueIds,
+            githubIds,
+            percentages
+        );
+        (, , bool isCompleted) = rewardContract.issues(repositoryName, 2);
+        assertFalse(isCompleted);
+        (, , isCompleted) = rewardContract.issues(repositoryName, 3);
+        assertTrue(isCompleted);
+    }
+
+    /// @notice Tests that registerAndCompleteIssues can only be called by the privileged account.
+    function testRegisterAndCompleteIssuesOnlyPrivileged() public {
+        vm.prank(contributor);
+        vm.expectRevert("Not the privileged account");
+        rewardContract.registerAndCompleteIssues(
+            new string[](0),
+            new uint256[](0),
+            new string[][](0),
+            new uint256[][](0)
+        );
+    }
+
     /// @notice Tests the linkGitHubToAddress function to ensure GitHub IDs are correctly linked to addresses.
     // function testLinkGitHubToAddress() public {
     //     vm.prank(privilegedAccount);